@@ -0,0 +1,467 @@
+"""Local stand-ins for the arts-council sites and the OpenAI API.
+
+``MockArtsCouncil`` serves paginated listing pages and detail pages shaped like
+arts.ca.gov and azarts.gov. Listings are synthesized from the
+``raw_data/*_raw_data.json`` fixtures: each one combines paragraphs from
+several fixture descriptions, so listings are distinct, except for a share
+(``duplicate_rate``) that repeats an earlier listing under a new URL for the
+dedupe stage to link. Deadlines are spread over the next year, and
+``rolling_rate`` of them are open-ended, which the local deadline parser
+can't handle. The same ``seed`` always produces the same site.
+
+``MockOpenAI`` answers ``/v1/chat/completions`` with well-formed summaries
+whose topics and fees come from the ``processed_data`` fixtures. It sleeps
+``latency`` seconds (plus up to ``jitter`` of that) per request. It
+returns 429 with ``retry-after-ms`` for a random ``error_rate`` share of
+requests, and for every request beyond ``max_in_flight`` concurrent ones.
+Usage reports ``cached_tokens`` for a repeated prompt prefix of 1,024 tokens
+or more, as OpenAI's prompt caching does. ``GET /stats`` returns its request
+counts.
+
+Both run in a child process so serving pages doesn't compete with the
+pipeline for the GIL::
+
+    with MockArtsCouncil(events=1000, latency=0.02) as site, MockOpenAI(latency=0.3) as llm:
+        site.base_url('CA_arts_council')   # listing URL to give the scraper
+        llm.url                            # value for OPENAI_BASE_URL
+
+They can also be started on their own for manual runs::
+
+    python -m bench.mock_servers site --events 1000 --latency 0.02 --port 8001
+    python -m bench.mock_servers openai --latency 0.3 --error-rate 0.02 --port 8002
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import multiprocessing
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+RAW_SUFFIX = '_raw_data.json'
+PROCESSED_SUFFIX = '_processed_data.json'
+
+PAGE_SIZE = 20
+DUPLICATE_RATE = 0.05
+ROLLING_RATE = 0.1
+RETRY_AFTER_MS = 200
+STARTUP_TIMEOUT = 30
+CACHE_MIN_PREFIX_TOKENS = 1024
+
+# Shared page chrome, so parsers walk a realistic amount of markup around the content
+_NAV = ''.join(f'<li class="menu-item"><a href="/section-{i}/">Section {i}</a></li>' for i in range(60))
+_SCRIPT = '<script>window.siteConfig = ' + json.dumps({f'option_{i}': 'x' * 40 for i in range(80)}) + ';</script>'
+_FOOTER = '<footer><p>' + ' '.join(['Arts council footer text with links and contact details.'] * 40) + '</p></footer>'
+
+
+def _page(title, body):
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html.escape(title)}</title>{_SCRIPT}</head>'
+            f'<body><header><nav><ul>{_NAV}</ul></nav></header><main>{body}</main>{_FOOTER}</body></html>')
+
+
+def _paragraphs(description):
+    return [line.strip() for line in description.split('\\n') if line.strip()]
+
+
+def _load_fixtures(directory, suffix):
+    fixtures = {}
+    for path in sorted(Path(directory).glob(f'*{suffix}')):
+        with open(path, 'r', encoding='utf-8') as f:
+            fixtures[path.name[:-len(suffix)]] = json.load(f)
+    return fixtures
+
+
+class Source:
+    """How one arts-council site lays out its listing and detail pages."""
+
+    def __init__(self, state, slug, listing_path, page_param, date_format):
+        self.state = state
+        self.slug = slug
+        self.listing_path = listing_path
+        self.page_param = page_param
+        self.date_format = date_format
+
+    def listing_page(self, records):
+        raise NotImplementedError
+
+    def detail_page(self, record):
+        raise NotImplementedError
+
+
+class CASource(Source):
+    """WP Job Manager board: ``li.job_listing`` items, description in ``div.single_job_listing``."""
+
+    def listing_page(self, records):
+        if not records:
+            return _page('Opportunities', '<ul class="job_listings"></ul><p class="no_job_listings_found">There are no listings matching your search.</p>')
+        items = ''.join(
+            f'<li class="post-{record["id"]} job_listing type-job_listing"><a href="{record["url"]}">'
+            f'<div class="position"><h3>{html.escape(record["title"])}</h3>'
+            f'<div class="company"><div class="job_company">{html.escape(record["organization"])}</div></div></div>'
+            f'<div class="location">{html.escape(record["location"])} | Deadline: {html.escape(record["deadline"])}</div>'
+            f'</a></li>'
+            for record in records
+        )
+        return _page('Opportunities', f'<ul class="job_listings">{items}</ul>')
+
+    def detail_page(self, record):
+        body = ''.join(f'<p>{html.escape(line)}</p>' for line in record['paragraphs'])
+        return _page(record['title'], f'<h1>{html.escape(record["title"])}</h1>'
+                                      f'<div class="single_job_listing">{body}</div>')
+
+
+class AZSource(Source):
+    """Search & Filter results: ``h3 > a`` headings, description in ``div#content``."""
+
+    def listing_page(self, records):
+        sidebar = '<aside><h3>Search Arts Opportunities</h3><form><input name="_sf_s"></form></aside>'
+        if not records:
+            return _page('Arts Opportunities', f'{sidebar}<div class="results"><p>No Results Found</p></div>')
+        items = ''.join(
+            f'<article><h3 class="entry-title"><a href="{record["url"]}">{html.escape(record["title"])}</a></h3>'
+            f'<p class="excerpt">{html.escape(record["paragraphs"][0][:200])}</p></article>'
+            for record in records
+        )
+        return _page('Arts Opportunities', f'{sidebar}<div class="results">{items}</div>')
+
+    def detail_page(self, record):
+        details = ['Details', 'Organization/Company:', record['organization'], 'Website:', record['url'],
+                   'Location:', record['location'], 'Deadline:', record['deadline'],
+                   'How to Apply:', f"Apply online at {record['url']}", 'Tags:', 'Calls for Submissions',
+                   'Submit an Arts Opportunity Listing',
+                   'Do you have an opportunity you would like listed? Click the button below to fill out our form.',
+                   'Add a Listing']
+        lines = ['Posted', record['posted']] + record['paragraphs'][1:] + details
+        body = ''.join(f'<p>{html.escape(line)}</p>' for line in lines)
+        return _page(record['title'], f'<div id="content"><h1>{html.escape(record["title"])}</h1>{body}</div>')
+
+
+SOURCES = {
+    'CA_arts_council': CASource('CA_arts_council', 'ca', '/opportunities/', 'fwp_paged', '{d.month}/{d.day}/{d.year}'),
+    'AZ_arts_council': AZSource('AZ_arts_council', 'az', '/opportunities/arts-opportunities/', 'sf_paged',
+                                '{d:%B} {d.day}, {d.year}'),
+}
+
+
+def synthesize_records(source, fixtures, count, base_url, seed=0, duplicate_rate=DUPLICATE_RATE,
+                       rolling_rate=ROLLING_RATE, today=None):
+    """Builds ``count`` distinct listings for ``source`` from its fixture records."""
+    rng = random.Random(f'{seed}:{source.state}')
+    today = today or date.today()
+    pool = [line for record in fixtures for line in _paragraphs(record.get('description') or '') if len(line) > 40]
+    records = []
+    for i in range(count):
+        template = fixtures[i % len(fixtures)]
+        if records and rng.random() < duplicate_rate:
+            # Same call posted again under another URL, as sites do when a listing is reposted
+            record = dict(rng.choice(records), id=i)
+        else:
+            deadline = today + timedelta(days=rng.randint(7, 365))
+            record = {
+                'id': i,
+                'title': f"{template['title']} #{i}",
+                'organization': template.get('organization') or 'N/A',
+                'location': template.get('location') or 'N/A',
+                'deadline': 'Rolling basis' if rng.random() < rolling_rate else source.date_format.format(d=deadline),
+                'posted': '{d:%B} {d.day}, {d.year}'.format(d=today - timedelta(days=rng.randint(0, 60))),
+                'paragraphs': [template['title']] + rng.sample(pool, min(len(pool), rng.randint(6, 14))),
+            }
+        record['url'] = f'{base_url}/{source.slug}/opportunity/{i}/'
+        records.append(record)
+    return records
+
+
+class _SiteHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        site = self.server.site
+        if site.latency:
+            time.sleep(site.latency)
+        body = site.render(self.path)
+        status = 200 if body is not None else 404
+        payload = (body or '<html><body><h1>Not Found</h1></body></html>').encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=UTF-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Site:
+    """Request routing for the synthetic arts-council sites (runs in the server process)."""
+
+    def __init__(self, base_url, events, latency, page_size, seed, duplicate_rate, rolling_rate):
+        self.latency = latency
+        self.page_size = page_size
+        raw = _load_fixtures(ROOT_DIR / 'raw_data', RAW_SUFFIX)
+        states = [state for state in SOURCES if raw.get(state)]
+        self.records = {}
+        for n, state in enumerate(states):
+            # Split the events across sources; the first ones take the remainder
+            count = events // len(states) + (1 if n < events % len(states) else 0)
+            self.records[state] = synthesize_records(SOURCES[state], raw[state], count, base_url, seed,
+                                                     duplicate_rate, rolling_rate)
+
+    def render(self, path):
+        parts = urlsplit(path)
+        for state, records in self.records.items():
+            source = SOURCES[state]
+            prefix = f'/{source.slug}'
+            if parts.path == prefix + source.listing_path:
+                page = int(parse_qs(parts.query).get(source.page_param, ['1'])[0])
+                start = (page - 1) * self.page_size
+                return source.listing_page(records[start:start + self.page_size])
+            if parts.path.startswith(f'{prefix}/opportunity/'):
+                index = parts.path.rstrip('/').rsplit('/', 1)[-1]
+                if index.isdigit() and int(index) < len(records):
+                    return source.detail_page(records[int(index)])
+        return None
+
+
+def _fake_topics():
+    processed = _load_fixtures(ROOT_DIR / 'processed_data', PROCESSED_SUFFIX)
+    topics = sorted({topic for events in processed.values() for event in events for topic in event.get('topics_EN') or []})
+    fees = sorted({event['fees'] for events in processed.values() for event in events if event.get('fees')})
+    return topics or ['Any'], fees or ['$0']
+
+
+class _OpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if urlsplit(self.path).path.rstrip('/').endswith('/stats'):
+            self._send_json(200, self.server.llm.stats())
+        else:
+            self._send_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        if not urlsplit(self.path).path.endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+            return
+        status, payload, headers = self.server.llm.complete(body)
+        self._send_json(status, payload, headers)
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _FakeLLM:
+    """Chat-completions behaviour of the fake API (runs in the server process)."""
+
+    def __init__(self, latency, jitter, error_rate, max_in_flight, retry_after_ms, seed):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_in_flight = max_in_flight
+        self.retry_after_ms = retry_after_ms
+        self.topics, self.fees = _fake_topics()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._prefixes = set()
+        self._counts = {'requests': 0, 'completed': 0, 'throttled': 0, 'peak_in_flight': 0}
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def complete(self, body):
+        with self._lock:
+            self._counts['requests'] += 1
+            self._in_flight += 1
+            self._counts['peak_in_flight'] = max(self._counts['peak_in_flight'], self._in_flight)
+            throttle = (self._rng.random() < self.error_rate
+                        or (self.max_in_flight and self._in_flight > self.max_in_flight))
+            delay = self.latency * (1 + self.jitter * self._rng.random())
+        try:
+            if throttle:
+                with self._lock:
+                    self._counts['throttled'] += 1
+                error = {'message': 'Rate limit reached for requests', 'type': 'requests', 'code': 'rate_limit_exceeded'}
+                return 429, {'error': error}, {'retry-after-ms': str(self.retry_after_ms)}
+            time.sleep(delay)
+            messages = body.get('messages') or []
+            prompt = '\n'.join(str(message.get('content', '')) for message in messages)
+            content = self._answer(messages[-1].get('content', '') if messages else '', 'JSON' in prompt)
+            prompt_tokens = len(prompt) // 4
+            # Like OpenAI's prompt caching: a repeated prefix of 1,024+ tokens is served from cache in 128-token steps
+            prefix = prompt[:CACHE_MIN_PREFIX_TOKENS * 4]
+            with self._lock:
+                self._counts['completed'] += 1
+                cached = prompt_tokens >= CACHE_MIN_PREFIX_TOKENS and prefix in self._prefixes
+                self._prefixes.add(prefix)
+            cached_tokens = CACHE_MIN_PREFIX_TOKENS if cached else 0
+            return 200, {
+                'id': f"chatcmpl-{hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:24]}",
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': body.get('model', 'mock'),
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': content}}],
+                'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': len(content) // 4,
+                          'total_tokens': prompt_tokens + len(content) // 4,
+                          'prompt_tokens_details': {'cached_tokens': cached_tokens}},
+            }, {}
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _answer(self, prompt, wants_json):
+        # Answers depend only on the prompt, so repeated runs store the same summaries
+        rng = random.Random(prompt)
+        deadline = '{d:%m/%d/%Y}'.format(d=date.today() + timedelta(days=rng.randint(7, 365)))
+        if not wants_json:
+            return deadline
+        answer = {
+            'topics_EN': rng.sample(self.topics, min(len(self.topics), rng.randint(1, 4))),
+            'fees': rng.choice(self.fees),
+            'requirement': 'Open to artists residing in the state; original work only; up to three submissions.',
+        }
+        if 'Listed deadline:' in prompt:
+            answer['deadline'] = deadline
+        return json.dumps(answer)
+
+
+def _serve(kind, options, host, port, ready=None):
+    """Runs one mock server in this process until it is terminated."""
+    handler = _SiteHandler if kind == 'site' else _OpenAIHandler
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    url = f'http://{host}:{server.server_address[1]}'
+    if kind == 'site':
+        server.site = _Site(url, **options)
+    else:
+        server.llm = _FakeLLM(**options)
+    if ready is not None:
+        ready.put(url)
+    else:
+        print(f"Serving mock {kind} on {url}", flush=True)
+    server.serve_forever()
+
+
+class _MockServer:
+    """Runs a mock server in a spawned child process; use as a context manager."""
+
+    kind = None
+
+    def __init__(self, host='127.0.0.1', port=0, **options):
+        self.host = host
+        self.port = port
+        self.options = options
+        self.url = None
+        self._process = None
+
+    def start(self):
+        context = multiprocessing.get_context('spawn')
+        ready = context.Queue()
+        self._process = context.Process(target=_serve, args=(self.kind, self.options, self.host, self.port, ready),
+                                        daemon=True)
+        self._process.start()
+        self.url = ready.get(timeout=STARTUP_TIMEOUT)
+        return self
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+class MockArtsCouncil(_MockServer):
+    """Synthetic arts-council listing and detail pages for every fixture source."""
+
+    kind = 'site'
+
+    def __init__(self, events=100, latency=0.0, page_size=PAGE_SIZE, seed=0, duplicate_rate=DUPLICATE_RATE,
+                 rolling_rate=ROLLING_RATE, host='127.0.0.1', port=0):
+        super().__init__(host, port, events=events, latency=latency, page_size=page_size, seed=seed,
+                         duplicate_rate=duplicate_rate, rolling_rate=rolling_rate)
+
+    def base_url(self, state):
+        """The listing URL to give ``state``'s scraper (its ``base_url``)."""
+        source = SOURCES[state]
+        return f'{self.url}/{source.slug}{source.listing_path}?bench=1'
+
+
+class MockOpenAI(_MockServer):
+    """Fake OpenAI chat-completions endpoint with configurable latency and throttling."""
+
+    kind = 'openai'
+
+    def __init__(self, latency=0.3, jitter=0.5, error_rate=0.0, max_in_flight=0, retry_after_ms=RETRY_AFTER_MS,
+                 seed=0, host='127.0.0.1', port=0):
+        super().__init__(host, port, latency=latency, jitter=jitter, error_rate=error_rate,
+                         max_in_flight=max_in_flight, retry_after_ms=retry_after_ms, seed=seed)
+
+    @property
+    def base_url(self):
+        """Value for ``OPENAI_BASE_URL``."""
+        return f'{self.url}/v1'
+
+    def stats(self):
+        """Request, completion and throttle counts so far."""
+        from urllib.request import urlopen
+        with urlopen(f'{self.base_url}/stats', timeout=10) as response:
+            return json.load(response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('kind', choices=('site', 'openai'), help="Which stand-in to run")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0, help="Port to listen on (default: any free port)")
+    parser.add_argument('--latency', type=float, help="Seconds to wait before answering each request")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--events', type=int, default=100, help="site: listings to serve, split across sources")
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE, help="site: listings per page")
+    parser.add_argument('--duplicate-rate', type=float, default=DUPLICATE_RATE, help="site: share of reposted listings")
+    parser.add_argument('--rolling-rate', type=float, default=ROLLING_RATE, help="site: share of open-ended deadlines")
+    parser.add_argument('--jitter', type=float, default=0.5, help="openai: extra latency, as a fraction of --latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="openai: share of requests answered with 429")
+    parser.add_argument('--max-in-flight', type=int, default=0, help="openai: 429 above this many concurrent requests")
+    args = parser.parse_args()
+
+    if args.kind == 'site':
+        options = {'events': args.events, 'latency': args.latency or 0.0, 'page_size': args.page_size, 'seed': args.seed,
+                   'duplicate_rate': args.duplicate_rate, 'rolling_rate': args.rolling_rate}
+    else:
+        options = {'latency': 0.3 if args.latency is None else args.latency, 'jitter': args.jitter,
+                   'error_rate': args.error_rate, 'max_in_flight': args.max_in_flight,
+                   'retry_after_ms': RETRY_AFTER_MS, 'seed': args.seed}
+    try:
+        _serve(args.kind, options, args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
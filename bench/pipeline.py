@@ -0,0 +1,248 @@
+"""Benchmark every pipeline stage offline at several scales.
+
+Starts the stand-ins from ``bench.mock_servers`` (synthetic arts-council sites
+and a fake OpenAI API) and, for each scale, runs the stages on a fresh event
+store in a temporary directory:
+
+    scrape → dedupe → summarize (including search indexing) → normalize → search → export
+
+Each stage is run through its normal entry point (the scrapers' ``run``,
+``link_duplicates``, ``event_summarizer.main``, ``normalize_topics``,
+``topic_index.search`` and ``write_to_excel``). The report gives each
+stage's wall time and throughput, and the latency percentiles that
+``util.metrics`` collected per HTTP fetch, page parse, LLM request,
+summarized event and search query. The HTTP and LLM response caches are off,
+and the per-host politeness delay is lifted for the mock site unless
+``--host-interval`` is set.
+
+``--out`` saves the results as JSON. ``--baseline`` compares a run against
+saved results and exits with status 1 when a stage's throughput dropped by
+more than ``--tolerance``. Run it before and after a change to a hot path.
+
+Usage:
+    python -m bench.pipeline                                   # 10, 1000 and 10000 events
+    python -m bench.pipeline --scales 10 1000 --out bench.json
+    python -m bench.pipeline --scales 1000 --baseline bench.json
+    python -m bench.pipeline --llm-latency 0.5 --error-rate 0.05 --site-latency 0.05
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from bench.mock_servers import DUPLICATE_RATE, PAGE_SIZE, MockArtsCouncil, MockOpenAI
+from util.metrics import metrics
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_SCALES = (10, 1000, 10000)
+LATENCIES = ('http.fetch', 'parse.listing', 'parse.detail', 'llm.request', 'summarize.event', 'search.query')
+DEFAULT_TOLERANCE = 0.25
+
+
+def fresh_store(path):
+    """Creates an empty event store at ``path`` (without the JSON import) and makes it the shared one."""
+    from util.event_store import MIGRATED_KEY, EventStore, configure_store, get_store
+
+    store = EventStore(str(path))
+    store.set_meta(MIGRATED_KEY, 'bench')
+    store.close()
+    configure_store(str(path))
+    return get_store()
+
+
+def search_queries(store, count):
+    """Builds ``count`` free-text queries from the most common indexed topic words."""
+    from util.topic_index import TOPIC
+
+    words = [word for word, _ in sorted(store.term_counts(TOPIC), key=lambda item: -item[1])[:50]] or ['landscape']
+    templates = ('{} calls closing in the next 90 days', '{} with $0 fees', '{}', 'location:california {}')
+    return [templates[i % len(templates)].format(words[i % len(words)]) for i in range(count)]
+
+
+class StageTimer:
+    """Runs the stages of one scale and collects their wall time and throughput."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name, items):
+        started = time.perf_counter()
+        with metrics.span(f'stage.{name}'):
+            yield
+        seconds = time.perf_counter() - started
+        self.stages[name] = {'seconds': round(seconds, 3), 'items': items,
+                             'per_s': round(items / seconds, 1) if seconds else None}
+
+
+def run_scale(events, scrapers, llm, workdir, args):
+    """Runs every stage for ``events`` synthetic listings and returns the results."""
+    import event_summarizer
+    from util.dedupe import link_duplicates
+    from util.excel_writer import write_to_excel
+    from util.http_client import configure_host_limits
+    from util.openai_caller import usage_stats
+    from util.topic_index import parse_query, search
+    from util.topic_normalizer import normalize_topics
+
+    metrics.reset()
+    usage_stats.reset()
+    store = fresh_store(workdir / f'events_{events}.sqlite3')
+    timer = StageTimer()
+    llm_before = llm.stats()
+
+    with MockArtsCouncil(events=events, latency=args.site_latency, page_size=args.page_size, seed=args.seed,
+                         duplicate_rate=args.duplicate_rate) as site:
+        configure_host_limits(urlsplit(site.url).netloc, args.fetch_workers * len(scrapers), args.host_interval)
+        for name, cls in scrapers.items():
+            cls.base_url = site.base_url(name)
+        with timer.stage('scrape', events), ThreadPoolExecutor(max_workers=len(scrapers)) as executor:
+            futures = [executor.submit(cls().run, max_pages=None, max_workers=args.fetch_workers, stop_after_known=None)
+                       for cls in scrapers.values()]
+            scraped = sum(len(future.result()) for future in futures)
+
+    with timer.stage('dedupe', scraped):
+        indexed, linked = link_duplicates(store)
+        metrics.incr('dedupe.linked', linked)
+
+    with timer.stage('summarize', scraped - linked):
+        event_summarizer.main(mode=args.mode, engine=args.engine, dedupe=False)
+
+    with timer.stage('normalize', store.count()):
+        normalize_topics(store)
+
+    queries = search_queries(store, args.queries)
+    with timer.stage('search', len(queries)):
+        for query in queries:
+            with metrics.timer('search.query'):
+                search(store, **parse_query(query))
+
+    with timer.stage('export', store.count()):
+        write_to_excel(store, str(workdir / f'art_calls_{events}.xlsx'), rebuild=True)
+
+    report = metrics.report()
+    llm_after = llm.stats()
+    return {
+        'events': events,
+        'scraped': scraped,
+        'duplicates_linked': linked,
+        'stages': timer.stages,
+        'latency_ms': {name: report['timings'][name] for name in LATENCIES if name in report['timings']},
+        'counters': report['counters'],
+        'llm_usage': usage_stats.snapshot(),
+        'llm_server': {key: llm_after[key] - llm_before[key] for key in ('requests', 'completed', 'throttled')},
+    }
+
+
+def print_scale(result):
+    print(f"\n=== {result['events']} events ({result['scraped']} scraped, {result['duplicates_linked']} duplicates linked) ===")
+    print(f"{'stage':<12}{'seconds':>10}{'items':>8}{'items/s':>10}")
+    for name, stage in result['stages'].items():
+        print(f"{name:<12}{stage['seconds']:>10.3f}{stage['items']:>8}{stage['per_s'] or 0:>10.1f}")
+    print(f"\n{'latency (ms)':<18}{'count':>7}{'p50':>11}{'p90':>11}{'p99':>11}{'max':>11}")
+    for name, timing in result['latency_ms'].items():
+        print(f"{name:<18}{timing['count']:>7}{timing['p50_ms']:>11.2f}{timing['p90_ms']:>11.2f}"
+              f"{timing['p99_ms']:>11.2f}{timing['max_ms']:>11.2f}")
+    server = result['llm_server']
+    usage = result['llm_usage']
+    print(f"\nLLM: {server['requests']} requests, {server['throttled']} throttled (429), {usage.get('retries', 0)} retries, "
+          f"{usage.get('prompt_tokens', 0)} prompt tokens ({usage.get('cached_prompt_tokens', 0)} cached)")
+
+
+def compare(results, baseline, tolerance):
+    """Returns a message per stage whose throughput fell more than ``tolerance`` below ``baseline``."""
+    regressions = []
+    for scale, result in results['scales'].items():
+        for name, stage in result['stages'].items():
+            before = baseline.get('scales', {}).get(scale, {}).get('stages', {}).get(name, {}).get('per_s')
+            if before and stage['per_s'] is not None and stage['per_s'] < before * (1 - tolerance):
+                regressions.append(f"{scale} events, {name}: {stage['per_s']:.1f}/s vs {before:.1f}/s baseline "
+                                   f"({stage['per_s'] / before - 1:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES), help="Event counts to run")
+    parser.add_argument('--mode', default='combined', choices=('combined', 'separate'), help="Summary mode")
+    parser.add_argument('--engine', default='thread', choices=('thread', 'async'), help="Summarizer engine")
+    parser.add_argument('--site-latency', type=float, default=0.02, help="Seconds per mock site response")
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE, help="Listings per mock listing page")
+    parser.add_argument('--duplicate-rate', type=float, default=DUPLICATE_RATE, help="Share of reposted listings")
+    parser.add_argument('--fetch-workers', type=int, default=8, help="Concurrent detail fetches per scraper")
+    parser.add_argument('--host-interval', type=float, default=0.0,
+                        help="Seconds between request starts on the mock site (the real sites use 0.25)")
+    parser.add_argument('--llm-latency', type=float, default=0.3, help="Seconds per fake OpenAI response")
+    parser.add_argument('--error-rate', type=float, default=0.02, help="Share of fake OpenAI requests answered with 429")
+    parser.add_argument('--max-in-flight', type=int, default=0, help="Fake OpenAI: 429 above this many concurrent requests")
+    parser.add_argument('--max-rpm', type=int, default=1_000_000, help="OPENAI_MAX_RPM for the run")
+    parser.add_argument('--max-tpm', type=int, default=1_000_000_000, help="OPENAI_MAX_TPM for the run")
+    parser.add_argument('--max-description-tokens', type=int, default=1000,
+                        help="Token budget per compacted description (0 = no limit)")
+    parser.add_argument('--no-compact', action='store_true', help="Send descriptions to the fake API as scraped")
+    parser.add_argument('--queries', type=int, default=200, help="Search queries per scale")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', help="Results JSON to compare against; exit 1 on a regression")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed throughput drop against the baseline (fraction)")
+    parser.add_argument('--verbose', action='store_true', help="Show the stages' own logging and output")
+    args = parser.parse_args()
+
+    # The summarizer reads prompts/ and lists scrapers/ relative to the working directory
+    os.chdir(ROOT_DIR)
+    with MockOpenAI(latency=args.llm_latency, error_rate=args.error_rate, max_in_flight=args.max_in_flight,
+                    seed=args.seed) as llm, tempfile.TemporaryDirectory(prefix='artcall-bench-') as tmp:
+        # util.openai_caller reads these when it is first imported
+        os.environ['OPENAI_BASE_URL'] = llm.base_url
+        os.environ.setdefault('OPENAI_API_KEY', 'bench')
+        os.environ['OPENAI_MAX_RPM'] = str(args.max_rpm)
+        os.environ['OPENAI_MAX_TPM'] = str(args.max_tpm)
+
+        from run_pipeline import SCRAPER_DIR, load_scrapers
+        from util import http_client, openai_caller
+
+        from util.prompt_compaction import configure_compaction
+
+        configure_compaction(enabled=not args.no_compact, max_tokens=args.max_description_tokens or None)
+        http_client.configure_cache(enabled=False)
+        openai_caller.configure_cache(enabled=False)
+        scrapers = load_scrapers(SCRAPER_DIR)
+        logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+        results = {'config': {key: value for key, value in vars(args).items() if key not in ('out', 'baseline')},
+                   'scales': {}}
+        for events in args.scales:
+            with contextlib.ExitStack() as stack:
+                if not args.verbose:
+                    stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+                result = run_scale(events, scrapers, llm, Path(tmp), args)
+            results['scales'][str(events)] = result
+            print_scale(result)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print(f"\nNo stage is more than {args.tolerance:.0%} slower than the baseline.")
+
+
+if __name__ == '__main__':
+    main()
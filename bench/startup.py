@@ -0,0 +1,130 @@
+"""Check the import time of the command-line entry points against a budget.
+
+Each entry point is imported in a fresh interpreter with ``python -X
+importtime`` (``--repeat`` times, keeping the fastest run). The report gives
+its import time, the packages that cost the most, and any violations:
+
+- the import took longer than its budget (scaled by ``--budget-scale`` for
+  slower machines);
+- it pulled in a heavy dependency that should only load in the stage that
+  uses it (for example the OpenAI SDK when nothing is summarized yet, or
+  pandas before the Excel export);
+- it failed, e.g. because it needs an API key just to be imported.
+
+The subprocesses run without ``OPENAI_API_KEY``. The exit status is 1 when
+anything is over budget.
+
+Usage:
+    python -m bench.startup
+    python -m bench.startup --repeat 5 --budget-scale 2 --out startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_REPEAT = 3
+TOP_PACKAGES = 5
+
+HEAVY = frozenset(('openai', 'pandas', 'openpyxl', 'xlsxwriter', 'numpy', 'bs4', 'lxml', 'selectolax', 'tiktoken',
+                   'requests'))
+
+# Entry point -> (import budget in ms, heavy packages it may load)
+ENTRY_POINTS = {
+    'run_pipeline': (60, frozenset()),
+    'event_summarizer': (200, frozenset()),
+    'util.openai_caller': (150, frozenset()),
+    'util.event_store': (60, frozenset()),
+    'util.topic_index': (60, frozenset()),
+    'util.excel_writer': (60, frozenset()),
+    'util.dedupe': (250, frozenset({'numpy'})),
+    'util.topic_normalizer': (250, frozenset({'numpy'})),
+    'scrapers.base': (250, frozenset({'requests'})),
+}
+
+
+def import_times(module):
+    """Imports ``module`` in a fresh interpreter; returns ``{name: (self_us, cumulative_us)}`` for what it loaded."""
+    env = {key: value for key, value in os.environ.items() if key != 'OPENAI_API_KEY'}
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, (str(ROOT_DIR), env.get('PYTHONPATH'))))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def measure(module, repeat):
+    """Returns the fastest of ``repeat`` imports of ``module`` with its per-package costs."""
+    best = None
+    for _ in range(repeat):
+        times = import_times(module)
+        if best is None or times[module][1] < best[module][1]:
+            best = times
+    packages = defaultdict(int)
+    for name, (self_us, _) in best.items():
+        packages[name.split('.', 1)[0]] += self_us
+    top = sorted(packages.items(), key=lambda item: -item[1])[:TOP_PACKAGES]
+    return {
+        'import_ms': round(best[module][1] / 1000, 1),
+        'top_packages_ms': {name: round(us / 1000, 1) for name, us in top},
+        'heavy_imports': sorted(HEAVY & set(packages)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('modules', nargs='*', help="Entry points to check (default: all known ones)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Imports per entry point; the fastest counts")
+    parser.add_argument('--budget-scale', type=float, default=1.0, help="Multiply every budget (slower machines)")
+    parser.add_argument('--out', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    failures = []
+    print(f"{'entry point':<24}{'import ms':>10}{'budget':>8}  heaviest packages")
+    for module in args.modules or ENTRY_POINTS:
+        budget_ms, allowed = ENTRY_POINTS.get(module, (None, HEAVY))
+        try:
+            result = measure(module, args.repeat)
+        except RuntimeError as e:
+            failures.append(f"{module}: import failed: {e}")
+            print(f"{module:<24}{'failed':>10}")
+            continue
+        if budget_ms is not None:
+            budget_ms *= args.budget_scale
+            result['budget_ms'] = budget_ms
+            if result['import_ms'] > budget_ms:
+                failures.append(f"{module}: {result['import_ms']:.0f} ms is over its {budget_ms:.0f} ms budget")
+        unexpected = sorted(set(result['heavy_imports']) - allowed)
+        if unexpected:
+            failures.append(f"{module}: imports {', '.join(unexpected)} at startup")
+        results[module] = result
+        top = ', '.join(f"{name} {ms:.0f}" for name, ms in result['top_packages_ms'].items())
+        print(f"{module:<24}{result['import_ms']:>10.1f}{budget_ms or 0:>8.0f}  {top}")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'results': results, 'failures': failures}, f, indent=2)
+
+    if failures:
+        print("\nOver budget:")
+        for message in failures:
+            print(f"  {message}")
+        sys.exit(1)
+    print("\nAll entry points are within their import budget.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Compare latency and token usage of the combined and separate summary modes.
+
+Runs the same raw events through ``event_summarizer.process_event`` once per
+mode with the response cache disabled and prints per-event latency percentiles
+plus the requests and tokens billed. Point ``OPENAI_BASE_URL`` at a mock
+endpoint to benchmark without spending API credits.
+
+Usage:
+    python -m bench.summary_modes --events 20 --workers 10 --llm-deadlines
+"""
+
+import argparse
+import copy
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import event_summarizer
+from util import openai_caller
+from util.metrics import percentile
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def load_events(limit):
+    events = []
+    for path in sorted((ROOT_DIR / 'raw_data').glob('*_raw_data.json')):
+        with open(path, 'r', encoding='utf-8') as f:
+            events.extend(json.load(f))
+    return events[:limit]
+
+
+def run_mode(mode, events, prompts, workers):
+    latencies = []
+
+    def timed(event):
+        start = time.perf_counter()
+        event_summarizer.process_event(event, prompts, mode)
+        latencies.append(time.perf_counter() - start)
+
+    openai_caller.usage_stats.reset()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(timed, copy.deepcopy(events)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    usage = openai_caller.usage_stats.snapshot()
+    return {
+        'mode': mode,
+        'events': len(events),
+        'wall_s': round(wall, 3),
+        'latency_mean_s': round(statistics.mean(latencies), 3),
+        'latency_p50_s': round(percentile(latencies, 50), 3),
+        'latency_p95_s': round(percentile(latencies, 95), 3),
+        **usage,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=20, help="Number of raw events to summarize per mode")
+    parser.add_argument('--workers', type=int, default=10, help="Thread pool size, as in event_summarizer.main")
+    parser.add_argument('--llm-deadlines', action='store_true',
+                        help="Bypass the local deadline parser so every deadline needs the model")
+    args = parser.parse_args()
+
+    openai_caller.configure_cache(enabled=False)
+    if args.llm_deadlines:
+        event_summarizer.parse_deadline = lambda text: None
+
+    with open(ROOT_DIR / 'prompts' / 'prompts.json', 'r', encoding='utf-8') as f:
+        prompts = json.load(f)
+    events = load_events(args.events)
+
+    results = [run_mode(mode, events, prompts, args.workers) for mode in event_summarizer.SUMMARY_MODES]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
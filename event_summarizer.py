@@ -1,57 +1,454 @@
+import argparse
+import asyncio
+import functools
 import json
 import os
-from util.openai_caller import get_openai_response_in_json, get_openai_response
+import threading
+import time
+from util.openai_caller import (
+    JSON_SYSTEM_PROMPT,
+    MAX_CONCURRENCY,
+    MODEL,
+    TEXT_SYSTEM_PROMPT,
+    aget_openai_response,
+    aget_openai_response_in_json,
+    cache_stats,
+    get_cache,
+    usage_stats,
+    get_openai_response_in_json,
+    get_openai_response,
+)
+from util.openai_batch import (
+    BatchPendingError,
+    LocalBatchBackend,
+    forget_batch,
+    interactive_responder,
+    resume_batch,
+    run_batch,
+    validate_json_content,
+)
+from util.event_store import get_store
+from util.topic_index import update_index
+from util.deadline_parser import DeadlineStats, is_rolling, mentions_rolling, parse_deadline, rolling_deadline
+from util.prompt_compaction import DEFAULT_MAX_TOKENS, compact_description, compaction_stats, configure_compaction
+from util.metrics import metrics
 from tqdm import tqdm
 import concurrent.futures
 
+MODE_COMBINED = 'combined'
+MODE_SEPARATE = 'separate'
+SUMMARY_MODES = (MODE_COMBINED, MODE_SEPARATE)
+
+ENGINE_THREAD = 'thread'
+ENGINE_ASYNC = 'async'
+ENGINE_BATCH = 'batch'
+ENGINES = (ENGINE_THREAD, ENGINE_ASYNC, ENGINE_BATCH)
+DEFAULT_ASYNC_IN_FLIGHT = 256
+DEFAULT_BATCH_POLL_INTERVAL = 30
+PROMPTS_PATH = 'prompts/prompts.json'
+STREAM_DONE = None
+
+deadline_stats = DeadlineStats()
+
 def load_json_file(file_path):
     """Loads a JSON file."""
     with open(file_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-def save_json_file(data, file_path):
-    """Saves data to a JSON file."""
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+def build_prompt(template, *parts):
+    """
+    Appends the per-event ``parts`` to a prompt template.
+
+    The template always comes first, so every request of one kind starts with
+    the same system message and instructions. OpenAI caches such a shared
+    prefix and bills it at a discount once it is 1,024 tokens or longer.
+    """
+    return '\n\n'.join((template,) + parts)
+
+JSON_REQUEST = 'json'
+TEXT_REQUEST = 'text'
+SYSTEM_PROMPTS = {JSON_REQUEST: JSON_SYSTEM_PROMPT, TEXT_REQUEST: TEXT_SYSTEM_PROMPT}
+
+def apply_model_deadline(event, deadline):
+    """
+    Stores a deadline the model normalized.
+
+    The prompts answer "rolling" for rolling or ongoing calls, which become
+    December 31 of the current year and are flagged ``rolling`` so the archive
+    keeps them. A December 31 date on a call whose description says it is
+    rolling is treated the same way, whatever year the model picked.
+    """
+    deadline = deadline.strip()
+    if mentions_rolling(deadline) or (deadline.startswith('12/31/') and mentions_rolling(event.get('description'))):
+        event['deadline'] = rolling_deadline()
+        event['rolling'] = True
+    else:
+        event['deadline'] = parse_deadline(deadline) or deadline
+
+def format_deadline(event, date_formatter_prompt_template):
+    """
+    Normalizes the event deadline locally, falling back to the date_formatter prompt.
+
+    API errors propagate, so the event is not stored and stays pending.
+    """
+    deadline = event.get('deadline')
+    if not deadline:
+        return
+    formatted_date = parse_deadline(deadline)
+    deadline_stats.record(formatted_date is not None)
+    if formatted_date:
+        event['deadline'] = formatted_date
+        return
+    date_prompt = build_prompt(date_formatter_prompt_template, deadline)
+    formatted_date = yield (TEXT_REQUEST, date_prompt)
+    apply_model_deadline(event, formatted_date)
+
+def summarize(event, prompt, extract_deadline=False):
+    """
+    Requests one JSON summary and merges the answer into the event.
+
+    API errors and answers that aren't JSON propagate: the engines then leave
+    the event out of the store, so it stays pending for the next run instead
+    of being stored without a summary.
+    """
+    summary_json_str = yield (JSON_REQUEST, prompt)
+    summary_data = json.loads(summary_json_str)
+    if extract_deadline:
+        deadline = str(summary_data.pop('deadline', '') or '').strip()
+        if deadline:
+            apply_model_deadline(event, deadline)
+    else:
+        summary_data.pop('deadline', None)
+    event.update(summary_data)
+    # Normalized from the previous topics_EN; util.topic_normalizer maps the new ones
+    event.pop('topics_canonical', None)
+
+def event_requests(event, prompts, mode=MODE_COMBINED):
+    """
+    Generator describing the OpenAI requests needed for one event.
+
+    Yields ``(kind, prompt)`` tuples, receives each response via ``send`` (or
+    the API error via ``throw``, which it re-raises) and updates ``event`` in
+    place. Keeping the decisions here lets the thread and async engines share
+    them.
+
+    In ``combined`` mode a deadline the local parser can't handle is extracted
+    by the summarization request itself (``summarize_with_deadline`` prompt),
+    so each event costs at most one API call. ``separate`` keeps the original
+    behaviour of a summary request followed by a ``date_formatter`` request.
+
+    The description is compacted and truncated to the token budget first (see
+    ``util.prompt_compaction``); the stored event keeps the full text.
+    """
+    description = compact_description(event.get('description'), event.get('title'))
+    deadline = event.get('deadline')
+    if is_rolling(deadline):
+        # Kept out of the archive; see EventStore.put_events
+        event['rolling'] = True
+
+    if mode == MODE_COMBINED and description:
+        formatted_date = parse_deadline(deadline) if deadline else None
+        if deadline:
+            deadline_stats.record(formatted_date is not None)
+        if deadline and not formatted_date:
+            prompt = build_prompt(prompts['summarize_with_deadline'], f"Listed deadline: {deadline}\n{description}")
+            yield from summarize(event, prompt, extract_deadline=True)
+        else:
+            if formatted_date:
+                event['deadline'] = formatted_date
+            yield from summarize(event, build_prompt(prompts['summarize_description'], description))
+        return
 
-def process_event(event, summarize_prompt_template, date_formatter_prompt_template):
-    """Processes a single event to summarize description and format deadline."""
-    description = event.get('description')
     if description:
-        prompt = f"{summarize_prompt_template}\n\n{description}"
+        yield from summarize(event, build_prompt(prompts['summarize_description'], description))
+    yield from format_deadline(event, prompts['date_formatter'])
+
+def process_event(event, prompts, mode=MODE_COMBINED):
+    """Processes a single event to summarize description and format deadline."""
+    callers = {JSON_REQUEST: get_openai_response_in_json, TEXT_REQUEST: get_openai_response}
+    steps = event_requests(event, prompts, mode)
+    with metrics.timer('summarize.event'):
         try:
-            summary_json_str = get_openai_response_in_json(prompt)
-            summary_data = json.loads(summary_json_str)
-            event.update(summary_data)
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON for event: {event.get('title')}. Error: {e}")
-            # Decide how to handle this error, maybe return event without summary
-        except Exception as e:
-            print(f"An unexpected error occurred during summary: {event.get('title')}. Error: {e}")
-
-    # Format the deadline using OpenAI
-    deadline = event.get('deadline')
-    if deadline:
+            kind, prompt = next(steps)
+            while True:
+                try:
+                    response = callers[kind](prompt)
+                except Exception as e:
+                    kind, prompt = steps.throw(e)
+                else:
+                    kind, prompt = steps.send(response)
+        except StopIteration:
+            pass
+    return event
+
+async def aprocess_event(event, prompts, mode=MODE_COMBINED):
+    """Async version of ``process_event`` built on the AsyncOpenAI client."""
+    callers = {JSON_REQUEST: aget_openai_response_in_json, TEXT_REQUEST: aget_openai_response}
+    steps = event_requests(event, prompts, mode)
+    with metrics.timer('summarize.event'):
         try:
-            date_prompt = f"{date_formatter_prompt_template}\n\n{deadline}"
-            formatted_date = get_openai_response(date_prompt)
-            event['deadline'] = formatted_date.strip()
-        except Exception as e:
-            print(f"An unexpected error occurred while formatting date for event: {event.get('title')}. Error: {e}")
-    
+            kind, prompt = next(steps)
+            while True:
+                try:
+                    response = await callers[kind](prompt)
+                except Exception as e:
+                    kind, prompt = steps.throw(e)
+                else:
+                    kind, prompt = steps.send(response)
+        except StopIteration:
+            pass
     return event
 
-def main():
+def _noop(event):
+    pass
+
+def run_thread_engine(events, prompts, mode, label, on_complete=_noop):
+    """Summarizes events on a thread pool; returns the processed events."""
+    processed_events = []
+    # The shared OpenAI limiter decides how many of these workers are actually
+    # in flight, so the pool only needs to be as large as its ceiling.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
+        future_to_event = {executor.submit(process_event, event, prompts, mode): event for event in events}
+        for future in tqdm(concurrent.futures.as_completed(future_to_event), total=len(events), desc=f"Processing new events for {label}"):
+            try:
+                processed_event = future.result()
+                processed_events.append(processed_event)
+                on_complete(processed_event)
+                metrics.incr('summarize.events')
+            except Exception as exc:
+                metrics.incr('summarize.failed')
+                event_title = future_to_event[future].get('title', 'Unknown Event')
+                print(f"'{event_title}' generated an exception: {exc}")
+    return processed_events
+
+async def summarize_events_async(events, prompts, mode, label, completed, max_in_flight, on_complete=_noop):
+    """
+    Summarizes events concurrently on the event loop, appending to ``completed``.
+
+    At most ``max_in_flight`` events are processed at once (the adaptive
+    limiter in util.openai_caller may allow fewer requests). Results are added
+    to ``completed`` as they finish, so the caller keeps them if the run is
+    cancelled part-way.
+    """
+    semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def worker(event):
+        async with semaphore:
+            return await aprocess_event(event, prompts, mode)
+
+    tasks = {asyncio.create_task(worker(event)): event for event in events}
+    try:
+        with tqdm(total=len(tasks), desc=f"Processing new events for {label}") as progress:
+            for task in asyncio.as_completed(tasks):
+                try:
+                    processed_event = await task
+                    completed.append(processed_event)
+                    on_complete(processed_event)
+                    metrics.incr('summarize.events')
+                except Exception as exc:
+                    metrics.incr('summarize.failed')
+                    print(f"An event generated an exception: {exc}")
+                progress.update(1)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def run_async_engine(events, prompts, mode, label, max_in_flight=DEFAULT_ASYNC_IN_FLIGHT, on_complete=_noop):
+    """
+    Summarizes events with asyncio; returns (processed events, interrupted).
+
+    Ctrl-C cancels the outstanding requests but keeps the events that already
+    finished so they can still be saved.
+    """
+    completed = []
+    try:
+        asyncio.run(summarize_events_async(events, prompts, mode, label, completed, max_in_flight, on_complete))
+    except KeyboardInterrupt:
+        print(f"\nInterrupted: keeping {len(completed)} of {len(events)} events completed for {label}.")
+        return completed, True
+    return completed, False
+
+def run_stream_engine(event_queue, prompts, mode, on_complete, workers=MAX_CONCURRENCY):
+    """
+    Summarizes ``(state, event)`` items from ``event_queue`` until ``STREAM_DONE`` arrives.
+
+    ``workers`` threads take events off the queue as producers (the scrapers)
+    put them on, and ``on_complete(state, event)`` stores each result. Failed
+    events stay pending in the store for the next run. Returns
+    ``(processed, failed)`` counts.
+    """
+    counts = {'processed': 0, 'failed': 0}
+    counts_lock = threading.Lock()
+    progress = tqdm(desc="Processing streamed events")
+
+    def worker():
+        while True:
+            item = event_queue.get()
+            if item is STREAM_DONE:
+                # Pass the marker on so every other worker stops too
+                event_queue.put(STREAM_DONE)
+                return
+            state, event = item
+            try:
+                on_complete(state, process_event(event, prompts, mode))
+                key = 'processed'
+            except Exception as exc:
+                print(f"'{event.get('title', 'Unknown Event')}' generated an exception: {exc}")
+                key = 'failed'
+            metrics.incr(f'summarize.{"events" if key == "processed" else key}')
+            with counts_lock:
+                counts[key] += 1
+                progress.update(1)
+
+    threads = [threading.Thread(target=worker, name=f'summarizer-{i}', daemon=True) for i in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    progress.close()
+    return counts['processed'], counts['failed']
+
+def _step(steps, response=None, error=None, start=False):
+    """
+    Advances an event_requests generator.
+
+    Returns its next request, None when the event is done, or the exception
+    the event failed with.
+    """
+    try:
+        if start:
+            return next(steps)
+        if error is not None:
+            return steps.throw(error)
+        return steps.send(response)
+    except StopIteration:
+        return None
+    except Exception as e:
+        return e
+
+def run_batch_engine(events, prompts, mode, label, backend=None, poll_interval=DEFAULT_BATCH_POLL_INTERVAL,
+                     on_complete=_noop, wait=True):
+    """
+    Summarizes events through the OpenAI Batch API; returns the processed events.
+
+    Each round submits the next outstanding request of every event as one
+    batch (usually a single round in combined mode). Cached answers are used
+    without submitting them, and batch answers are written back to the cache.
+
+    A batch left behind by an earlier run for ``label`` is collected first and
+    its answers are used like cached ones. With ``wait`` unset, a batch that is
+    still running ends the run for ``label``; run again later to collect it.
+    Events whose request failed are not stored and stay pending.
+    """
+    cache = get_cache()
+    try:
+        answers = resume_batch(label, backend, poll_interval, wait=wait)
+    except BatchPendingError as e:
+        print(f"{e}; run again later to collect it.")
+        return []
+    if not answers:
+        # No batch left behind, or it ended (failed, expired, input gone) without usable answers
+        forget_batch(label)
+    if cache:
+        for (system, prompt), answer in answers.items():
+            cache.put(MODEL, system, prompt, answer)
+    pending = {}
+    failed = set()
+
+    def advance(custom_id, steps, request, event):
+        """Stores a finished event, drops a failed one and keeps the rest pending."""
+        if isinstance(request, Exception):
+            pending.pop(custom_id, None)
+            failed.add(id(event))
+            metrics.incr('summarize.failed')
+            print(f"'{event.get('title', 'Unknown Event')}' generated an exception: {request}")
+        elif request is None:
+            pending.pop(custom_id, None)
+            on_complete(event)
+            metrics.incr('summarize.events')
+        else:
+            pending[custom_id] = (steps, request, event)
+
+    for index, event in enumerate(events):
+        steps = event_requests(event, prompts, mode)
+        advance(f'{label}-{index}', steps, _step(steps, start=True), event)
+
+    run_id = time.strftime('%Y%m%d%H%M%S')
+    round_number = 0
+    while pending:
+        to_submit = []
+        for custom_id, (steps, request, event) in list(pending.items()):
+            while isinstance(request, tuple):
+                cached = answers.get((SYSTEM_PROMPTS[request[0]], request[1]))
+                if cached is None and cache:
+                    cached = cache.get(MODEL, SYSTEM_PROMPTS[request[0]], request[1])
+                if cached is None:
+                    break
+                request = _step(steps, response=cached)
+            advance(custom_id, steps, request, event)
+            if custom_id in pending:
+                to_submit.append((custom_id, SYSTEM_PROMPTS[request[0]], request[1]))
+        if answers:
+            # The earlier run's answers are merged into the events now
+            forget_batch(label)
+            answers = {}
+        if not to_submit:
+            break
+
+        round_number += 1
+        print(f"Submitting batch round {round_number} for {label}: {len(to_submit)} requests")
+        try:
+            results = run_batch(to_submit, f'{label}_{run_id}_round{round_number}', backend, poll_interval,
+                                key=label, wait=wait)
+        except BatchPendingError as e:
+            print(f"{e}; run again later to collect it.")
+            break
+        for custom_id, system, prompt in to_submit:
+            steps, (kind, _), event = pending[custom_id]
+            result = results[custom_id]
+            if kind == JSON_REQUEST and not isinstance(result, Exception):
+                try:
+                    result = validate_json_content(result)
+                except ValueError as e:
+                    result = e
+            if isinstance(result, Exception):
+                request = _step(steps, error=result)
+            else:
+                if cache:
+                    cache.put(MODEL, system, prompt, result)
+                request = _step(steps, response=result)
+            advance(custom_id, steps, request, event)
+        forget_batch(label)
+    unfinished = {id(event) for _, _, event in pending.values()} | failed
+    return [event for event in events if id(event) not in unfinished]
+
+def main(mode=MODE_COMBINED, engine=ENGINE_THREAD, max_in_flight=DEFAULT_ASYNC_IN_FLIGHT,
+         reprocess=False, batch_backend=None, batch_poll_interval=DEFAULT_BATCH_POLL_INTERVAL, dedupe=True,
+         batch_wait=True):
+    """
+    Summarizes pending raw events for every scraper and stores them in the event store.
+
+    Listings whose content fingerprint changed since they were summarized
+    (see ``util.fingerprint``) are summarized again and replace their event.
+    ``reprocess`` re-summarizes every already-processed event as well (e.g.
+    after a prompt change); results replace the stored events by URL. With
+    ``dedupe`` set, listings that are near-duplicates of another event are
+    linked to it first and not summarized. ``batch_wait=False`` makes the batch
+    engine submit (or check) its batch and return instead of polling it.
+    """
     scraper_dir = 'scrapers'
-    raw_data_dir = 'raw_data'
-    processed_data_dir = 'processed_data'
-    prompts_path = 'prompts/prompts.json'
+    store = get_store()
 
     # Load prompts once
-    prompts = load_json_file(prompts_path)
-    summarize_prompt_template = prompts['summarize_description']
-    date_formatter_prompt_template = prompts['date_formatter']
+    prompts = load_json_file(PROMPTS_PATH)
+
+    if dedupe:
+        from util.dedupe import link_duplicates
+
+        indexed, linked = link_duplicates(store)
+        metrics.incr('dedupe.linked', linked)
+        if indexed:
+            print(f"Near-duplicates: indexed {indexed} events, linked {linked} to an existing listing.")
 
     scraper_files = [f for f in os.listdir(scraper_dir) if f.endswith('_scraper.py')]
 
@@ -59,51 +456,102 @@ def main():
         state_prefix = scraper_file.replace('_scraper.py', '')
         print(f"--- Processing data for {state_prefix.upper()} ---")
 
-        raw_data_path = os.path.join(raw_data_dir, f'{state_prefix}_raw_data.json')
-        processed_data_path = os.path.join(processed_data_dir, f'{state_prefix}_processed_data.json')
+        # Raw listings that have no processed event yet, then the ones that changed since
+        new_events = store.pending_events(state_prefix)
+        changed_events = store.changed_events(state_prefix)
+        metrics.incr('summarize.changed', len(changed_events))
+        if changed_events:
+            print(f"{len(changed_events)} listings changed since they were summarized; summarizing them again.")
+        new_events += changed_events
+        if reprocess:
+            changed_urls = {event['url'] for event in changed_events}
+            new_events = [event for event in store.processed_events(state_prefix, canonical_only=dedupe)
+                          if event['url'] not in changed_urls] + new_events
 
-        if not os.path.exists(raw_data_path):
-            print(f"Raw data file not found for {state_prefix}, skipping.")
+        if not new_events:
+            print(f"No new events to process for {state_prefix.upper()}.")
+            print(f"Total events for {state_prefix.upper()}: {store.count(state_prefix)}")
             continue
 
-        # Load data
-        events = load_json_file(raw_data_path)
+        label = state_prefix.upper()
+        interrupted = False
+        # Every finished event is committed immediately, so a crash or Ctrl-C
+        # only loses in-flight work; the next run picks up what is still pending.
+        save_event = functools.partial(store.put_event, state_prefix)
+        with metrics.span('summarize.state', state=state_prefix, engine=engine, events=len(new_events)):
+            if engine == ENGINE_ASYNC:
+                processed_new_events, interrupted = run_async_engine(new_events, prompts, mode, label, max_in_flight,
+                                                                     save_event)
+            elif engine == ENGINE_BATCH:
+                processed_new_events = run_batch_engine(new_events, prompts, mode, label, batch_backend,
+                                                        batch_poll_interval, save_event, batch_wait)
+            else:
+                processed_new_events = run_thread_engine(new_events, prompts, mode, label, save_event)
 
-        # Load existing processed data if it exists
-        if os.path.exists(processed_data_path):
-            processed_events = load_json_file(processed_data_path)
-        else:
-            processed_events = []
-        
-        # Create a set of existing URLs for quick lookup
-        existing_urls = {event['url'] for event in processed_events if 'url' in event}
+        print(f"\nSuccessfully processed {len(processed_new_events)} new events for {label}.")
+        if len(processed_new_events) < len(new_events):
+            print(f"{len(new_events) - len(processed_new_events)} events were not processed and stay pending; "
+                  f"run again to retry them.")
+        print(f"Total events for {label} now: {store.count(state_prefix)}")
+        print(f"Processed data saved to {store.path}\n")
 
-        # Filter out events that are already processed
-        new_events = [event for event in events if event.get('url') not in existing_urls]
+        if interrupted:
+            raise KeyboardInterrupt
 
-        if not new_events:
-            print(f"No new events to process for {state_prefix.upper()}.")
-            print(f"Total events for {state_prefix.upper()}: {len(processed_events)}")
-            continue
+    print_run_stats(store)
 
-        processed_new_events = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_event = {executor.submit(process_event, event, summarize_prompt_template, date_formatter_prompt_template): event for event in new_events}
-            for future in tqdm(concurrent.futures.as_completed(future_to_event), total=len(new_events), desc=f"Processing new events for {state_prefix.upper()}"):
-                try:
-                    processed_event = future.result()
-                    processed_new_events.append(processed_event)
-                except Exception as exc:
-                    event_title = future_to_event[future].get('title', 'Unknown Event')
-                    print(f"'{event_title}' generated an exception: {exc}")
+def print_run_stats(store):
+    """Indexes new events for search and prints deadline-parser, prompt-token and LLM-cache statistics."""
+    indexed = update_index(store)
+    if indexed:
+        print(f"Search index: indexed {indexed} new or updated events.")
+
+    metrics.gauge('deadlines.parsed_locally', deadline_stats.parsed)
+    metrics.gauge('deadlines.llm_fallbacks', deadline_stats.fallbacks)
+    if deadline_stats.parsed or deadline_stats.fallbacks:
+        print(f"Deadlines: {deadline_stats.parsed} parsed locally, {deadline_stats.fallbacks} sent to OpenAI ({deadline_stats.fallback_rate:.0%} fallback rate)")
 
-        processed_events.extend(processed_new_events)
+    if compaction_stats.descriptions:
+        print(f"Prompt compaction: {compaction_stats.tokens_before} description tokens cut to {compaction_stats.tokens_after} "
+              f"({compaction_stats.tokens_saved} saved, {compaction_stats.saved_rate:.0%}); "
+              f"{compaction_stats.truncated} descriptions truncated to the token budget")
+    usage = usage_stats.snapshot()
+    if usage['prompt_tokens']:
+        print(f"Prompt tokens: {usage['prompt_tokens']} sent, {usage['cached_prompt_tokens']} served from OpenAI's prompt cache")
 
-        # Save the processed data
-        save_json_file(processed_events, processed_data_path)
-        print(f"\nSuccessfully processed {len(new_events)} new events for {state_prefix.upper()}.")
-        print(f"Total events for {state_prefix.upper()} now: {len(processed_events)}")
-        print(f"Processed data saved to {processed_data_path}\n")
+    stats = cache_stats()
+    for key in ('hits', 'misses', 'evictions'):
+        if key in stats:
+            metrics.gauge(f'llm_cache.{key}', stats[key])
+    if stats:
+        print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), {stats['evictions']} evicted")
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description="Summarize new raw listings with OpenAI.")
+    parser.add_argument('--mode', choices=SUMMARY_MODES, default=MODE_COMBINED,
+                        help="'combined' extracts summary and deadline in one request; 'separate' uses two sequential requests")
+    parser.add_argument('--engine', choices=ENGINES, default=ENGINE_THREAD,
+                        help="'thread' uses a thread pool; 'async' uses AsyncOpenAI for many concurrent requests; "
+                             "'batch' submits requests through the OpenAI Batch API")
+    parser.add_argument('--max-in-flight', type=int, default=DEFAULT_ASYNC_IN_FLIGHT,
+                        help="Upper bound on events processed concurrently by the async engine")
+    parser.add_argument('--reprocess', action='store_true',
+                        help="Re-summarize every processed event too (e.g. after changing prompts); results are merged by URL")
+    parser.add_argument('--batch-poll-interval', type=int, default=DEFAULT_BATCH_POLL_INTERVAL,
+                        help="Seconds between batch status checks (batch engine)")
+    parser.add_argument('--batch-no-wait', action='store_true',
+                        help="Batch engine: submit the batch (or check the one already running) and exit instead of "
+                             "polling; run again later to collect the results")
+    parser.add_argument('--no-dedupe', action='store_true',
+                        help="Summarize near-duplicate listings instead of linking them to the first copy")
+    parser.add_argument('--local-batch', action='store_true',
+                        help="Batch engine: run batches in-process through the interactive API instead of the Batch API")
+    parser.add_argument('--max-description-tokens', type=int, default=DEFAULT_MAX_TOKENS,
+                        help="Truncate each compacted description to this many tokens (0 = no limit)")
+    parser.add_argument('--no-compact', action='store_true',
+                        help="Send descriptions as scraped, without boilerplate removal or truncation")
+    args = parser.parse_args()
+    configure_compaction(enabled=not args.no_compact, max_tokens=args.max_description_tokens or None)
+    main(mode=args.mode, engine=args.engine, max_in_flight=args.max_in_flight, reprocess=args.reprocess,
+         batch_backend=LocalBatchBackend(interactive_responder) if args.local_batch else None,
+         batch_poll_interval=args.batch_poll_interval, dedupe=not args.no_dedupe, batch_wait=not args.batch_no_wait)
@@ -1,44 +1,99 @@
-# read art_calls2.xlsx and art_calls.xlsx
+# Sync columns of art_calls.xlsx from a reviewer copy (art_calls2.xlsx by default).
+
+# Uses url as the identifier. For each row of art_calls.xlsx whose url appears in the
+# source file, the synced columns (topics by default) take the source values. Cells are
+# updated in place, so hyperlinks and formatting added by util/excel_writer.py survive.
+import argparse
 
-# use url as the identifier. Update art_calls.xlsx. For each row, the 'topics' column should be the topics from art_calls2.xlsx.
 import pandas as pd
+from openpyxl import load_workbook
+
+DEFAULT_SOURCE = 'art_calls2.xlsx'
+DEFAULT_TARGET = 'art_calls.xlsx'
+DEFAULT_COLUMNS = ('topics',)
+
+def _cell_value(value):
+    """Converts pandas/numpy scalars to plain Python values for openpyxl."""
+    if pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value.item() if hasattr(value, 'item') else value
+
+def reconcile(source_file=DEFAULT_SOURCE, target_file=DEFAULT_TARGET, columns=DEFAULT_COLUMNS):
+    """
+    Copies ``columns`` from ``source_file`` into ``target_file``, matching rows on 'url'.
+
+    Rows whose url is not in the source keep their values. Columns missing from the
+    target are added at the end of its header. Returns a dict of changed cell counts
+    per column, plus the number of changed rows under 'rows'.
+    """
+    columns = list(columns)
+    source = pd.read_excel(source_file, usecols=['url', *columns])
+    source = source.dropna(subset=['url']).drop_duplicates('url', keep='last').set_index('url')
+
+    workbook = load_workbook(target_file)
+    worksheet = workbook.active
+    header = [cell.value for cell in worksheet[1]]
+    if 'url' not in header:
+        raise KeyError('url')
+    for column in columns:
+        if column not in header:
+            header.append(column)
+            worksheet.cell(row=1, column=len(header), value=column)
+    col_idx = {column: header.index(column) for column in ['url', *columns]}
+
+    # Snapshot the target's url and synced columns, indexed by worksheet row number
+    records = [
+        [row[col_idx[column]] if col_idx[column] < len(row) else None for column in ['url', *columns]]
+        for row in worksheet.iter_rows(min_row=2, values_only=True)
+    ]
+    target = pd.DataFrame(records, columns=['url', *columns], index=range(2, len(records) + 2))
+
+    matched = target['url'].isin(source.index)
+    updates = source.reindex(target['url'])
+    updates.index = target.index
+
+    changed = {}
+    changed_rows = pd.Series(False, index=target.index)
+    for column in columns:
+        old, new = target[column], updates[column]
+        differs = matched & (old != new) & ~(old.isna() & new.isna())
+        for row_num, value in new[differs].items():
+            worksheet.cell(row=row_num, column=col_idx[column] + 1).value = _cell_value(value)
+        changed[column] = int(differs.sum())
+        changed_rows |= differs
+    changed['rows'] = int(changed_rows.sum())
+
+    if changed['rows']:
+        workbook.save(target_file)
+    return changed
 
 def update_topics():
     """
     Reads art_calls.xlsx and art_calls2.xlsx, and updates the 'topics' column
     in art_calls.xlsx based on the 'url' column as an identifier.
     """
+    main(DEFAULT_SOURCE, DEFAULT_TARGET, DEFAULT_COLUMNS)
+
+def main(source_file, target_file, columns):
     try:
-        # Read the source of truth for topics
-        df_new_topics = pd.read_excel('art_calls2.xlsx')
-        
-        # Read the file to be updated
-        df_to_update = pd.read_excel('art_calls.xlsx')
-
-        # Create a mapping from url to topics from art_calls2.xlsx
-        # This is efficient and handles missing data well.
-        topic_map = df_new_topics.set_index('url')['topics']
-
-        # Update the topics column in the main dataframe.
-        # The .get(url, original_topic) approach is robust.
-        # It tries to get a new topic from the map, but if the URL isn't found,
-        # it keeps the original topic.
-        df_to_update['topics'] = df_to_update.apply(
-            lambda row: topic_map.get(row['url'], row['topics']),
-            axis=1
-        )
-
-        # Save the updated dataframe back to the original file
-        df_to_update.to_excel('art_calls.xlsx', index=False)
-
-        print("Successfully updated 'topics' in art_calls.xlsx from art_calls2.xlsx.")
+        changed = reconcile(source_file, target_file, columns)
+        details = ', '.join(f"{column}: {changed[column]}" for column in columns)
+        print(f"Updated {changed['rows']} rows in {target_file} from {source_file} ({details}).")
 
     except FileNotFoundError as e:
-        print(f"Error: {e}. Make sure both art_calls.xlsx and art_calls2.xlsx are in the same directory.")
-    except KeyError as e:
-        print(f"Error: Missing column {e}. Please ensure both Excel files have 'url' and 'topics' columns.")
+        print(f"Error: {e}. Make sure both {target_file} and {source_file} exist.")
+    except (KeyError, ValueError) as e:
+        print(f"Error: Missing column {e}. Please ensure both Excel files have 'url' and {', '.join(repr(c) for c in columns)} columns.")
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
 
 if __name__ == "__main__":
-    update_topics()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Sync columns of an Excel workbook from another one, matching rows by url.")
+    parser.add_argument('--source', default=DEFAULT_SOURCE, help="Workbook with the values to copy")
+    parser.add_argument('--target', default=DEFAULT_TARGET, help="Workbook to update in place")
+    parser.add_argument('--columns', nargs='+', default=list(DEFAULT_COLUMNS),
+                        help="Columns to sync (e.g. topics reviewed fees)")
+    args = parser.parse_args()
+    main(args.source, args.target, args.columns)
@@ -1,22 +1,28 @@
 """Command-line orchestrator for the ArtCallFinder pipeline.
 
-Runs all state scrapers, enriches new listings with OpenAI summaries,
-and exports the results to the Excel workbook in a single invocation.
+Archives expired events, runs all state scrapers, enriches new listings with
+OpenAI summaries, and exports the results to the Excel workbook in a single
+invocation.
 """
 
 from __future__ import annotations
 
 import argparse
-import inspect
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from types import ModuleType
-from typing import Iterable
+from typing import Callable, Iterable
 
+from util.metrics import metrics
+from util.prompt_compaction import DEFAULT_MAX_TOKENS
 
 ROOT_DIR = Path(__file__).resolve().parent
 SCRAPER_DIR = ROOT_DIR / "scrapers"
+DEFAULT_STOP_AFTER_KNOWN = 20
+DEFAULT_MAX_SOURCES = 4
+DEFAULT_STREAM_QUEUE_SIZE = 64
 
 
 def configure_logging(verbose: bool) -> None:
@@ -44,43 +50,204 @@ def load_scraper_modules(scraper_dir: Path) -> Iterable[ModuleType]:
             logging.warning("Unable to load scraper file %s", scraper_path)
 
 
-def run_scrapers(max_pages: int | None) -> None:
-    """Import each scraper module and execute its scrape_art_calls function."""
+def load_scrapers(scraper_dir: Path) -> dict[str, type]:
+    """Import scraper modules and return the registered scraper classes by name."""
+    from scrapers.base import SCRAPERS
+
+    for module in load_scraper_modules(scraper_dir):
+        if not any(cls.__module__ == module.__name__ for cls in SCRAPERS.values()):
+            logging.warning("Module %s does not register a scraper; skipping", module.__name__)
+    return dict(SCRAPERS)
+
+
+def run_scrapers(
+    max_pages: int | None,
+    max_workers: int | None = None,
+    cache_dir: Path | None = None,
+    use_cache: bool = True,
+    stop_after_known: int | None = DEFAULT_STOP_AFTER_KNOWN,
+    max_sources: int = DEFAULT_MAX_SOURCES,
+    include_archive: bool = False,
+    on_record: Callable[[str, dict], None] | None = None,
+    parser: str = "auto",
+    parse_processes: int = 0,
+) -> None:
+    """
+    Run every registered scraper, up to ``max_sources`` sources at a time.
+
+    With ``on_record`` set, each scraper streams its new records to it as soon
+    as they are parsed instead of saving them in one batch at the end.
+    """
     logging.info("Running scrapers in %s", SCRAPER_DIR)
-    for module in load_scraper_modules(SCRAPER_DIR):
-        scrape_func = getattr(module, "scrape_art_calls", None)
-        if not callable(scrape_func):
-            logging.warning("Module %s does not expose scrape_art_calls; skipping", module.__name__)
-            continue
+    from scrapers.parsing import configure_parsing, shutdown_parse_pool
+    from util.http_client import configure_cache
+
+    configure_cache(cache_dir=cache_dir, enabled=use_cache)
+    configure_parsing(parser, parse_processes)
+    scrapers = load_scrapers(SCRAPER_DIR)
+
+    kwargs = {"max_pages": max_pages, "stop_after_known": stop_after_known, "include_archive": include_archive}
+    if max_workers is not None:
+        kwargs["max_workers"] = max_workers
+
+    failures = []
+    with metrics.span("stage.scrape", streaming=on_record is not None), ThreadPoolExecutor(max_workers=max(1, min(max_sources, len(scrapers) or 1))) as executor:
+        futures = {}
+        for name, scraper_cls in scrapers.items():
+            logging.info("→ %s", name)
+            if on_record is None:
+                futures[executor.submit(scraper_cls().run, **kwargs)] = name
+            else:
+                futures[executor.submit(scraper_cls().stream, on_record, **kwargs)] = name
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                art_calls = future.result()
+                logging.info("%s scraped %d new listings", name, len(art_calls))
+            except Exception as exc:  # pragma: no cover - defensive logging
+                logging.exception("Scraper %s failed: %s", name, exc)
+                failures.append(name)
 
-        scraper_name = module.__name__.split(".")[-1]
-        logging.info("→ %s", scraper_name)
+    shutdown_parse_pool()
+    if failures:
+        raise RuntimeError(f"Scrapers failed: {', '.join(sorted(failures))}")
 
-        try:
-            params = inspect.signature(scrape_func).parameters
-            if max_pages is not None and "max_pages" in params:
-                scrape_func(max_pages=max_pages)
-            else:
-                scrape_func()
-        except Exception as exc:  # pragma: no cover - defensive logging
-            logging.exception("Scraper %s failed: %s", scraper_name, exc)
-            raise
 
+def run_archive() -> None:
+    """Move events whose deadline has passed out of the active set."""
+    from util.event_store import get_store
 
-def run_summarizer() -> None:
+    store = get_store()
+    with metrics.span("stage.archive"):
+        moved = store.archive_expired()
+    metrics.gauge("events.archived_this_run", moved)
+    logging.info("Archived %d expired events; %d active events remain", moved, store.count())
+
+
+def run_summarizer(mode: str = "combined", engine: str = "thread") -> None:
     """Process raw listings into structured JSON via OpenAI."""
-    logging.info("Running event_summarizer.py")
+    logging.info("Running event_summarizer.py (%s mode, %s engine)", mode, engine)
     from event_summarizer import main as summarize_main
 
-    summarize_main()
+    with metrics.span("stage.summarize", mode=mode, engine=engine):
+        summarize_main(mode=mode, engine=engine)
+
+
+def run_streaming(
+    scraper_kwargs: dict,
+    mode: str = "combined",
+    queue_size: int = DEFAULT_STREAM_QUEUE_SIZE,
+    dedupe: bool = True,
+) -> None:
+    """
+    Scrape and summarize concurrently through a bounded queue.
+
+    Each scraped record is stored, checked for near-duplicates and queued as
+    soon as its detail page is parsed; summarizer workers take records off the
+    queue while the crawl continues. Listings left pending by earlier runs, or
+    changed since they were summarized, are read before the crawl starts and
+    queued alongside, and no URL is queued twice. A full queue makes the
+    scrapers wait, which bounds memory.
+    """
+    import queue
+    import threading
+
+    from event_summarizer import PROMPTS_PATH, STREAM_DONE, load_json_file, print_run_stats, run_stream_engine
+    from util.dedupe import index_event, link_duplicates
+    from util.event_store import get_store
+
+    logging.info("Streaming scraped listings into the summarizer (queue size %d)", queue_size)
+    store = get_store()
+    prompts = load_json_file(PROMPTS_PATH)
+    if dedupe:
+        indexed, linked = link_duplicates(store)
+        logging.info("Near-duplicates: indexed %d earlier listings, linked %d", indexed, linked)
+
+    events: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+    lock = threading.Lock()
+    queued: set[str] = set()
+    skipped = [0]
+
+    def put(state: str, record: dict) -> None:
+        with lock:
+            if record["url"] in queued:
+                return
+            queued.add(record["url"])
+        events.put((state, record))
+
+    def enqueue(state: str, record: dict) -> None:
+        if dedupe:
+            # Serialized so two copies scraped at the same moment still see each other
+            with lock:
+                duplicate = index_event(store, record["url"], state, record)
+            if duplicate:
+                skipped[0] += 1
+                return
+        put(state, record)
+
+    # Read before the scrapers start, so a listing stored by this run is only
+    # queued by enqueue, after its near-duplicate check
+    backlog = [
+        (state, event)
+        for state in store.states()
+        for event in store.pending_events(state) + store.changed_events(state)
+    ]
+
+    def queue_pending() -> None:
+        for state, event in backlog:
+            put(state, event)
+
+    result: dict[str, tuple[int, int]] = {}
+    consumer = threading.Thread(
+        target=lambda: result.update(counts=run_stream_engine(events, prompts, mode, store.put_event)),
+        name="summarizer",
+    )
+    seeder = threading.Thread(target=queue_pending, name="pending-listings")
+    with metrics.span("stage.stream", queue_size=queue_size):
+        consumer.start()
+        seeder.start()
+        try:
+            run_scrapers(**scraper_kwargs, on_record=enqueue)
+        finally:
+            seeder.join()
+            events.put(STREAM_DONE)
+            consumer.join()
+    metrics.incr("dedupe.linked", skipped[0])
 
+    processed, failed = result.get("counts", (0, 0))
+    logging.info(
+        "Streamed %d events into the store (%d failed, %d near-duplicates skipped)", processed, failed, skipped[0]
+    )
+    print_run_stats(store)
 
-def run_excel_export() -> None:
-    """Append new listings to the Excel workbook."""
+
+def run_topic_normalizer() -> None:
+    """Map new topic labels onto the canonical vocabulary."""
+    logging.info("Normalizing topic labels")
+    from util.topic_normalizer import normalize_topics
+
+    with metrics.span("stage.normalize"):
+        new_labels, updated = normalize_topics()
+    logging.info("Resolved %d new topic labels; updated %d events", new_labels, updated)
+
+
+def run_excel_export(rebuild: bool = False, include_archive: bool = False, stream: bool = False) -> None:
+    """Append new listings to the Excel workbook, or rewrite it when ``rebuild`` is set."""
     logging.info("Exporting processed data to Excel")
     from util.excel_writer import write_to_excel
 
-    write_to_excel()
+    with metrics.span("stage.export", rebuild=rebuild):
+        write_to_excel(rebuild=rebuild, include_archive=include_archive, stream=stream)
+
+
+def write_metrics(metrics_out: Path | None, trace_out: Path | None) -> None:
+    """Write the run report and the Chrome trace, when requested."""
+    if metrics_out:
+        metrics.write_report(metrics_out)
+        logging.info("Wrote run metrics to %s", metrics_out)
+    if trace_out:
+        metrics.write_trace(trace_out)
+        logging.info("Wrote trace events to %s (open in chrome://tracing or ui.perfetto.dev)", trace_out)
 
 
 def ensure_api_key_available(required: bool) -> None:
@@ -114,39 +281,173 @@ def ensure_api_key_available(required: bool) -> None:
 def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
     """Parse orchestrator command-line arguments."""
     parser = argparse.ArgumentParser(description="Run the ArtCallFinder data pipeline end-to-end.")
+    parser.add_argument("--skip-archive", action="store_true", help="Keep expired events in the active set this run")
     parser.add_argument("--skip-scrape", action="store_true", help="Skip running the web scrapers")
     parser.add_argument("--skip-summarize", action="store_true", help="Skip the OpenAI summarization step")
+    parser.add_argument("--skip-normalize", action="store_true", help="Skip the topic normalization step")
     parser.add_argument("--skip-export", action="store_true", help="Skip exporting to Excel")
-    parser.add_argument("--max-pages", type=int, help="Limit paginated scraper requests (applies to scrapers that accept max_pages)")
+    parser.add_argument(
+        "--rebuild-excel",
+        action="store_true",
+        help="Rewrite art_calls.xlsx from the event store instead of appending (keeps the review columns)",
+    )
+    parser.add_argument(
+        "--stream-excel-append",
+        action="store_true",
+        help="Append to art_calls.xlsx in constant memory by rewriting its values (drops formatting and other sheets)",
+    )
+    parser.add_argument(
+        "--include-archive",
+        action="store_true",
+        help="Treat archived (expired) events as active: scrapers preload their URLs and the export includes them",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Overlap scraping and summarizing: scraped listings go straight to summarizer workers (thread engine)",
+    )
+    parser.add_argument(
+        "--stream-queue-size",
+        type=int,
+        default=DEFAULT_STREAM_QUEUE_SIZE,
+        help="Streaming mode: maximum scraped listings waiting for a summarizer worker",
+    )
+    parser.add_argument("--max-pages", type=int, help="Limit the number of listing pages each scraper requests")
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        help="Maximum concurrent detail-page fetches per scraper (per-host politeness limits still apply)",
+    )
+    parser.add_argument(
+        "--max-sources",
+        type=int,
+        default=DEFAULT_MAX_SOURCES,
+        help="Maximum number of scraper sources to run in parallel",
+    )
+    parser.add_argument(
+        "--stop-after-known",
+        type=int,
+        default=DEFAULT_STOP_AFTER_KNOWN,
+        help="Incremental crawl: stop a date-sorted scraper after this many consecutive already-processed listings "
+        "(sources that aren't sorted newest first are always crawled in full)",
+    )
+    parser.add_argument("--full-crawl", action="store_true", help="Walk every listing page (backfill) instead of stopping early")
+    parser.add_argument(
+        "--summary-mode",
+        choices=("combined", "separate"),
+        default="combined",
+        help="'combined' extracts summary and deadline in one OpenAI request; 'separate' uses two sequential requests",
+    )
+    parser.add_argument(
+        "--summary-engine",
+        choices=("thread", "async"),
+        default="thread",
+        help="'thread' uses a thread pool; 'async' uses AsyncOpenAI for large backfills",
+    )
+    parser.add_argument(
+        "--max-description-tokens",
+        type=int,
+        default=DEFAULT_MAX_TOKENS,
+        help="Truncate each compacted description sent to OpenAI to this many tokens (0 = no limit)",
+    )
+    parser.add_argument(
+        "--no-compact",
+        action="store_true",
+        help="Send descriptions to OpenAI as scraped, without boilerplate removal or truncation",
+    )
+    parser.add_argument("--store", type=Path, help="SQLite event store shared by all steps (default: events.sqlite3)")
+    parser.add_argument(
+        "--parser",
+        choices=("auto", "selectolax", "lxml", "soup"),
+        default="auto",
+        help="HTML parser backend for the scrapers ('auto' picks the fastest installed)",
+    )
+    parser.add_argument(
+        "--parse-processes",
+        type=int,
+        default=0,
+        help="Parse pages in this many worker processes instead of the fetching threads (0 = no process pool)",
+    )
+    parser.add_argument("--cache-dir", type=Path, help="Directory for the scraper HTTP response cache (default: .http_cache)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the scraper HTTP response cache")
+    parser.add_argument(
+        "--metrics-out",
+        type=Path,
+        help="Write a JSON run report (counters, gauges, latency percentiles per stage) to this file",
+    )
+    parser.add_argument("--trace-out", type=Path, help="Write the stage spans as a Chrome trace-event JSON file")
     parser.add_argument("--verbose", action="store_true", help="Enable debug logging")
-    return parser.parse_args(list(argv) if argv is not None else None)
+    args = parser.parse_args(list(argv) if argv is not None else None)
+    if args.stream and args.summary_engine != "thread" and not (args.skip_scrape or args.skip_summarize):
+        parser.error("--stream summarizes with the thread engine; drop --summary-engine or run without --stream")
+    return args
 
 
 def main(argv: Iterable[str] | None = None) -> int:
     args = parse_args(argv)
     configure_logging(args.verbose)
+    metrics.reset()
 
     # Preflight: ensure API key is present if summarization is enabled
     ensure_api_key_available(required=not args.skip_summarize)
 
+    if args.store:
+        from util.event_store import configure_store
+
+        configure_store(str(args.store))
+
+    if not args.skip_summarize:
+        from util.prompt_compaction import configure_compaction
+
+        configure_compaction(enabled=not args.no_compact, max_tokens=args.max_description_tokens or None)
+
     try:
-        if not args.skip_scrape:
-            run_scrapers(args.max_pages)
+        if not args.skip_archive:
+            run_archive()
         else:
-            logging.info("Skipping scrape step")
+            logging.info("Skipping archive step")
+
+        scraper_kwargs = {
+            "max_pages": args.max_pages,
+            "max_workers": args.max_workers,
+            "cache_dir": args.cache_dir,
+            "use_cache": not args.no_cache,
+            "stop_after_known": None if args.full_crawl else args.stop_after_known,
+            "max_sources": args.max_sources,
+            "include_archive": args.include_archive,
+            "parser": args.parser,
+            "parse_processes": args.parse_processes,
+        }
+        if args.stream and not (args.skip_scrape or args.skip_summarize):
+            run_streaming(scraper_kwargs, args.summary_mode, args.stream_queue_size)
+        else:
+            if args.stream:
+                logging.warning("--stream needs both the scrape and summarize steps; running stages in sequence")
+
+            if not args.skip_scrape:
+                run_scrapers(**scraper_kwargs)
+            else:
+                logging.info("Skipping scrape step")
+
+            if not args.skip_summarize:
+                run_summarizer(args.summary_mode, args.summary_engine)
+            else:
+                logging.info("Skipping summarize step")
 
-        if not args.skip_summarize:
-            run_summarizer()
+        if not args.skip_normalize:
+            run_topic_normalizer()
         else:
-            logging.info("Skipping summarize step")
+            logging.info("Skipping topic normalization")
 
         if not args.skip_export:
-            run_excel_export()
+            run_excel_export(args.rebuild_excel, args.include_archive, args.stream_excel_append)
         else:
             logging.info("Skipping Excel export")
     except Exception as exc:  # pragma: no cover - top-level safeguard
         logging.error("Pipeline failed: %s", exc)
         return 1
+    finally:
+        write_metrics(args.metrics_out, args.trace_out)
 
     logging.info("Pipeline finished successfully")
     return 0
@@ -0,0 +1,283 @@
+"""Common framework for arts-council scrapers.
+
+A source subclasses ``ArtCallScraper``, declares where its listing pages live and
+how to parse listing and detail pages, and registers itself with ``@register``.
+The base class owns everything else: loading already-processed URLs for dedupe,
+pagination with the incremental early stop, concurrent detail fetching through
+``util.http_client`` and storing new listings in the event store.
+
+A known listing is fetched again only when its listing-page fields changed
+(its ``listing_fingerprint``, see ``util.fingerprint``), so updated deadlines
+and fees are picked up without re-crawling every detail page. Sources whose
+listing pages show little more than the title set ``recheck_details``: their
+known detail pages are fetched again conditionally (mostly ``304 Not
+Modified`` through the HTTP cache) and compared by content fingerprint.
+"""
+
+import logging
+import re
+
+import requests
+
+from util.event_store import get_store
+from util.fingerprint import content_fingerprint, listing_fingerprint
+from scrapers.parsing import run_parser
+from util.http_client import DEFAULT_MAX_WORKERS, fetch, fetch_iter
+from util.metrics import metrics
+
+FETCH_FAILED = "Could not fetch details."
+DESCRIPTION_NOT_FOUND = "Description not found."
+
+_NON_PRINTABLE_RE = re.compile(r'[^\x20-\x7E\n\r\t]')
+
+SCRAPERS = {}
+
+
+def register(cls):
+    """Class decorator that adds a scraper to the registry under its ``name``."""
+    if not cls.name:
+        raise ValueError(f"Scraper {cls.__name__} must define a name")
+    SCRAPERS[cls.name] = cls
+    return cls
+
+
+def clean_text(text):
+    """Replaces unusual line terminators and other weird whitespace."""
+    if not isinstance(text, str):
+        return text
+    # Replace line separator and paragraph separator characters with a standard newline
+    text = text.replace('\u2028', '\n').replace('\u2029', '\n')
+    # Replace non-breaking spaces with a regular space
+    text = text.replace('\xa0', ' ')
+    # Remove any other non-printable characters
+    return _NON_PRINTABLE_RE.sub('', text)
+
+
+class ArtCallScraper:
+    """
+    Base class for a single listing source.
+
+    Subclasses implement ``page_url``, ``parse_listing`` and ``parse_detail``
+    and may override ``build_record`` to derive fields from the description.
+    """
+
+    #: Source identifier; the event store's state key and the prefix of exported JSON files.
+    name = None
+    #: True if the listing pages are ordered newest first. Only then does a run of
+    #: known listings mean nothing new follows, so only such sources stop early.
+    sorted_newest_first = False
+    #: True if deadlines and fees are only on the detail page. Known listings are
+    #: then re-fetched (conditionally) to detect changes the listing page can't show.
+    recheck_details = False
+
+    def page_url(self, page):
+        """Returns the URL of the 1-based listing page ``page``."""
+        raise NotImplementedError
+
+    def parse_listing(self, content, page):
+        """
+        Parses a listing page.
+
+        Returns a list of listing dicts (each with at least ``title`` and
+        ``url``), or None when the page signals the end of the results.
+        """
+        raise NotImplementedError
+
+    def parse_detail(self, content, url):
+        """Extracts the description text from a detail page."""
+        raise NotImplementedError
+
+    def build_record(self, listing, description):
+        """Combines listing fields and the description into a raw record."""
+        return {
+            'title': listing['title'],
+            'organization': listing.get('organization', 'N/A'),
+            'location': listing.get('location', 'N/A'),
+            'deadline': listing.get('deadline', 'N/A'),
+            'url': listing['url'],
+            'description': description
+        }
+
+    def load_existing_urls(self, include_archive=False):
+        """Returns the set of URLs already processed for this source (active events only by default)."""
+        store = get_store()
+        existing_urls = store.known_urls(self.name, include_archive)
+        logging.info(f"Loaded {len(existing_urls)} existing URLs from {store.path}")
+        return existing_urls
+
+    def is_known(self, url, existing_urls, include_archive=False):
+        """True if ``url`` is in ``existing_urls`` or, unless it was loaded already, in the archive."""
+        if url in existing_urls:
+            return True
+        return not include_archive and get_store().is_archived(url)
+
+    def has_changed(self, listing, fingerprints, unrecorded):
+        """
+        True if a known ``listing`` differs from when it was last scraped.
+
+        ``fingerprints`` maps URLs to their stored listing fingerprint. Known
+        listings stored without one are added to ``unrecorded`` and count as
+        unchanged.
+        """
+        fingerprint = listing_fingerprint(listing)
+        stored = fingerprints.get(listing['url'])
+        if stored is None:
+            unrecorded[listing['url']] = fingerprint
+            return False
+        return stored != fingerprint
+
+    def is_placeholder(self, description):
+        """
+        True if ``description`` is not real listing text: a failed fetch, a page
+        without the description block, or a source's "removed" notice.
+
+        A known listing whose detail page returns a placeholder keeps its stored
+        record and summary instead of counting as changed.
+        """
+        return not (description or '').strip() or description in (FETCH_FAILED, DESCRIPTION_NOT_FOUND)
+
+    def get_details(self, url):
+        """Fetches and parses the details page for an art call."""
+        try:
+            content = fetch(url)
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Error fetching detail page {url}: {e}")
+            return FETCH_FAILED
+        return run_parser('detail', self.parse_detail, content, url)
+
+    def scrape(self, max_pages=None, max_workers=DEFAULT_MAX_WORKERS, stop_after_known=None, include_archive=False):
+        """Crawls listing pages and returns new raw records in listing order (see ``iter_records``)."""
+        return list(self.iter_records(max_pages, max_workers, stop_after_known, include_archive))
+
+    def iter_records(self, max_pages=None, max_workers=DEFAULT_MAX_WORKERS, stop_after_known=None, include_archive=False):
+        """
+        Crawls listing pages and yields new or changed raw records in listing order.
+
+        Detail pages found on each listing page are fetched concurrently (up to
+        ``max_workers`` at a time). Known listings are skipped unless their
+        listing-page fields changed (``has_changed``) or, for sources that
+        ``recheck_details``, their detail page's content fingerprint did. When ``stop_after_known``
+        is set and the source is ``sorted_newest_first`` the crawl is
+        incremental: it stops once that many consecutive listings are already in
+        the processed data and unchanged. Other sources are always crawled in
+        full. Leave it as None for a full crawl (backfills).
+
+        Only active URLs are held in memory; a listing not among them is looked
+        up in the archive index. ``include_archive`` loads archived URLs up front.
+        """
+        if stop_after_known and not self.sorted_newest_first:
+            logging.info(f"{self.name} listings are not sorted by date; crawling every page")
+            stop_after_known = None
+        existing_urls = self.load_existing_urls(include_archive)
+        fingerprints = get_store().listing_fingerprints(self.name)
+        contents = get_store().content_fingerprints(self.name) if self.recheck_details else {}
+        page = 1
+        consecutive_known = 0
+        reached_known = False
+
+        while True:
+            if max_pages and page > max_pages:
+                logging.info(f"Reached max pages limit: {max_pages}. Stopping scrape.")
+                break
+
+            paginated_url = self.page_url(page)
+            logging.info(f"Fetching main opportunities page: {paginated_url}")
+            try:
+                content = fetch(paginated_url)
+            except requests.exceptions.RequestException as e:
+                logging.error(f"Error fetching the main URL: {e}")
+                break
+
+            listings = run_parser('listing', self.parse_listing, content, page)
+            metrics.incr('scrape.pages')
+            if listings is None:
+                logging.info(f"No more listings found on page {page}. Ending scrape.")
+                break
+
+            logging.info(f"Found {len(listings)} art calls on page {page}. Scraping details...")
+
+            pending = []
+            recheck = []
+            changed = set()
+            unrecorded = {}
+            for listing in listings:
+                if not self.is_known(listing['url'], existing_urls, include_archive):
+                    logging.info(f"Scraping details for: {listing['title']}")
+                elif self.has_changed(listing, fingerprints, unrecorded):
+                    logging.info(f"Listing changed since it was scraped, fetching it again: {listing['url']}")
+                    metrics.incr('scrape.changed')
+                    changed.add(listing['url'])
+                else:
+                    logging.info(f"Skipping already processed URL: {listing['url']}")
+                    metrics.incr('scrape.known')
+                    if listing['url'] in contents:
+                        recheck.append(listing)
+                    consecutive_known += 1
+                    if stop_after_known and consecutive_known >= stop_after_known:
+                        reached_known = True
+                        break
+                    continue
+
+                consecutive_known = 0
+                pending.append(listing)
+            if unrecorded:
+                get_store().set_listing_fingerprints(self.name, unrecorded)
+
+            to_fetch = pending + recheck
+            descriptions = fetch_iter([listing['url'] for listing in to_fetch], self.get_details, max_workers=max_workers)
+            for index, (listing, description) in enumerate(zip(to_fetch, descriptions)):
+                rechecked = index >= len(pending)
+                if (rechecked or listing['url'] in changed) and self.is_placeholder(description):
+                    # Keep the stored version; the listing still counts as changed next run
+                    logging.info(f"No usable detail page for known listing, keeping it as stored: {listing['url']}")
+                    continue
+                record = self.build_record(listing, description)
+                record['fingerprint'] = content_fingerprint(record)
+                record['listing_fingerprint'] = listing_fingerprint(listing)
+                if rechecked:
+                    if record['fingerprint'] == contents[listing['url']]:
+                        continue
+                    logging.info(f"Detail page changed since it was scraped: {listing['url']}")
+                    metrics.incr('scrape.changed')
+                metrics.incr('scrape.records')
+                yield record
+
+            if reached_known:
+                logging.info(f"Found {consecutive_known} consecutive already processed listings. Stopping incremental scrape.")
+                break
+
+            page += 1
+
+    def save(self, art_calls):
+        """Stores new raw records in the event store for the summarizer to pick up."""
+        if art_calls:
+            store = get_store()
+            logging.info(f"Saving {len(art_calls)} new art calls to {store.path}")
+            store.add_raw(self.name, art_calls)
+        else:
+            logging.info("No new art calls to save.")
+
+    def run(self, **kwargs):
+        """Scrapes and persists this source; returns the new records."""
+        with metrics.span('scrape.source', source=self.name):
+            art_calls = self.scrape(**kwargs)
+            self.save(art_calls)
+        logging.info(f"Scraping {self.name} finished successfully.")
+        return art_calls
+
+    def stream(self, on_record, **kwargs):
+        """
+        Scrapes this source, storing each new record and passing it to ``on_record(name, record)``.
+
+        Records are handed over as soon as their detail page is parsed, so the
+        next stage can start while the crawl goes on. Returns the new records.
+        """
+        store = get_store()
+        art_calls = []
+        with metrics.span('scrape.source', source=self.name, streaming=True):
+            for record in self.iter_records(**kwargs):
+                store.add_raw(self.name, [record])
+                on_record(self.name, record)
+                art_calls.append(record)
+        logging.info(f"Scraping {self.name} finished successfully ({len(art_calls)} new art calls streamed).")
+        return art_calls
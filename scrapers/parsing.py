@@ -0,0 +1,295 @@
+"""HTML parsing backends and precompiled extraction rules for the scrapers.
+
+Scrapers describe the elements they need as ``Rule`` objects (a tag plus an
+optional class or id) built once at import time, and parse pages through the
+active backend, passing the rule that encloses everything they read:
+
+- ``selectolax`` (its Lexbor parser, when installed) and ``lxml`` (when installed)
+  parse the whole page in C and match rules with precompiled CSS/XPath.
+- ``soup`` is the BeautifulSoup fallback. A ``SoupStrainer`` built from the
+  enclosing rule makes it build only the matching subtrees instead of the
+  full tree.
+
+Every backend extracts text the way BeautifulSoup's ``get_text(separator,
+strip=True)`` does: comments and ``script``/``style``/``template`` contents are
+skipped, each string is stripped and empty ones are dropped. Records therefore
+don't depend on which backend is installed.
+
+Only the selected backend's library is imported, when the first page is
+parsed; ``available_backends`` just checks what is installed.
+
+Parsing normally runs on the thread that fetched the page. ``configure_parsing(
+processes=N)`` moves it to a process pool so CPU-bound parsing doesn't hold
+the GIL while other threads wait on the network. Each parse is timed in the
+process that ran it and reported through ``util.metrics`` (``parse.listing``
+and ``parse.detail``), with a debug log line per page.
+"""
+
+import importlib.util
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from util.metrics import metrics
+
+AUTO = 'auto'
+SELECTOLAX = 'selectolax'
+LXML = 'lxml'
+SOUP = 'soup'
+BACKENDS = (AUTO, SELECTOLAX, LXML, SOUP)
+
+_SKIPPED_TEXT_TAGS = frozenset(('script', 'style', 'template'))
+
+
+def _installed(module):
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ImportError:
+        return False
+
+
+class Rule:
+    """A precompiled element selector: a tag name plus an optional class or id."""
+
+    def __init__(self, tag, class_=None, id=None):
+        self.tag = tag
+        self.class_ = class_
+        self.id = id
+        if class_:
+            self.css = f'{tag}.{class_}'
+            self._predicate = f"[contains(concat(' ', normalize-space(@class), ' '), ' {class_} ')]"
+        elif id:
+            self.css = f'{tag}#{id}'
+            self._predicate = f"[@id='{id}']"
+        else:
+            self.css = tag
+            self._predicate = ''
+        self._xpath = None
+
+    @property
+    def xpath(self):
+        """The rule as an lxml XPath, compiled on first use so lxml only loads with its backend."""
+        if self._xpath is None:
+            from lxml import etree
+            self._xpath = etree.XPath(f'descendant::{self.tag}{self._predicate}')
+        return self._xpath
+
+    def soup_kwargs(self):
+        """Keyword arguments for ``find``/``find_all`` and ``SoupStrainer``."""
+        if self.class_:
+            # Match one class among several; a strainer sees the raw attribute string
+            return {'attrs': {'class': lambda value: bool(value) and self.class_ in str(value).split()}}
+        if self.id:
+            return {'id': self.id}
+        return {}
+
+    def __repr__(self):
+        return f'Rule({self.css!r})'
+
+
+def _decode(content):
+    if isinstance(content, str):
+        return content
+    try:
+        return content.decode('utf-8')
+    except UnicodeDecodeError:
+        from bs4 import UnicodeDammit
+        return UnicodeDammit(content).unicode_markup
+
+
+class SoupBackend:
+    """BeautifulSoup with ``html.parser``, restricted to the ``only`` rule's subtrees when given."""
+
+    name = SOUP
+
+    def __init__(self):
+        from bs4 import BeautifulSoup, SoupStrainer
+        self._soup = BeautifulSoup
+        self._strainer = SoupStrainer
+
+    def parse(self, content, only=None):
+        parse_only = self._strainer(only.tag, **only.soup_kwargs()) if only else None
+        return self._soup(content, 'html.parser', parse_only=parse_only)
+
+    def find_all(self, node, rule):
+        return node.find_all(rule.tag, **rule.soup_kwargs())
+
+    def find(self, node, rule):
+        return node.find(rule.tag, **rule.soup_kwargs())
+
+    def text(self, node, separator=''):
+        return node.get_text(separator=separator, strip=True)
+
+    def attr(self, node, name):
+        return node.get(name)
+
+
+class LxmlBackend:
+    """lxml.html with precompiled XPath rules."""
+
+    name = LXML
+
+    def __init__(self):
+        import lxml.html
+        from lxml import etree
+        self._fromstring = lxml.html.document_fromstring
+        self._parser_error = etree.ParserError
+
+    def parse(self, content, only=None):
+        try:
+            return self._fromstring(_decode(content))
+        except self._parser_error:
+            return self._fromstring('<html></html>')
+
+    def find_all(self, node, rule):
+        return rule.xpath(node)
+
+    def find(self, node, rule):
+        found = rule.xpath(node)
+        return found[0] if found else None
+
+    def text(self, node, separator=''):
+        return separator.join(s.strip() for s in self._strings(node) if s.strip())
+
+    def _strings(self, node):
+        if node.tag in _SKIPPED_TEXT_TAGS:
+            return
+        if node.text:
+            yield node.text
+        for child in node:
+            # Comments and processing instructions have a non-string tag; only their tail is text
+            if isinstance(child.tag, str):
+                yield from self._strings(child)
+            if child.tail:
+                yield child.tail
+
+    def attr(self, node, name):
+        return node.get(name)
+
+
+class SelectolaxBackend:
+    """selectolax with CSS rules."""
+
+    name = SELECTOLAX
+
+    def __init__(self):
+        if _installed('selectolax.lexbor'):
+            from selectolax.lexbor import LexborHTMLParser as HTMLParser
+        else:
+            from selectolax.parser import HTMLParser
+        self._parser = HTMLParser
+
+    def parse(self, content, only=None):
+        return self._parser(_decode(content))
+
+    def find_all(self, node, rule):
+        return node.css(rule.css)
+
+    def find(self, node, rule):
+        return node.css_first(rule.css)
+
+    def text(self, node, separator=''):
+        return separator.join(s.strip() for s in self._strings(node) if s.strip())
+
+    def _strings(self, node):
+        for child in node.iter(include_text=True):
+            if child.tag == '-text':
+                yield child.text(deep=False)
+            elif not child.tag.startswith('-') and child.tag not in _SKIPPED_TEXT_TAGS:
+                yield from self._strings(child)
+
+    def attr(self, node, name):
+        return node.attributes.get(name)
+
+
+def available_backends():
+    """Returns the installed backends, fastest first."""
+    backends = []
+    if _installed('selectolax.lexbor') or _installed('selectolax.parser'):
+        backends.append(SELECTOLAX)
+    if _installed('lxml.html'):
+        backends.append(LXML)
+    backends.append(SOUP)
+    return backends
+
+
+_BACKEND_CLASSES = {SELECTOLAX: SelectolaxBackend, LXML: LxmlBackend, SOUP: SoupBackend}
+_backend = None
+_backend_name = AUTO
+_processes = 0
+_pool = None
+_lock = threading.Lock()
+
+
+def configure_parsing(backend=AUTO, processes=0):
+    """
+    Selects the parser backend and whether pages are parsed in a process pool.
+
+    ``backend`` is ``auto`` (the fastest installed), ``selectolax``, ``lxml``
+    or ``soup``; asking for one that isn't installed raises ValueError.
+    ``processes`` > 0 parses pages in that many worker processes.
+    """
+    global _backend, _backend_name, _processes
+    if backend != AUTO and backend not in available_backends():
+        raise ValueError(f"HTML parser backend {backend!r} is not installed (available: {', '.join(available_backends())})")
+    shutdown_parse_pool()
+    with _lock:
+        _backend_name = backend
+        _backend = None
+        _processes = max(0, processes or 0)
+
+
+def get_backend():
+    """Returns the active backend, choosing the fastest installed one for ``auto``."""
+    global _backend
+    with _lock:
+        if _backend is None:
+            name = available_backends()[0] if _backend_name == AUTO else _backend_name
+            _backend = _BACKEND_CLASSES[name]()
+            logging.debug(f"Parsing HTML with {name}")
+        return _backend
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None and _processes:
+            # Spawned workers don't inherit the crawler's threads, sockets or SQLite handles
+            _pool = ProcessPoolExecutor(max_workers=_processes, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=configure_parsing, initargs=(_backend_name,))
+        return _pool
+
+
+def shutdown_parse_pool():
+    """Stops the parse worker processes, if any."""
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def run_parser(kind, func, content, *args):
+    """
+    Calls ``func(content, *args)`` here or in the parse pool and records its cost.
+
+    ``kind`` names the page type (``listing`` or ``detail``). ``func`` must be
+    picklable (a scraper's bound method is) when a pool is configured.
+    """
+    pool = _get_pool()
+    if pool is None:
+        result, seconds = _timed(func, content, *args)
+    else:
+        result, seconds = pool.submit(_timed, func, content, *args).result()
+    metrics.observe(f'parse.{kind}', seconds)
+    metrics.incr('parse.bytes', len(content))
+    logging.debug(f"Parsed {kind} page {args[0] if args else ''} in {seconds * 1000:.1f} ms ({len(content)} bytes)")
+    return result
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from util.event_store import DEFAULT_STORE_PATH, MIGRATED_KEY, EventStore, configure_store, get_store
+from util.openai_caller import configure_cache
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A fresh shared store (``get_store``) in a temporary directory, with the LLM cache turned off."""
+    monkeypatch.chdir(ROOT_DIR)
+    path = str(tmp_path / 'events.sqlite3')
+    seed = EventStore(path)
+    # Nothing to import: keep the repo's raw_data/ and processed_data/ out of the test store
+    seed.set_meta(MIGRATED_KEY, 'test')
+    seed.close()
+    configure_store(path)
+    configure_cache(enabled=False)
+    yield get_store()
+    configure_store(DEFAULT_STORE_PATH)
+    configure_cache()
+
+
+def raw_record(url='https://example.org/mural', title='Mural call', deadline='12/01/2026', description='Paint a mural.'):
+    """Returns a raw record the way the scrapers store it."""
+    return {
+        'title': title,
+        'organization': 'City of Tempe',
+        'location': 'Tempe, AZ',
+        'deadline': deadline,
+        'url': url,
+        'description': description,
+    }
@@ -0,0 +1,58 @@
+from datetime import date
+
+from tests.conftest import raw_record
+
+STATE = 'AZ_arts_council'
+
+
+def _summarized(record, **fields):
+    return {**record, 'topics_EN': ['Mural'], 'fees': '$0', 'requirement': 'Arizona artists', **fields}
+
+
+def test_processed_listings_leave_the_pending_list(store):
+    first = raw_record('https://example.org/first')
+    second = raw_record('https://example.org/second')
+    store.add_raw(STATE, [first, second])
+    assert [event['url'] for event in store.pending_events(STATE)] == [first['url'], second['url']]
+
+    store.put_event(STATE, _summarized(first))
+    assert [event['url'] for event in store.pending_events(STATE)] == [second['url']]
+    assert [event['url'] for event in store.processed_events(STATE)] == [first['url']]
+    assert store.known_urls(STATE) == {first['url']}
+
+
+def test_changed_listing_is_pending_until_summarized_again(store):
+    record = raw_record(description='Paint a mural.')
+    store.add_raw(STATE, [{**record, 'fingerprint': 'v1'}])
+    store.put_event(STATE, _summarized(record, fingerprint='v1'))
+    assert store.changed_events(STATE) == []
+
+    store.add_raw(STATE, [{**record, 'description': 'Paint two murals.', 'fingerprint': 'v2'}])
+    assert [event['description'] for event in store.changed_events(STATE)] == ['Paint two murals.']
+    assert store.pending_events(STATE) == []
+
+    store.put_event(STATE, _summarized(record, description='Paint two murals.', fingerprint='v2'))
+    assert store.changed_events(STATE) == []
+
+
+def test_expired_events_move_to_the_archive(store):
+    expired = _summarized(raw_record('https://example.org/expired', deadline='11/01/2025'))
+    active = _summarized(raw_record('https://example.org/active', deadline='03/01/2026'))
+    rolling = _summarized(raw_record('https://example.org/rolling', deadline='12/31/2025'), rolling=True)
+    store.add_raw(STATE, [expired, active, rolling])
+    store.put_events(STATE, [expired, active, rolling])
+    (_, added_on, _), = [row for row in store.event_rows() if row[2]['url'] == expired['url']]
+
+    assert store.archive_expired(today=date(2026, 1, 1)) == 1
+    assert [event['url'] for event in store.processed_events()] == [active['url'], rolling['url']]
+    assert store.processed_events()[1]['deadline'] == '12/31/2026'
+    assert store.is_archived(expired['url'])
+    assert store.archive_partitions() == [('2025-11', STATE, 1)]
+    assert store.known_urls(STATE) == {active['url'], rolling['url']}
+    assert expired['url'] in store.known_urls(STATE, include_archive=True)
+    assert store.pending_events(STATE) == []
+
+    # Stored again (e.g. the deadline was extended), it comes back with its added_on
+    store.put_event(STATE, {**expired, 'deadline': '06/01/2026'})
+    assert not store.is_archived(expired['url'])
+    assert [row[1] for row in store.event_rows() if row[2]['url'] == expired['url']] == [added_on]
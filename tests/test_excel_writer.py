@@ -0,0 +1,81 @@
+import itertools
+from datetime import datetime, timedelta
+
+import pytest
+from openpyxl import load_workbook
+
+import util.event_store
+from util.excel_writer import SHEET_NAME, _read_sheet, write_to_excel
+from tests.conftest import raw_record
+
+STATE = 'AZ_arts_council'
+MURAL = 'https://example.org/mural'
+SCULPTURE = 'https://example.org/sculpture'
+PRINTS = 'https://example.org/prints'
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    """Store timestamps one second apart, so 'stored again since the export' doesn't depend on timing."""
+    seconds = itertools.count()
+    start = datetime(2026, 1, 1)
+    monkeypatch.setattr(util.event_store, '_now',
+                        lambda: (start + timedelta(seconds=next(seconds))).strftime('%Y-%m-%d %H:%M:%S'))
+
+
+def _event(url, fees='$0'):
+    return {**raw_record(url), 'topics_EN': ['Mural'], 'fees': fees, 'requirement': 'Arizona artists'}
+
+
+def _sheet(path):
+    header, rows = _read_sheet(path)
+    return {values['url']: values for values in (dict(zip(header, row)) for row in rows)}
+
+
+def _review(path, url, **values):
+    """Edits one row by hand, the way reviewers (or replace.py) do."""
+    workbook = load_workbook(path)
+    worksheet = workbook[SHEET_NAME]
+    header = [cell.value for cell in worksheet[1]]
+    for cells in worksheet.iter_rows(min_row=2):
+        if cells[header.index('url')].value == url:
+            for column, value in values.items():
+                cells[header.index(column)].value = value
+    workbook.save(path)
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_append_and_rebuild_keep_reviewers_edits(store, tmp_path, stream):
+    output = str(tmp_path / 'art_calls.xlsx')
+    store.put_events(STATE, [_event(MURAL), _event(SCULPTURE)])
+    write_to_excel(store, output)
+    assert list(_sheet(output)) == [MURAL, SCULPTURE]
+
+    _review(output, MURAL, reviewed='Y', topics='Public Art')
+    _review(output, SCULPTURE, reviewed='Y', fees='$5 (checked)')
+    store.put_event(STATE, _event(SCULPTURE, fees='$25'))
+    store.put_event(STATE, _event(PRINTS))
+    write_to_excel(store, output, stream=stream)
+
+    sheet = _sheet(output)
+    assert list(sheet) == [MURAL, SCULPTURE, PRINTS]
+    assert (sheet[MURAL]['reviewed'], sheet[MURAL]['topics']) == ('Y', 'Public Art')
+    # Summarized again: the new summary replaces the edit, the review status stays
+    assert (sheet[SCULPTURE]['reviewed'], sheet[SCULPTURE]['fees']) == ('Y', '$25')
+    assert sheet[PRINTS]['reviewed'] == 'N'
+
+    write_to_excel(store, output, rebuild=True)
+    assert _sheet(output) == sheet
+
+
+def test_rebuild_drops_the_edit_of_a_listing_summarized_again(store, tmp_path):
+    output = str(tmp_path / 'art_calls.xlsx')
+    store.put_events(STATE, [_event(MURAL), _event(SCULPTURE)])
+    write_to_excel(store, output)
+    _review(output, MURAL, fees='$5 (checked)')
+    _review(output, SCULPTURE, fees='$5 (checked)')
+    store.put_event(STATE, _event(SCULPTURE, fees='$25'))
+
+    write_to_excel(store, output, rebuild=True)
+    sheet = _sheet(output)
+    assert (sheet[MURAL]['fees'], sheet[SCULPTURE]['fees']) == ('$5 (checked)', '$25')
@@ -0,0 +1,15 @@
+from types import SimpleNamespace
+
+from util.http_cache import ResponseCache
+
+
+def _response(body):
+    return SimpleNamespace(headers={'ETag': '"v1"'}, content=body)
+
+
+def test_overwriting_an_entry_keeps_the_size_total(tmp_path):
+    cache = ResponseCache(tmp_path, max_bytes=1000)
+    for _ in range(5):
+        cache.put('https://example.org/call', _response(b'x' * 300))
+    assert cache._total_bytes == 300
+    assert cache.get('https://example.org/call')['body'] == b'x' * 300
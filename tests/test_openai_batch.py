@@ -0,0 +1,110 @@
+import functools
+import json
+
+import pytest
+
+import util.openai_batch
+from event_summarizer import load_json_file, PROMPTS_PATH, run_batch_engine
+from tests.conftest import raw_record
+from util.openai_batch import LocalBatchBackend, parse_batch_output, submitted_batch
+
+STATE = 'AZ_arts_council'
+LABEL = 'AZ'
+SUMMARY = json.dumps({'topics_EN': ['Mural'], 'fees': '$0', 'requirement': 'None'})
+
+
+class FakeBatchAPI(LocalBatchBackend):
+    """A resumable LocalBatchBackend; ``statuses`` overrides the status of a batch (default: completed)."""
+
+    resumable = True
+
+    def __init__(self, status='completed'):
+        super().__init__(lambda body: SUMMARY)
+        self.default_status = status
+        self.statuses = {}
+        self.submitted = 0
+
+    def submit(self, input_path):
+        self.submitted += 1
+        batch_id = super().submit(input_path)
+        self.statuses[batch_id] = self.default_status
+        return batch_id
+
+    def status(self, batch_id):
+        status = self.statuses.get(batch_id, 'completed')
+        return status, batch_id if status == 'completed' else None, None
+
+
+@pytest.fixture(autouse=True)
+def batch_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(util.openai_batch, 'BATCH_DIR', tmp_path / 'batch_jobs')
+
+
+def _run(store, backend, wait=True):
+    save_event = functools.partial(store.put_event, STATE)
+    return run_batch_engine(store.pending_events(STATE), load_json_file(PROMPTS_PATH), 'combined', LABEL, backend,
+                            poll_interval=0, on_complete=save_event, wait=wait)
+
+
+def test_pending_batch_is_resumed_not_resubmitted(store):
+    store.add_raw(STATE, [raw_record()])
+    backend = FakeBatchAPI(status='in_progress')
+
+    assert _run(store, backend, wait=False) == []
+    assert store.count(STATE) == 0
+    assert submitted_batch(LABEL) is not None
+
+    assert _run(store, backend, wait=False) == []
+    backend.statuses[submitted_batch(LABEL)[0]] = 'completed'
+    assert len(_run(store, backend)) == 1
+
+    assert backend.submitted == 1
+    assert store.processed_events(STATE)[0]['topics_EN'] == ['Mural']
+    assert submitted_batch(LABEL) is None
+
+
+@pytest.mark.parametrize('status', ['expired', 'failed', 'cancelled'])
+def test_dead_batch_is_forgotten(store, status):
+    store.add_raw(STATE, [raw_record()])
+    backend = FakeBatchAPI(status='in_progress')
+    _run(store, backend, wait=False)
+    batch_id, _ = submitted_batch(LABEL)
+
+    # The batch ends without output and nothing is left to submit
+    backend.statuses[batch_id] = status
+    assert run_batch_engine([], {}, 'combined', LABEL, backend, poll_interval=0) == []
+    assert submitted_batch(LABEL) is None
+
+
+def test_dead_batch_requests_are_submitted_again(store):
+    store.add_raw(STATE, [raw_record()])
+    backend = FakeBatchAPI(status='in_progress')
+    _run(store, backend, wait=False)
+    batch_id, _ = submitted_batch(LABEL)
+
+    backend.statuses[batch_id] = 'expired'
+    backend.default_status = 'completed'
+    assert len(_run(store, backend)) == 1
+    assert backend.submitted == 2
+    assert submitted_batch(LABEL) is None
+
+
+def test_failed_request_stays_pending(store):
+    store.add_raw(STATE, [raw_record()])
+
+    def quota_exceeded(body):
+        raise RuntimeError("insufficient_quota")
+
+    assert _run(store, LocalBatchBackend(quota_exceeded)) == []
+    assert len(store.pending_events(STATE)) == 1
+
+
+def test_parse_batch_output_reports_errors():
+    output = '\n'.join(json.dumps(line) for line in [
+        {'custom_id': 'a', 'response': {'status_code': 200, 'body': {'choices': [{'message': {'content': 'ok'}}]}}},
+        {'custom_id': 'b', 'response': {'status_code': 500, 'body': {}}},
+        {'custom_id': 'c', 'response': None, 'error': {'message': 'expired'}},
+    ])
+    results = parse_batch_output(output)
+    assert results['a'] == 'ok'
+    assert isinstance(results['b'], RuntimeError) and isinstance(results['c'], RuntimeError)
@@ -0,0 +1,10 @@
+from util import prompt_compaction
+from util.prompt_compaction import _cut
+
+
+def test_cut_from_end_drops_only_the_partial_word(monkeypatch):
+    # Without tiktoken a token is four characters, which makes the cut predictable
+    monkeypatch.setattr(prompt_compaction, '_get_encoding', lambda: None)
+    text = 'first line\npartial word one\nlast line'
+    assert _cut(text, 5, from_end=True) == 'word one\nlast line'
+    assert _cut(text, 5) == 'first line\npartial'
@@ -0,0 +1,84 @@
+import pytest
+
+import scrapers.base
+from scrapers.base import DESCRIPTION_NOT_FOUND, ArtCallScraper
+from scrapers.AZ_arts_council_scraper import AZArtsCouncilScraper
+
+STATE = 'TEST'
+
+
+class FakeScraper(ArtCallScraper):
+    """One listing page of title-only listings, like Arizona's."""
+
+    name = STATE
+    recheck_details = True
+
+    def __init__(self, site):
+        self.site = site
+        self.fetched = []
+
+    def page_url(self, page):
+        return page
+
+    def parse_listing(self, content, page):
+        if page > 1:
+            return None
+        return [{'title': title, 'url': url} for url, (title, _) in self.site.items()]
+
+    def get_details(self, url):
+        self.fetched.append(url)
+        return self.site[url][1]
+
+
+@pytest.fixture
+def site(store, monkeypatch):
+    monkeypatch.setattr(scrapers.base, 'fetch', lambda url: b'')
+    monkeypatch.setattr(scrapers.base, 'run_parser', lambda kind, func, content, *args: func(content, *args))
+    return {'https://example.org/mural': ('Mural call', 'Deadline: 12/01/2026')}
+
+
+def _scrape_and_summarize(store, site):
+    scraper = FakeScraper(site)
+    scraper.run(max_workers=1)
+    todo = store.pending_events(STATE) + store.changed_events(STATE)
+    for event in todo:
+        store.put_event(STATE, dict(event, topics_EN=['Any']))
+    return scraper.fetched, [event['url'] for event in todo]
+
+
+def test_recheck_finds_detail_page_changes(store, site):
+    assert _scrape_and_summarize(store, site)[1] == ['https://example.org/mural']
+    # Known and unchanged: fetched again (a 304 through the HTTP cache), not summarized again
+    assert _scrape_and_summarize(store, site) == (['https://example.org/mural'], [])
+
+    site['https://example.org/mural'] = ('Mural call', 'Deadline: 01/15/2027')
+    assert _scrape_and_summarize(store, site)[1] == ['https://example.org/mural']
+    assert _scrape_and_summarize(store, site)[1] == []
+
+
+@pytest.mark.parametrize('placeholder', [DESCRIPTION_NOT_FOUND, ''])
+def test_placeholder_detail_page_keeps_stored_summary(store, site, placeholder):
+    _scrape_and_summarize(store, site)
+    site['https://example.org/mural'] = ('Mural call', placeholder)
+
+    assert _scrape_and_summarize(store, site)[1] == []
+    event, = store.processed_events(STATE)
+    assert event['description'] == 'Deadline: 12/01/2026'
+
+
+def test_legacy_event_is_not_resummarized_for_a_listing_change(store, site):
+    # Summarized before fingerprints existed: the backfill records its raw record's fingerprint
+    store.add_raw(STATE, [{'title': 'Mural call', 'url': 'https://example.org/mural', 'deadline': 'N/A',
+                           'description': 'Deadline: 12/01/2026'}])
+    store.put_event(STATE, {'url': 'https://example.org/mural', 'title': 'Mural call', 'topics_EN': ['Any']})
+    store._conn.execute("DELETE FROM fingerprints")
+    store.backfill_fingerprints(force=True)
+    store.set_listing_fingerprints(STATE, {'https://example.org/mural': 'stale'})
+
+    assert _scrape_and_summarize(store, site)[1] == []
+
+
+def test_az_removed_notice_is_a_placeholder():
+    scraper = AZArtsCouncilScraper()
+    assert scraper.is_placeholder("Mural call\\nThis listing has expired.")
+    assert not scraper.is_placeholder("Mural call\\nDeadline:\\n12/01/2026")
@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+import event_summarizer
+import util.openai_batch
+import util.openai_caller
+from event_summarizer import ENGINE_ASYNC, ENGINE_BATCH, ENGINE_THREAD, main
+from util.deadline_parser import rolling_deadline
+from util.openai_batch import LocalBatchBackend
+from tests.conftest import raw_record
+
+STATE = 'AZ_arts_council'
+SUMMARY = json.dumps({'topics_EN': ['Mural'], 'fees': 'None', 'requirement': 'Arizona artists'})
+
+
+def _quota_exceeded(*args):
+    raise RuntimeError("insufficient_quota")
+
+
+async def _aquota_exceeded(*args):
+    raise RuntimeError("insufficient_quota")
+
+
+@pytest.fixture(autouse=True)
+def batch_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(util.openai_batch, 'BATCH_DIR', tmp_path / 'batch_jobs')
+
+
+def _summarize(engine, responder):
+    main(engine=engine, dedupe=False, batch_backend=LocalBatchBackend(lambda body: responder()))
+
+
+@pytest.mark.parametrize('engine', [ENGINE_THREAD, ENGINE_ASYNC, ENGINE_BATCH])
+def test_api_error_leaves_event_pending(store, monkeypatch, engine):
+    store.add_raw(STATE, [raw_record()])
+    monkeypatch.setattr(util.openai_caller, '_request', _quota_exceeded)
+    monkeypatch.setattr(util.openai_caller, '_arequest', _aquota_exceeded)
+
+    _summarize(engine, _quota_exceeded)
+
+    assert store.count(STATE) == 0
+    assert [event['url'] for event in store.pending_events(STATE)] == ['https://example.org/mural']
+
+
+@pytest.mark.parametrize('engine', [ENGINE_THREAD, ENGINE_ASYNC, ENGINE_BATCH])
+def test_invalid_json_leaves_event_pending(store, monkeypatch, engine):
+    store.add_raw(STATE, [raw_record()])
+    monkeypatch.setattr(util.openai_caller, '_request', lambda system, prompt: 'not json')
+    monkeypatch.setattr(event_summarizer, 'get_openai_response_in_json', lambda prompt: 'not json')
+
+    async def not_json(prompt):
+        return 'not json'
+    monkeypatch.setattr(event_summarizer, 'aget_openai_response_in_json', not_json)
+
+    _summarize(engine, lambda: 'not json')
+
+    assert store.count(STATE) == 0
+    assert len(store.pending_events(STATE)) == 1
+
+
+@pytest.mark.parametrize('engine', [ENGINE_THREAD, ENGINE_ASYNC, ENGINE_BATCH])
+def test_summary_is_stored(store, monkeypatch, engine):
+    store.add_raw(STATE, [raw_record()])
+    monkeypatch.setattr(util.openai_caller, '_request', lambda system, prompt: SUMMARY)
+
+    async def summary(system, prompt):
+        return SUMMARY
+    monkeypatch.setattr(util.openai_caller, '_arequest', summary)
+
+    _summarize(engine, lambda: SUMMARY)
+
+    assert store.pending_events(STATE) == []
+    event, = store.processed_events(STATE)
+    assert event['topics_EN'] == ['Mural']
+    assert event['deadline'] == '12/01/2026'
+
+
+def test_failed_event_is_retried_next_run(store, monkeypatch):
+    store.add_raw(STATE, [raw_record(), raw_record(url='https://example.org/kiln', title='Kiln residency',
+                                                   description='Fire some pots.')])
+
+    def quota_after_first(system, prompt):
+        if 'Fire some pots' in prompt:
+            raise RuntimeError("insufficient_quota")
+        return SUMMARY
+    monkeypatch.setattr(util.openai_caller, '_request', quota_after_first)
+    main(dedupe=False)
+    assert [event['url'] for event in store.pending_events(STATE)] == ['https://example.org/kiln']
+
+    monkeypatch.setattr(util.openai_caller, '_request', lambda system, prompt: SUMMARY)
+    main(dedupe=False)
+    assert store.pending_events(STATE) == []
+    assert store.count(STATE) == 2
+
+
+@pytest.mark.parametrize('answer, description', [
+    ('rolling', 'Paint a mural.'),
+    # A December 31 of another year on a call that says it is rolling
+    ('12/31/2025', 'Paint a mural. Entries are reviewed on a rolling basis.'),
+])
+def test_rolling_answer_marks_event_rolling(store, monkeypatch, answer, description):
+    store.add_raw(STATE, [raw_record(deadline='When filled', description=description)])
+    summary = dict(json.loads(SUMMARY), deadline=answer)
+    monkeypatch.setattr(util.openai_caller, '_request', lambda system, prompt: json.dumps(summary))
+
+    main(dedupe=False)
+
+    event, = store.processed_events(STATE)
+    assert event['rolling'] is True
+    assert event['deadline'] == rolling_deadline()
+    assert store.archive_expired() == 0
+
+
+def test_reprocessed_event_is_normalized_again(store, monkeypatch):
+    from util.topic_normalizer import normalize_topics
+
+    store.put_event(STATE, dict(raw_record(), topics_EN=['Old theme'], topics_canonical=['Old theme']))
+    monkeypatch.setattr(util.openai_caller, '_request', lambda system, prompt: SUMMARY)
+
+    main(dedupe=False, reprocess=True)
+    event, = store.processed_events(STATE)
+    assert event['topics_EN'] == ['Mural'] and 'topics_canonical' not in event
+
+    normalize_topics(store)
+    event, = store.processed_events(STATE)
+    assert event['topics_canonical'] == ['Mural']
@@ -0,0 +1,114 @@
+"""Rule-based deadline normalization.
+
+Turns the deadline strings scraped from the arts-council sites ("12/6/2025",
+"October 31st, 2025", "Monday, December 15, 2025 (11:59 p.m. MST (AZ))",
+"2025-09-11", "Rolling") into the mm/dd/yyyy format the ``date_formatter``
+prompt produces, without an API call. Anything ambiguous (no year, several
+different dates, unknown wording) returns None so the caller can fall back to
+OpenAI.
+"""
+
+import re
+import threading
+from datetime import date
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+_MONTH = (
+    r'(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+    r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?'
+)
+
+_ROLLING_RE = re.compile(r'\b(rolling|ongoing|open until filled|until filled|no deadline)\b')
+_WEEKDAY_RE = re.compile(r'\b(mon|tues?|wed(nes)?|thu(rs?)?|fri|sat(ur)?|sun)(day)?\b\.?,?')
+_ORDINAL_RE = re.compile(r'\b(\d{1,2})(st|nd|rd|th)\b')
+
+_ISO_RE = re.compile(r'\b(\d{4})-(\d{1,2})-(\d{1,2})\b')
+_NUMERIC_RE = re.compile(r'\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4}|\d{2})\b')
+_MONTH_DAY_YEAR_RE = re.compile(r'\b' + _MONTH + r'\s+(\d{1,2}),?\s+(\d{4})\b')
+_DAY_MONTH_YEAR_RE = re.compile(r'\b(\d{1,2})\s+' + _MONTH + r',?\s+(\d{4})\b')
+
+
+def rolling_deadline(today=None):
+    """Deadline used for rolling/ongoing calls: the end of the current year."""
+    return f"12/31/{(today or date.today()).year}"
+
+
+def mentions_rolling(text):
+    """True if ``text`` says the call is rolling, ongoing or open until filled."""
+    return isinstance(text, str) and _ROLLING_RE.search(text.lower()) is not None
+
+
+def is_rolling(deadline):
+    """True if a scraped deadline string describes a rolling call rather than a date."""
+    return mentions_rolling(deadline) and parse_deadline(deadline) == rolling_deadline()
+
+
+def _expand_year(year):
+    year = int(year)
+    if year < 100:
+        # Same pivot as strptime's %y: 69-99 -> 1900s, 00-68 -> 2000s.
+        year += 1900 if year >= 69 else 2000
+    return year
+
+
+def _candidates(text):
+    for match in _ISO_RE.finditer(text):
+        yield int(match.group(1)), int(match.group(2)), int(match.group(3))
+    for match in _NUMERIC_RE.finditer(text):
+        yield _expand_year(match.group(3)), int(match.group(1)), int(match.group(2))
+    for match in _MONTH_DAY_YEAR_RE.finditer(text):
+        yield int(match.group(3)), MONTHS[match.group(1)[:3]], int(match.group(2))
+    for match in _DAY_MONTH_YEAR_RE.finditer(text):
+        yield int(match.group(3)), MONTHS[match.group(2)[:3]], int(match.group(1))
+
+
+def parse_deadline(text):
+    """
+    Returns ``text`` normalized to mm/dd/yyyy, or None if it can't be parsed confidently.
+    """
+    if not isinstance(text, str):
+        return None
+    text = text.strip().lower()
+    if not text:
+        return None
+
+    text = _WEEKDAY_RE.sub(' ', text)
+    text = _ORDINAL_RE.sub(r'\1', text)
+
+    dates = set()
+    for year, month, day in _candidates(text):
+        try:
+            dates.add(date(year, month, day))
+        except ValueError:
+            # e.g. 13/01/2025 or 02/30/2025: let the model deal with it
+            return None
+
+    if len(dates) == 1:
+        return dates.pop().strftime('%m/%d/%Y')
+    if not dates and _ROLLING_RE.search(text):
+        return rolling_deadline()
+    return None
+
+
+class DeadlineStats:
+    """Thread-safe counters for local parses versus OpenAI fallbacks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.parsed = 0
+        self.fallbacks = 0
+
+    def record(self, parsed):
+        with self._lock:
+            if parsed:
+                self.parsed += 1
+            else:
+                self.fallbacks += 1
+
+    @property
+    def fallback_rate(self):
+        total = self.parsed + self.fallbacks
+        return self.fallbacks / total if total else 0.0
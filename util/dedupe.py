@@ -0,0 +1,133 @@
+"""Near-duplicate detection for listings posted under more than one URL.
+
+Each event's title, organization and description are split into word 3-gram
+shingles and reduced to a 128-value MinHash signature. The signature is cut
+into 32 bands of 4 rows; events that share a band hash land in the same LSH
+bucket. Only those candidates are compared, so checking a new event costs
+32 indexed lookups however large the corpus grows. A candidate is linked as
+a duplicate when the signatures agree on at least ``threshold`` of their
+values (an estimate of the Jaccard similarity of the shingle sets) and,
+when both deadlines parse, they are at most ``DEADLINE_TOLERANCE_DAYS``
+apart. Organizers often post a series of calls with the same boilerplate
+description, and the deadline is what tells those apart.
+
+The event that was indexed first stays canonical. Its duplicates are skipped by
+the summarizer and the Excel export, and the scrapers treat them as known::
+
+    python -m util.dedupe            # index new events and print the links
+"""
+
+import argparse
+import hashlib
+import re
+import zlib
+from datetime import date
+
+import numpy as np
+
+from util.deadline_parser import parse_deadline
+from util.event_store import deadline_key, get_store
+
+NUM_PERM = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+MIN_SHINGLES = 8
+DEFAULT_THRESHOLD = 0.7
+DEADLINE_TOLERANCE_DAYS = 1
+MAX_BUCKET_CANDIDATES = 50
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.int64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.int64)
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def shingles(event):
+    """Returns the set of word shingles over the event's title, organization and description."""
+    text = ' '.join(str(event.get(field) or '') for field in ('title', 'organization', 'description'))
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set):
+    """Returns the MinHash signature (``NUM_PERM`` uint32 values) of a shingle set."""
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingle_set), dtype=np.int64,
+                         count=len(shingle_set)) % _PRIME
+    # Values stay below 2**62, so the products never overflow int64.
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0).astype(np.uint32)
+
+
+def bucket_keys(signature):
+    """Returns one ``(band, bucket)`` key per LSH band."""
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(rows.tobytes(), digest_size=8).digest()
+        keys.append((band, int.from_bytes(digest, 'big', signed=True)))
+    return keys
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(signature == other))
+
+
+def deadlines_compatible(deadline, other):
+    """True unless both ``yyyy-mm-dd`` deadlines are known and too far apart."""
+    if not deadline or not other:
+        return True
+    return abs((date.fromisoformat(deadline) - date.fromisoformat(other)).days) <= DEADLINE_TOLERANCE_DAYS
+
+
+def link_duplicates(store=None, threshold=DEFAULT_THRESHOLD):
+    """
+    Indexes every event without a signature and links near-duplicates.
+
+    Returns ``(indexed, linked)`` counts. Events with fewer than
+    ``MIN_SHINGLES`` shingles are indexed but never matched.
+    """
+    store = store or get_store()
+    indexed = linked = 0
+    for url, state, event in store.unindexed_events():
+        linked += index_event(store, url, state, event, threshold)
+        indexed += 1
+    return indexed, linked
+
+
+def index_event(store, url, state, event, threshold=DEFAULT_THRESHOLD):
+    """Stores one event's signature and links it to its closest near-duplicate; returns True if linked."""
+    shingle_set = shingles(event)
+    deadline = deadline_key(parse_deadline(event.get('deadline')))
+    if len(shingle_set) < MIN_SHINGLES:
+        store.add_signature(url, None, deadline, [])
+        return False
+
+    signature = minhash(shingle_set)
+    keys = bucket_keys(signature)
+    best_url, best_similarity = None, threshold
+    for candidate_url, (candidate, candidate_deadline) in store.lsh_candidates(keys, MAX_BUCKET_CANDIDATES).items():
+        if candidate_url == url or not deadlines_compatible(deadline, candidate_deadline):
+            continue
+        score = similarity(signature, np.frombuffer(candidate, dtype=np.uint32))
+        if score >= best_similarity:
+            best_url, best_similarity = candidate_url, score
+    if best_url:
+        store.link_duplicate(url, state, store.canonical_url(best_url), best_similarity)
+    store.add_signature(url, signature.tobytes(), deadline, keys)
+    return best_url is not None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Index events for near-duplicate detection and list the links.")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Minimum estimated Jaccard similarity for a duplicate")
+    args = parser.parse_args()
+    store = get_store()
+    indexed, linked = link_duplicates(store, args.threshold)
+    print(f"Indexed {indexed} events, linked {linked} new near-duplicates")
+    for url, state, canonical_url, score in store.duplicate_links():
+        print(f"{score:.2f}  {state}  {url}\n      -> {canonical_url}")
@@ -0,0 +1,832 @@
+"""Indexed SQLite store shared by the scrapers, the summarizer and the exporter.
+
+Raw listings and processed events live in one database (``events.sqlite3``),
+keyed on their URL, instead of JSON arrays that every stage reloads and
+rewrites in full. Processed events are indexed by state, deadline and
+``added_on``. Each write is its own transaction, so a crash keeps every event
+that was already stored.
+
+Events move to an archive table, partitioned by deadline month, a week after
+their deadline (``archive_expired``). Rolling calls (``"rolling": true``) stay
+active; their December 31 placeholder deadline moves on with the year. The
+scrapers' known-URL sets, the near-duplicate buckets, the search index and the
+Excel export only cover active events unless asked to include the archive.
+
+Each scraped listing's fingerprints (see ``util.fingerprint``) are kept next
+to the fingerprint its processed event was summarized from. A listing whose
+content changed is handed to the summarizer again (``changed_events``) and
+re-checked for near-duplicates; storing its new summary brings it back from
+the archive if it had expired.
+
+The first ``get_store()`` imports the existing ``raw_data/`` and
+``processed_data/`` JSON files once (see ``migrate_json``). ``export_json``
+writes the familiar per-state files back out for anything that still reads
+them::
+
+    python -m util.event_store migrate [--force]
+    python -m util.event_store export
+    python -m util.event_store archive [--grace-days 7]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+
+from util.deadline_parser import is_rolling, rolling_deadline
+from util.fingerprint import content_fingerprint
+from util.journal import atomic_write_json, load_journal
+
+DEFAULT_STORE_PATH = 'events.sqlite3'
+RAW_DATA_DIR = 'raw_data'
+PROCESSED_DATA_DIR = 'processed_data'
+RAW_SUFFIX = '_raw_data.json'
+PROCESSED_SUFFIX = '_processed_data.json'
+JOURNAL_SUFFIX = '_processed_data.journal.jsonl'
+ARCHIVE_GRACE_DAYS = 7
+MIGRATED_KEY = 'json_migrated_at'
+ROLLING_MARKED_KEY = 'rolling_marked_at'
+FINGERPRINTS_BACKFILLED_KEY = 'fingerprints_backfilled_at'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS raw_events (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    state TEXT NOT NULL,
+    scraped_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_raw_events_state ON raw_events(state);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    state TEXT NOT NULL,
+    deadline TEXT,
+    added_on TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_state ON events(state);
+CREATE INDEX IF NOT EXISTS idx_events_deadline ON events(deadline);
+CREATE INDEX IF NOT EXISTS idx_events_added_on ON events(added_on);
+CREATE TABLE IF NOT EXISTS archived_events (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    state TEXT NOT NULL,
+    deadline TEXT,
+    month TEXT,
+    added_on TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    archived_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_archived_events_month ON archived_events(month, state);
+CREATE TABLE IF NOT EXISTS exports (
+    workbook TEXT NOT NULL,
+    url TEXT NOT NULL,
+    exported_at TEXT NOT NULL,
+    PRIMARY KEY (workbook, url)
+);
+CREATE TABLE IF NOT EXISTS signatures (
+    url TEXT PRIMARY KEY,
+    signature BLOB,
+    deadline TEXT
+);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lsh_buckets ON lsh_buckets(band, bucket);
+CREATE INDEX IF NOT EXISTS idx_lsh_buckets_url ON lsh_buckets(url);
+CREATE TABLE IF NOT EXISTS duplicates (
+    url TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    canonical_url TEXT NOT NULL,
+    similarity REAL NOT NULL,
+    linked_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_duplicates_canonical ON duplicates(canonical_url);
+CREATE TABLE IF NOT EXISTS event_terms (
+    field TEXT NOT NULL,
+    term TEXT NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_event_terms ON event_terms(field, term);
+CREATE INDEX IF NOT EXISTS idx_event_terms_url ON event_terms(url);
+CREATE TABLE IF NOT EXISTS term_indexed (
+    url TEXT PRIMARY KEY
+);
+CREATE TRIGGER IF NOT EXISTS events_terms_stale AFTER UPDATE OF data ON events BEGIN
+    DELETE FROM term_indexed WHERE url = NEW.url;
+END;
+CREATE TABLE IF NOT EXISTS topic_labels (
+    label_key TEXT PRIMARY KEY,
+    canonical TEXT NOT NULL,
+    similarity REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    url TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    listing TEXT,
+    content TEXT,
+    summarized TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_state ON fingerprints(state);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def deadline_key(deadline):
+    """Returns an ``mm/dd/yyyy`` deadline as a sortable ``yyyy-mm-dd`` string, or None."""
+    try:
+        return datetime.strptime(deadline, '%m/%d/%Y').strftime('%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+
+class EventStore:
+    """URL-keyed raw listings and processed events for every state."""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # Scrapers
+
+    def known_urls(self, state, include_archive=False):
+        """
+        Returns the URLs already processed for ``state``, including linked near-duplicates.
+
+        Only the active events are loaded unless ``include_archive`` is set;
+        check other URLs against the archive with ``is_archived``.
+        """
+        sql = ("SELECT url FROM events WHERE state = ? UNION SELECT d.url FROM duplicates d WHERE d.state = ? "
+               "AND NOT EXISTS (SELECT 1 FROM archived_events a WHERE a.url = d.canonical_url)")
+        params = [state, state]
+        if include_archive:
+            sql = ("SELECT url FROM events WHERE state = ? UNION SELECT url FROM duplicates WHERE state = ? "
+                   "UNION SELECT url FROM archived_events WHERE state = ?")
+            params.append(state)
+        return {url for url, in self._query(sql, params)}
+
+    def listing_fingerprints(self, state):
+        """Returns ``{url: listing fingerprint}`` for the listings of ``state`` seen so far."""
+        rows = self._query("SELECT url, listing FROM fingerprints WHERE state = ? AND listing IS NOT NULL", (state,))
+        return dict(rows)
+
+    def content_fingerprints(self, state):
+        """Returns ``{url: content fingerprint}`` for the listings of ``state`` scraped so far."""
+        rows = self._query("SELECT url, content FROM fingerprints WHERE state = ? AND content IS NOT NULL", (state,))
+        return dict(rows)
+
+    def backfill_fingerprints(self, force=False):
+        """
+        Fingerprints processed listings summarized before fingerprints existed; returns how many.
+
+        Their raw record is the one they were summarized from, so its content
+        fingerprint is recorded as both the scraped and the summarized one.
+        Without it, any later re-scrape would count as a change. Runs once per
+        store unless ``force`` is set.
+        """
+        if self.get_meta(FINGERPRINTS_BACKFILLED_KEY) and not force:
+            return 0
+        rows = self._query(
+            "SELECT r.url, r.state, r.data FROM raw_events r LEFT JOIN fingerprints f ON f.url = r.url "
+            "WHERE f.content IS NULL AND (EXISTS (SELECT 1 FROM events e WHERE e.url = r.url) "
+            "OR EXISTS (SELECT 1 FROM archived_events a WHERE a.url = r.url))"
+        )
+        fingerprints = []
+        for url, state, data in rows:
+            fingerprint = content_fingerprint(json.loads(data))
+            fingerprints.append((url, state, fingerprint, fingerprint))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO fingerprints (url, state, content, summarized) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET content = excluded.content, summarized = excluded.summarized",
+                fingerprints,
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                               (FINGERPRINTS_BACKFILLED_KEY, _now()))
+            self._conn.commit()
+        if fingerprints:
+            logging.info(f"Fingerprinted {len(fingerprints)} processed listings from their raw records")
+        return len(fingerprints)
+
+    def set_listing_fingerprints(self, state, fingerprints):
+        """Records ``{url: listing fingerprint}`` for known listings that were stored without one."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO fingerprints (url, state, listing) VALUES (?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET listing = excluded.listing",
+                [(url, state, fingerprint) for url, fingerprint in fingerprints.items()],
+            )
+            self._conn.commit()
+
+    def add_raw(self, state, records):
+        """
+        Inserts or refreshes scraped listings; returns how many were stored.
+
+        A listing whose content fingerprint changed loses its near-duplicate
+        signature and link, so ``util.dedupe`` checks it again.
+        """
+        now = _now()
+        rows = [(record['url'], state, now, json.dumps(record, ensure_ascii=False))
+                for record in records if record.get('url')]
+        fingerprints = [(record['url'], state, record.get('listing_fingerprint'), record['fingerprint'])
+                        for record in records if record.get('url') and record.get('fingerprint')]
+        with self._lock:
+            changed = [(url,) for url, _, _, content in fingerprints if self._conn.execute(
+                "SELECT 1 FROM fingerprints WHERE url = ? AND content IS NOT NULL AND content != ?", (url, content)
+            ).fetchone()]
+            for table in ('signatures', 'lsh_buckets', 'duplicates'):
+                self._conn.executemany(f"DELETE FROM {table} WHERE url = ?", changed)
+            self._conn.executemany(
+                "INSERT INTO raw_events (url, state, scraped_at, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET state = excluded.state, "
+                "scraped_at = excluded.scraped_at, data = excluded.data",
+                rows,
+            )
+            self._conn.executemany(
+                "INSERT INTO fingerprints (url, state, listing, content) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET state = excluded.state, "
+                "listing = COALESCE(excluded.listing, listing), content = excluded.content",
+                fingerprints,
+            )
+            self._conn.commit()
+        return len(rows)
+
+    # Summarizer
+
+    def pending_events(self, state):
+        """
+        Returns raw listings for ``state`` that have not been processed yet, in scrape order.
+
+        Listings linked to a canonical near-duplicate or already archived are left out.
+        """
+        rows = self._query(
+            "SELECT data FROM raw_events r WHERE r.state = ? "
+            "AND NOT EXISTS (SELECT 1 FROM events e WHERE e.url = r.url) "
+            "AND NOT EXISTS (SELECT 1 FROM archived_events a WHERE a.url = r.url) "
+            "AND NOT EXISTS (SELECT 1 FROM duplicates d WHERE d.url = r.url) ORDER BY r.id",
+            (state,),
+        )
+        return [json.loads(data) for data, in rows]
+
+    def changed_events(self, state):
+        """
+        Returns raw listings for ``state`` whose content changed since their event was summarized.
+
+        These are processed (or archived) listings that were scraped again with
+        a different ``fingerprint``. Linked near-duplicates are left out.
+        """
+        rows = self._query(
+            "SELECT r.data FROM raw_events r JOIN fingerprints f ON f.url = r.url "
+            "WHERE r.state = ? AND f.content IS NOT NULL AND f.content IS NOT f.summarized "
+            "AND (EXISTS (SELECT 1 FROM events e WHERE e.url = r.url) "
+            "OR EXISTS (SELECT 1 FROM archived_events a WHERE a.url = r.url)) "
+            "AND NOT EXISTS (SELECT 1 FROM duplicates d WHERE d.url = r.url) ORDER BY r.id",
+            (state,),
+        )
+        return [json.loads(data) for data, in rows]
+
+    def put_events(self, state, events, touch=True):
+        """
+        Inserts processed events or replaces the ones with the same URL.
+
+        Replaced events keep their position and ``added_on``; an archived event
+        stored again moves back to the active table with its ``added_on``. The
+        events' ``fingerprint`` is recorded as the one they were summarized from.
+        Rolling events get no deadline key, so they are never archived.
+        ``touch=False`` keeps a replaced event's ``updated_at``, for derived
+        fields that shouldn't count as a new summary in the Excel export.
+        """
+        now = _now()
+        events = [event for event in events if event.get('url')]
+        rows = [(event['url'], state, None if event.get('rolling') else deadline_key(event.get('deadline')),
+                 event['url'], now, now,
+                 json.dumps(event, ensure_ascii=False))
+                for event in events]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO events (url, state, deadline, added_on, updated_at, data) VALUES (?, ?, ?, "
+                "COALESCE((SELECT added_on FROM archived_events WHERE url = ?), ?), ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET state = excluded.state, deadline = excluded.deadline, "
+                f"updated_at = {'excluded.updated_at' if touch else 'events.updated_at'}, data = excluded.data",
+                rows,
+            )
+            self._conn.executemany("DELETE FROM archived_events WHERE url = ?", [(event['url'],) for event in events])
+            self._conn.executemany(
+                "INSERT INTO fingerprints (url, state, summarized) VALUES (?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET summarized = excluded.summarized",
+                [(event['url'], state, event['fingerprint']) for event in events if event.get('fingerprint')],
+            )
+            self._conn.commit()
+
+    def put_event(self, state, event):
+        """Stores one processed event (committed immediately)."""
+        self.put_events(state, [event])
+
+    # Readers
+
+    def processed_events(self, state=None, canonical_only=False, include_archive=False):
+        """Returns processed events, optionally for one state, in insertion order."""
+        return [event for _, _, event in self.event_rows(state, canonical_only, include_archive)]
+
+    def event_rows(self, state=None, canonical_only=False, include_archive=False):
+        """
+        Returns ``(state, added_on, event)`` tuples in insertion order.
+
+        ``canonical_only`` leaves out events linked to a canonical near-duplicate.
+        Archived events are only read when ``include_archive`` is set; they are
+        merged in by ``added_on``.
+        """
+        conditions, params = [], []
+        if state is not None:
+            conditions.append("state = ?")
+            params.append(state)
+        if canonical_only:
+            conditions.append("NOT EXISTS (SELECT 1 FROM duplicates d WHERE d.url = t.url)")
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"SELECT state, added_on, data FROM events t{where} ORDER BY id"
+        if include_archive:
+            sql = (f"SELECT state, added_on, data FROM (SELECT state, added_on, data, id FROM events t{where} "
+                   f"UNION ALL SELECT state, added_on, data, id FROM archived_events t{where}) ORDER BY added_on, id")
+            params = params * 2
+        rows = self._query(sql, params)
+        return [(row_state, added_on, json.loads(data)) for row_state, added_on, data in rows]
+
+    def events_without(self, key):
+        """Returns ``(state, added_on, event)`` for processed events whose data lacks the top-level ``key``."""
+        rows = self._query(
+            "SELECT state, added_on, data FROM events WHERE json_type(data, ?) IS NULL ORDER BY id",
+            (f'$.{key}',),
+        )
+        return [(state, added_on, json.loads(data)) for state, added_on, data in rows]
+
+    def count(self, state=None):
+        """Returns the number of processed events, optionally for one state."""
+        if state is None:
+            return self._query("SELECT COUNT(*) FROM events")[0][0]
+        return self._query("SELECT COUNT(*) FROM events WHERE state = ?", (state,))[0][0]
+
+    def states(self):
+        """Returns every state that has raw or processed events."""
+        rows = self._query("SELECT state FROM raw_events UNION SELECT state FROM events "
+                           "UNION SELECT state FROM archived_events ORDER BY state")
+        return [state for state, in rows]
+
+    def get_meta(self, key):
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    def delete_meta(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM meta WHERE key = ?", (key,))
+            self._conn.commit()
+
+    # Excel export manifest
+
+    def unexported_rows(self, workbook, include_archive=False):
+        """Returns ``(state, added_on, event)`` tuples not yet exported to ``workbook``."""
+        condition = ("WHERE NOT EXISTS (SELECT 1 FROM exports x WHERE x.workbook = ? AND x.url = e.url) "
+                     "AND NOT EXISTS (SELECT 1 FROM duplicates d WHERE d.url = e.url)")
+        sql = f"SELECT e.state, e.added_on, e.data FROM events e {condition} ORDER BY e.id"
+        params = (workbook,)
+        if include_archive:
+            sql = (f"SELECT state, added_on, data FROM (SELECT e.state, e.added_on, e.data, e.id FROM events e {condition} "
+                   f"UNION ALL SELECT e.state, e.added_on, e.data, e.id FROM archived_events e {condition}) "
+                   "ORDER BY added_on, id")
+            params = params * 2
+        rows = self._query(sql, params)
+        return [(state, added_on, json.loads(data)) for state, added_on, data in rows]
+
+    def updated_rows(self, workbook, include_archive=False):
+        """Returns ``(state, added_on, event)`` tuples exported to ``workbook`` and stored again since."""
+        condition = ("JOIN exports x ON x.workbook = ? AND x.url = e.url WHERE e.updated_at > x.exported_at "
+                     "AND NOT EXISTS (SELECT 1 FROM duplicates d WHERE d.url = e.url)")
+        sql = f"SELECT e.state, e.added_on, e.data FROM events e {condition} ORDER BY e.id"
+        params = (workbook,)
+        if include_archive:
+            sql = (f"SELECT state, added_on, data FROM (SELECT e.state, e.added_on, e.data, e.id FROM events e {condition} "
+                   f"UNION ALL SELECT e.state, e.added_on, e.data, e.id FROM archived_events e {condition}) "
+                   "ORDER BY added_on, id")
+            params = params * 2
+        rows = self._query(sql, params)
+        return [(state, added_on, json.loads(data)) for state, added_on, data in rows]
+
+    def updated_since_export(self, workbook):
+        """Returns the URLs of events (active or archived) stored again after they were exported to ``workbook``."""
+        rows = self._query(
+            "SELECT x.url FROM exports x JOIN (SELECT url, updated_at FROM events "
+            "UNION ALL SELECT url, updated_at FROM archived_events) e ON e.url = x.url "
+            "WHERE x.workbook = ? AND e.updated_at > x.exported_at",
+            (workbook,),
+        )
+        return {url for url, in rows}
+
+    def reindex_exported(self, workbook, urls):
+        """Sets ``workbook``'s manifest to ``urls``, keeping the export time of URLs already in it."""
+        urls = set(urls)
+        known = {url for url, in self._query("SELECT url FROM exports WHERE workbook = ?", (workbook,))}
+        with self._lock:
+            self._conn.executemany("DELETE FROM exports WHERE workbook = ? AND url = ?",
+                                   [(workbook, url) for url in known - urls])
+            self._conn.commit()
+        self.mark_exported(workbook, urls - known)
+
+    def mark_exported(self, workbook, urls, replace=False):
+        """Records URLs written to ``workbook`` now; ``replace`` discards the previous manifest first."""
+        now = _now()
+        with self._lock:
+            if replace:
+                self._conn.execute("DELETE FROM exports WHERE workbook = ?", (workbook,))
+            self._conn.executemany(
+                "INSERT INTO exports (workbook, url, exported_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(workbook, url) DO UPDATE SET exported_at = excluded.exported_at",
+                [(workbook, url, now) for url in urls],
+            )
+            self._conn.commit()
+
+    # Near-duplicate index (see util.dedupe)
+
+    def unindexed_events(self):
+        """Returns ``(url, state, event)`` without a signature: processed events first, then raw in scrape order."""
+        rows = self._query(
+            "SELECT url, state, data FROM ("
+            "SELECT url, state, data, 0 AS stage, id FROM events "
+            "UNION ALL SELECT url, state, data, 1 AS stage, id FROM raw_events r "
+            "WHERE NOT EXISTS (SELECT 1 FROM events e WHERE e.url = r.url)) t "
+            "WHERE NOT EXISTS (SELECT 1 FROM signatures s WHERE s.url = t.url) ORDER BY stage, id"
+        )
+        return [(url, state, json.loads(data)) for url, state, data in rows]
+
+    def add_signature(self, url, signature, deadline, bucket_keys):
+        """Stores an event's MinHash signature, ``yyyy-mm-dd`` deadline and ``(band, bucket)`` LSH keys."""
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO signatures (url, signature, deadline) VALUES (?, ?, ?)",
+                               (url, signature, deadline))
+            self._conn.executemany("INSERT INTO lsh_buckets (band, bucket, url) VALUES (?, ?, ?)",
+                                   [(band, bucket, url) for band, bucket in bucket_keys])
+            self._conn.commit()
+
+    def lsh_candidates(self, bucket_keys, limit_per_bucket):
+        """Returns ``{url: (signature, deadline)}`` for events sharing an LSH bucket (``limit_per_bucket`` each)."""
+        candidates = {}
+        with self._lock:
+            for band, bucket in bucket_keys:
+                rows = self._conn.execute(
+                    "SELECT s.url, s.signature, s.deadline FROM (SELECT url FROM lsh_buckets WHERE band = ? AND bucket = ? LIMIT ?) b "
+                    "JOIN signatures s ON s.url = b.url",
+                    (band, bucket, limit_per_bucket),
+                ).fetchall()
+                candidates.update((url, (signature, deadline)) for url, signature, deadline in rows)
+        return candidates
+
+    def link_duplicate(self, url, state, canonical_url, similarity):
+        """Marks ``url`` as a near-duplicate of ``canonical_url``."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO duplicates (url, state, canonical_url, similarity, linked_at) VALUES (?, ?, ?, ?, ?)",
+                (url, state, canonical_url, similarity, _now()),
+            )
+            self._conn.commit()
+
+    def canonical_url(self, url):
+        """Returns the canonical URL ``url`` is linked to, or ``url`` itself."""
+        rows = self._query("SELECT canonical_url FROM duplicates WHERE url = ?", (url,))
+        return rows[0][0] if rows else url
+
+    def duplicate_links(self):
+        """Returns ``(url, state, canonical_url, similarity)`` for every linked duplicate."""
+        return self._query("SELECT url, state, canonical_url, similarity FROM duplicates ORDER BY canonical_url, url")
+
+    # Search index (see util.topic_index)
+
+    def unindexed_term_events(self):
+        """Returns ``(url, event)`` for processed events that are new or changed since they were indexed."""
+        rows = self._query(
+            "SELECT url, data FROM events e WHERE NOT EXISTS (SELECT 1 FROM term_indexed t WHERE t.url = e.url) ORDER BY id"
+        )
+        return [(url, json.loads(data)) for url, data in rows]
+
+    def set_terms(self, terms_by_url):
+        """Replaces the ``(field, term)`` pairs of each URL in ``terms_by_url`` in one transaction."""
+        with self._lock:
+            for url, terms in terms_by_url.items():
+                self._conn.execute("DELETE FROM event_terms WHERE url = ?", (url,))
+                self._conn.executemany("INSERT INTO event_terms (field, term, url) VALUES (?, ?, ?)",
+                                       [(field, term, url) for field, term in terms])
+                self._conn.execute("INSERT OR IGNORE INTO term_indexed (url) VALUES (?)", (url,))
+            self._conn.commit()
+
+    def search_events(self, terms, deadline_from=None, deadline_to=None, limit=None):
+        """
+        Returns ``(state, event)`` for canonical events matching every ``(field, term)`` pair.
+
+        ``deadline_from``/``deadline_to`` bound the ``yyyy-mm-dd`` deadline
+        (inclusive). Results are ordered by deadline, unknown deadlines last.
+        """
+        conditions = ["NOT EXISTS (SELECT 1 FROM duplicates d WHERE d.url = e.url)"]
+        params = []
+        for field, term in terms:
+            conditions.append("e.url IN (SELECT url FROM event_terms WHERE field = ? AND term = ?)")
+            params.extend((field, term))
+        if deadline_from:
+            conditions.append("e.deadline >= ?")
+            params.append(deadline_from)
+        if deadline_to:
+            conditions.append("e.deadline <= ?")
+            params.append(deadline_to)
+        sql = (f"SELECT e.state, e.data FROM events e WHERE {' AND '.join(conditions)} "
+               "ORDER BY e.deadline IS NULL, e.deadline, e.id")
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [(state, json.loads(data)) for state, data in self._query(sql, params)]
+
+    def term_counts(self, field):
+        """Returns ``(term, event count)`` pairs for one field, most common first."""
+        return self._query(
+            "SELECT term, COUNT(DISTINCT url) AS n FROM event_terms WHERE field = ? GROUP BY term ORDER BY n DESC, term",
+            (field,),
+        )
+
+    # Topic vocabulary (see util.topic_normalizer)
+
+    def topic_mapping(self):
+        """Returns ``{label_key: (canonical, similarity)}`` for every label seen so far."""
+        rows = self._query("SELECT label_key, canonical, similarity FROM topic_labels")
+        return {key: (canonical, similarity) for key, canonical, similarity in rows}
+
+    def add_topic_mappings(self, rows):
+        """Stores ``(label_key, canonical, similarity)`` rows."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO topic_labels (label_key, canonical, similarity) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    # Archive
+
+    def archive_expired(self, grace_days=ARCHIVE_GRACE_DAYS, today=None):
+        """
+        Moves events whose deadline passed more than ``grace_days`` ago to the archive.
+
+        Archived events and their near-duplicates also leave the LSH buckets and
+        the search index, so later runs neither compare against nor scan them.
+        Events without a parsed deadline, including rolling calls, stay active;
+        a rolling call's placeholder deadline is moved to the end of the
+        current year. Returns the number moved.
+        """
+        today = today or date.today()
+        cutoff = (today - timedelta(days=grace_days)).isoformat()
+        expired = "SELECT url FROM events WHERE deadline < ?"
+        with self._lock:
+            self._conn.execute(
+                "UPDATE events SET data = json_set(data, '$.deadline', ?) "
+                "WHERE json_extract(data, '$.rolling') AND json_extract(data, '$.deadline') IS NOT ?",
+                (rolling_deadline(today), rolling_deadline(today)),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO archived_events "
+                "(url, state, deadline, month, added_on, updated_at, archived_at, data) "
+                "SELECT url, state, deadline, substr(deadline, 1, 7), added_on, updated_at, ?, data "
+                "FROM events WHERE deadline < ?",
+                (_now(), cutoff),
+            )
+            self._conn.execute(
+                f"DELETE FROM lsh_buckets WHERE url IN ({expired}) "
+                f"OR url IN (SELECT url FROM duplicates WHERE canonical_url IN ({expired}))",
+                (cutoff, cutoff),
+            )
+            self._conn.execute(f"DELETE FROM event_terms WHERE url IN ({expired})", (cutoff,))
+            self._conn.execute(f"DELETE FROM term_indexed WHERE url IN ({expired})", (cutoff,))
+            moved = self._conn.execute("DELETE FROM events WHERE deadline < ?", (cutoff,)).rowcount
+            self._conn.commit()
+        return moved
+
+    def mark_rolling(self, force=False):
+        """
+        Flags processed events whose scraped deadline is rolling or ongoing; returns how many.
+
+        Events stored before rolling calls were flagged carry a plain December 31
+        deadline. Their raw listing still has the original wording, so they get
+        the ``rolling`` flag and lose their deadline key, and those already
+        archived move back to the active events. Runs once per store unless
+        ``force`` is set.
+        """
+        if self.get_meta(ROLLING_MARKED_KEY) and not force:
+            return 0
+        rows = self._query("SELECT url, data FROM raw_events")
+        urls = [(url,) for url, data in rows if is_rolling(json.loads(data).get('deadline'))]
+        flag = "data = json_set(data, '$.rolling', json('true'))"
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO events (url, state, deadline, added_on, updated_at, data) "
+                "SELECT url, state, NULL, added_on, updated_at, data FROM archived_events WHERE url = ?",
+                urls,
+            )
+            self._conn.executemany("DELETE FROM archived_events WHERE url = ?", urls)
+            self._conn.executemany(f"UPDATE events SET deadline = NULL, {flag} WHERE url = ?", urls)
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (ROLLING_MARKED_KEY, _now()))
+            self._conn.commit()
+        if urls:
+            logging.info(f"Marked {len(urls)} processed events as rolling calls")
+        return len(urls)
+
+    def is_archived(self, url):
+        """True if ``url`` is an archived event or a near-duplicate of one."""
+        return bool(self._query(
+            "SELECT 1 FROM archived_events WHERE url = ? UNION ALL "
+            "SELECT 1 FROM duplicates d JOIN archived_events a ON a.url = d.canonical_url WHERE d.url = ? LIMIT 1",
+            (url, url),
+        ))
+
+    def archive_partitions(self):
+        """Returns ``(month, state, count)`` for every archive partition, oldest month first."""
+        return self._query("SELECT month, state, COUNT(*) FROM archived_events GROUP BY month, state ORDER BY month, state")
+
+    def archived_events(self, month, state):
+        """Returns the archived events of one ``yyyy-mm`` partition, in archive order."""
+        rows = self._query("SELECT data FROM archived_events WHERE month = ? AND state = ? ORDER BY id", (month, state))
+        return [json.loads(data) for data, in rows]
+
+    def put_archived(self, state, events):
+        """Stores events directly in the archive (used when importing archive JSON files)."""
+        now = _now()
+        rows = []
+        for event in events:
+            if event.get('url'):
+                deadline = deadline_key(event.get('deadline'))
+                rows.append((event['url'], state, deadline, deadline and deadline[:7], now, now, now,
+                             json.dumps(event, ensure_ascii=False)))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO archived_events "
+                "(url, state, deadline, month, added_on, updated_at, archived_at, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    # JSON compatibility
+
+    def migrate_json(self, raw_data_dir=RAW_DATA_DIR, processed_data_dir=PROCESSED_DATA_DIR, force=False):
+        """
+        Imports ``<state>_raw_data.json`` and ``<state>_processed_data.json`` files.
+
+        Journals left by an interrupted JSON-era run are imported after the
+        processed files, and ``processed_data/archive/`` files go straight into
+        the archive. Runs once per store unless ``force`` is set; returns
+        ``(raw_count, processed_count)``.
+        """
+        if self.get_meta(MIGRATED_KEY) and not force:
+            return 0, 0
+        raw_count = processed_count = 0
+        for state, path in _state_files(raw_data_dir, RAW_SUFFIX):
+            records = _load_json_list(path)
+            raw_count += self.add_raw(state, records)
+        for state, path in _state_files(processed_data_dir, PROCESSED_SUFFIX):
+            events = _load_json_list(path)
+            self.put_events(state, events)
+            processed_count += len(events)
+        for state, path in _state_files(processed_data_dir, JOURNAL_SUFFIX):
+            events = load_journal(path)
+            self.put_events(state, events)
+            processed_count += len(events)
+        for partition, path in _state_files(os.path.join(processed_data_dir, 'archive'), PROCESSED_SUFFIX):
+            events = _load_json_list(path)
+            self.put_archived(partition.rsplit('_', 1)[0], events)
+            processed_count += len(events)
+        self.set_meta(MIGRATED_KEY, _now())
+        if raw_count or processed_count:
+            logging.info(f"Imported {raw_count} raw and {processed_count} processed events into {self.path}")
+        return raw_count, processed_count
+
+    def export_json(self, raw_data_dir=RAW_DATA_DIR, processed_data_dir=PROCESSED_DATA_DIR):
+        """
+        Writes per-state raw and processed JSON files; returns the paths written.
+
+        Archived events go to one ``processed_data/archive/<state>_<yyyy-mm>``
+        file per partition.
+        """
+        paths = []
+        for state in self.states():
+            raw_rows = self._query("SELECT data FROM raw_events WHERE state = ? ORDER BY id", (state,))
+            if raw_rows:
+                path = os.path.join(raw_data_dir, f'{state}{RAW_SUFFIX}')
+                atomic_write_json([json.loads(data) for data, in raw_rows], path)
+                paths.append(path)
+            events = self.processed_events(state)
+            if events:
+                path = os.path.join(processed_data_dir, f'{state}{PROCESSED_SUFFIX}')
+                atomic_write_json(events, path)
+                paths.append(path)
+        archive_dir = os.path.join(processed_data_dir, 'archive')
+        for month, state, _ in self.archive_partitions():
+            os.makedirs(archive_dir, exist_ok=True)
+            path = os.path.join(archive_dir, f'{state}_{month or "undated"}{PROCESSED_SUFFIX}')
+            atomic_write_json(self.archived_events(month, state), path)
+            paths.append(path)
+        return paths
+
+
+def _state_files(directory, suffix):
+    if not os.path.isdir(directory):
+        return []
+    return [(filename[:-len(suffix)], os.path.join(directory, filename))
+            for filename in sorted(os.listdir(directory)) if filename.endswith(suffix)]
+
+
+def _load_json_list(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except json.JSONDecodeError:
+        logging.warning(f"Could not decode JSON from {path}. Skipping.")
+        return []
+    if not isinstance(data, list):
+        logging.warning(f"{path} does not contain a list of events. Skipping.")
+        return []
+    return data
+
+
+_store_path = DEFAULT_STORE_PATH
+_store = None
+_store_lock = threading.Lock()
+
+
+def configure_store(path=DEFAULT_STORE_PATH):
+    """Points ``get_store`` at another database file."""
+    global _store_path, _store
+    with _store_lock:
+        if _store is not None and _store.path != path:
+            _store.close()
+            _store = None
+        _store_path = path
+
+
+def get_store():
+    """Returns the shared store, importing the JSON files on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EventStore(_store_path)
+            _store.migrate_json()
+            _store.mark_rolling()
+            _store.backfill_fingerprints()
+        return _store
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Manage the SQLite event store.")
+    parser.add_argument('command', choices=('migrate', 'export', 'archive'),
+                        help="'migrate' imports raw_data/ and processed_data/ JSON; 'export' writes them back out; "
+                             "'archive' moves expired events to the archive")
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH, help="Path of the SQLite database")
+    parser.add_argument('--force', action='store_true', help="migrate: import again even if already migrated")
+    parser.add_argument('--grace-days', type=int, default=ARCHIVE_GRACE_DAYS,
+                        help="archive: days after the deadline before an event is archived")
+    args = parser.parse_args()
+    store = EventStore(args.store)
+    if args.command == 'migrate':
+        raw_count, processed_count = store.migrate_json(force=args.force)
+        print(f"Imported {raw_count} raw and {processed_count} processed events into {store.path}")
+    elif args.command == 'archive':
+        moved = store.archive_expired(args.grace_days)
+        print(f"Archived {moved} expired events; {store.count()} active events remain")
+        for month, state, count in store.archive_partitions():
+            print(f"{month or 'undated'}  {state:<4} {count:6d}")
+    else:
+        for path in store.export_json():
+            print(f"Wrote {path}")
@@ -1,120 +1,337 @@
+import argparse
 import os
-import json
-import pandas as pd
-from datetime import datetime
-from openpyxl import load_workbook
-from openpyxl.styles import Font
 
-def write_to_excel(processed_data_dir='processed_data', output_file='art_calls.xlsx'):
+from util.event_store import PROCESSED_SUFFIX, get_store
+from util.metrics import metrics
+
+COLUMNS = ['reviewed', 'url', 'deadline', 'topics', 'fees', 'requirement', 'title', 'location', 'organization', 'source_file', 'added_on']
+SHEET_NAME = 'Sheet1'
+# Columns a rebuild always takes from the existing sheet: the review status and
+# the date a row was first added (the store's is the import date for migrated events)
+SHEET_COLUMNS = ('reviewed', 'added_on')
+# Columns reviewers edit (e.g. with replace.py); a rebuild keeps their sheet
+# values unless the listing was summarized again since it was exported
+REVIEWER_COLUMNS = ('topics', 'fees', 'requirement')
+# Appending to a sheet with more rows than this prints a hint about ``stream``
+LARGE_SHEET_ROWS = 5000
+
+# pandas, openpyxl and xlsxwriter are imported inside the functions that use
+# them, so importing this module (e.g. for COLUMNS) stays cheap.
+
+def _event_rows(rows):
+    """Builds one dict per ``(state, added_on, event)`` row, in ``COLUMNS`` order."""
+    import pandas as pd
+
+    new_rows = [{
+        'reviewed': "N",
+        'title': event.get('title'),
+        'deadline': event.get('deadline'),
+        'topics': ', '.join(event.get('topics_canonical') or event.get('topics_EN', [])),
+        'fees': event.get('fees'),
+        'requirement': event.get('requirement'),
+        'url': event.get('url'),
+        'location': event.get('location'),
+        'organization': event.get('organization'),
+        'source_file': f'{state}{PROCESSED_SUFFIX}',
+        'added_on': added_on
+    } for state, added_on, event in rows if event.get('url')]
+
+    # Convert deadlines to dates in one pass; unparseable ones become empty cells
+    deadlines = pd.to_datetime(pd.Series([row['deadline'] for row in new_rows], dtype=object), errors='coerce')
+    for row, deadline in zip(new_rows, deadlines):
+        row['deadline'] = None if pd.isna(deadline) else deadline.date()
+    return new_rows
+
+def _fingerprint(output_file):
+    stat = os.stat(output_file)
+    return f'{stat.st_mtime_ns}:{stat.st_size}'
+
+def _manifest_key(output_file):
+    return f'excel_export:{os.path.abspath(output_file)}'
+
+def _read_sheet(output_file):
+    """Streams the existing sheet; returns its header and rows as lists of values."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(output_file, read_only=True)
+    try:
+        rows = workbook[SHEET_NAME].iter_rows(values_only=True)
+        header = list(next(rows, []))
+        return header, [list(row) for row in rows]
+    finally:
+        workbook.close()
+
+def _sheet_rows(output_file):
+    """Returns the sheet's row count from its dimension record, without reading the rows."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(output_file, read_only=True)
+    try:
+        return workbook[SHEET_NAME].max_row or 0
+    finally:
+        workbook.close()
+
+class _StreamingSheet:
+    """An xlsxwriter sheet in constant-memory mode, with the exporter's URL and date formats."""
+
+    def __init__(self, path, header):
+        import xlsxwriter
+
+        self.workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        self.worksheet = self.workbook.add_worksheet(SHEET_NAME)
+        self.url_format = self.workbook.add_format({'color': 'blue', 'underline': 1})
+        self.date_format = self.workbook.add_format({'num_format': 'yyyy-mm-dd'})
+        self.header = header
+        self.url_col_idx = header.index('url') if 'url' in header else None
+        self.worksheet.write_row(0, 0, header)
+        self.rows = 1
+
+    def write(self, values):
+        """Writes the next row; ``values`` are in header order."""
+        import pandas as pd
+
+        for col_idx, value in enumerate(values):
+            if value is None or (isinstance(value, float) and pd.isna(value)):
+                continue
+            if col_idx == self.url_col_idx:
+                self.worksheet.write_url(self.rows, col_idx, value, self.url_format, string=value)
+            elif hasattr(value, 'year'):
+                self.worksheet.write_datetime(self.rows, col_idx, value, self.date_format)
+            else:
+                self.worksheet.write(self.rows, col_idx, value)
+        self.rows += 1
+
+    def close(self):
+        self.workbook.close()
+
+def _sync_manifest(store, output_file):
+    """Re-indexes the workbook's URLs if it was changed outside the exporter."""
+    workbook_key = os.path.abspath(output_file)
+    if store.get_meta(_manifest_key(output_file)) == _fingerprint(output_file):
+        return
+    header, rows = _read_sheet(output_file)
+    if 'url' not in header:
+        raise ValueError(f"'url' column not found in {output_file}")
+    url_idx = header.index('url')
+    urls = [row[url_idx] for row in rows if url_idx < len(row) and row[url_idx]]
+    store.reindex_exported(workbook_key, urls)
+    store.set_meta(_manifest_key(output_file), _fingerprint(output_file))
+    print(f"Indexed {len(urls)} existing rows of {output_file}")
+
+def rebuild_excel(store=None, output_file='art_calls.xlsx', include_archive=False, keep_columns=REVIEWER_COLUMNS):
     """
-    Reads JSON files from a directory, processes the events, and writes them to an Excel file.
+    Rewrites the whole workbook from the event store in constant memory.
+
+    The ``SHEET_COLUMNS`` of the existing sheet are carried over by URL, and so
+    are its ``keep_columns`` unless the listing was summarized again since it
+    was exported. Rows whose URL is not in the store are kept at the end.
+    Near-duplicates of another event are left out, and so are archived
+    (expired) events unless ``include_archive`` is set. Every other column is
+    regenerated.
 
     Args:
-        processed_data_dir (str): The directory containing the processed JSON files.
+        store (EventStore): The event store to read from (defaults to the shared store).
         output_file (str): The name of the output Excel file.
+        include_archive (bool): Also write archived events.
+        keep_columns (tuple): Reviewer-edited columns to carry over.
     """
-    columns = ['reviewed', 'url', 'deadline', 'topics', 'fees', 'requirement', 'title', 'location', 'organization', 'source_file', 'added_on']
-    
-    existing_urls = set()
-    df_existing = pd.DataFrame(columns=columns)
-    
-    # Check if the output file exists and read existing URLs
+    store = store or get_store()
+    rows = _event_rows(store.event_rows(canonical_only=True, include_archive=include_archive))
+    kept = {}
+    orphans = []
+    archived = 0
     if os.path.exists(output_file):
-        try:
-            df_existing = pd.read_excel(output_file, sheet_name='Sheet1')
-            if 'url' in df_existing.columns:
-                existing_urls = set(df_existing['url'])
-        except Exception as e:
-            print(f"Error reading existing Excel file: {e}")
-    
-    new_rows = []
-    
-    # Iterate over each file in the processed_data directory
-    for filename in os.listdir(processed_data_dir):
-        if filename.endswith('.json'):
-            file_path = os.path.join(processed_data_dir, filename)
-            
-            with open(file_path, 'r') as f:
-                try:
-                    events = json.load(f)
-                except json.JSONDecodeError:
-                    print(f"Could not decode JSON from {filename}")
-                    continue
-
-            # Ensure events is a list
-            if not isinstance(events, list):
-                print(f"JSON file {filename} does not contain a list of events. Skipping.")
+        header, old_rows = _read_sheet(output_file)
+        known_urls = {row['url'] for row in rows}
+        duplicate_urls = {url for url, *_ in store.duplicate_links()}
+        updated_urls = store.updated_since_export(os.path.abspath(output_file))
+        for old_row in old_rows:
+            values = dict(zip(header, old_row))
+            url = values.get('url')
+            if url in known_urls:
+                columns = SHEET_COLUMNS if url in updated_urls else SHEET_COLUMNS + tuple(keep_columns)
+                kept[url] = {column: values[column] for column in columns if values.get(column) is not None}
+            elif url in duplicate_urls or not any(value is not None for value in old_row):
                 continue
+            elif url and store.is_archived(url):
+                archived += 1
+            else:
+                orphans.append(values)
+
+    for row in rows:
+        row.update(kept.get(row['url'], {}))
+
+    metrics.incr('export.rows', len(rows) + len(orphans))
+    tmp_file = f'{output_file}.tmp.xlsx'
+    sheet = _StreamingSheet(tmp_file, COLUMNS)
+    for row in rows + orphans:
+        sheet.write([row.get(column) for column in COLUMNS])
+    sheet.close()
+    os.replace(tmp_file, output_file)
+
+    store.mark_exported(os.path.abspath(output_file), [row['url'] for row in rows], replace=True)
+    store.set_meta(_manifest_key(output_file), _fingerprint(output_file))
+    print(f"Rebuilt {output_file} with {len(rows)} events (review columns kept for {len(kept)} rows, {len(orphans)} extra "
+          f"rows kept, {archived} archived rows dropped).")
+
+def write_to_excel(store=None, output_file='art_calls.xlsx', rebuild=False, include_archive=False, stream=False,
+                   keep_columns=REVIEWER_COLUMNS):
+    """
+    Appends processed events that are not yet in the Excel file.
+
+    Rows of listings that were summarized again since they were exported get
+    their new values, except for the ``SHEET_COLUMNS``.
+
+    Exported URLs are tracked in the event store, so the workbook is only
+    re-scanned when it was modified outside the exporter.
+
+    Args:
+        store (EventStore): The event store to read from (defaults to the shared store).
+        output_file (str): The name of the output Excel file.
+        rebuild (bool): Rewrite the whole workbook instead of appending.
+        include_archive (bool): Also export archived (expired) events.
+        stream (bool): Append by copying the sheet's values into a new file in
+            constant memory, dropping formatting (see ``_append_to_excel``).
+        keep_columns (tuple): Reviewer-edited columns a rebuild carries over.
+    """
+    store = store or get_store()
+    if rebuild or not os.path.exists(output_file):
+        with metrics.span('export.rebuild', workbook=output_file):
+            rebuild_excel(store, output_file, include_archive, keep_columns)
+        return
+    with metrics.span('export.append', workbook=output_file):
+        _append_to_excel(store, output_file, include_archive, stream)
+
+def _append_to_excel(store, output_file, include_archive, stream=False):
+    """
+    Appends the unexported events to an existing workbook and updates the rows
+    of events stored again since they were exported (``updated_rows``).
+
+    The workbook is edited with openpyxl, which keeps any formatting, column
+    widths, filters and other sheets reviewers added, but loads the whole
+    sheet. With ``stream`` set the sheet is instead copied value by value into
+    a new constant-memory workbook: memory stays flat and the copy takes about
+    half as long on large sheets, but only cell values and the exporter's own
+    link and date styles survive.
+    """
+    from openpyxl import load_workbook
+    from openpyxl.styles import Font
+
+    _sync_manifest(store, output_file)
+    workbook_key = os.path.abspath(output_file)
+    new_rows = _event_rows(store.unexported_rows(workbook_key, include_archive))
+    updated_rows = {row['url']: row for row in _event_rows(store.updated_rows(workbook_key, include_archive))}
+    if not new_rows and not updated_rows:
+        print("No new or changed events to export.")
+        return
+    if stream:
+        print(f"Warning: rewriting {output_file} from its cell values; formatting, column widths, filters "
+              f"and other sheets are not kept.")
+        _stream_append(store, output_file, new_rows, updated_rows)
+        return
+    rows = _sheet_rows(output_file)
+    if rows > LARGE_SHEET_ROWS:
+        print(f"{output_file} has {rows} rows; --stream-append appends in constant memory "
+              f"but drops formatting, column widths, filters and other sheets.")
+
+    workbook = load_workbook(output_file)
+    worksheet = workbook[SHEET_NAME]
+
+    # Write values in the workbook's own column order
+    header = [cell.value for cell in worksheet[1]]
+    try:
+        url_col_idx = header.index('url')
+    except ValueError:
+        print("Error: 'url' column not found in Excel file.")
+        return
+
+    # Changed listings get their new summary in place; reviewers' columns and formatting stay
+    updated = 0
+    for cells in worksheet.iter_rows(min_row=2):
+        row = updated_rows.get(cells[url_col_idx].value) if url_col_idx < len(cells) else None
+        if row is None:
+            continue
+        updated += 1
+        for col_idx, column in _refreshed_columns(header):
+            if col_idx < len(cells):
+                cells[col_idx].value = row.get(column)
+
+    first_row = worksheet.max_row + 1
+    for row in new_rows:
+        worksheet.append([row.get(column) for column in header])
+    for row_num in range(first_row, worksheet.max_row + 1):
+        url_cell = worksheet.cell(row=row_num, column=url_col_idx + 1)
+        if url_cell.value:
+            url_cell.hyperlink = url_cell.value
+            url_cell.font = Font(color="0000FF", underline='single')
+
+    workbook.save(output_file)
+    _record_append(store, output_file, new_rows, updated_rows)
+    print(f"Added {len(new_rows)} new events to {output_file} and updated {updated} changed ones")
+
+def _refreshed_columns(header):
+    """Returns ``(index, column)`` of the sheet columns an append rewrites for a changed listing."""
+    return [(col_idx, column) for col_idx, column in enumerate(header)
+            if column in COLUMNS and column not in SHEET_COLUMNS and column != 'url']
+
+def _record_append(store, output_file, new_rows, updated_rows):
+    metrics.incr('export.rows', len(new_rows))
+    metrics.incr('export.updated', len(updated_rows))
+    store.mark_exported(os.path.abspath(output_file), [row['url'] for row in new_rows] + list(updated_rows))
+    store.set_meta(_manifest_key(output_file), _fingerprint(output_file))
+
+def _stream_append(store, output_file, new_rows, updated_rows):
+    """
+    Copies the sheet's values into a new streaming workbook and appends ``new_rows`` after them.
+
+    Rows of ``updated_rows`` (by URL) are copied with their new summary.
+    """
+    from openpyxl import load_workbook
+
+    tmp_file = f'{output_file}.tmp.xlsx'
+    source = load_workbook(output_file, read_only=True)
+    updated = 0
+    try:
+        existing = source[SHEET_NAME].iter_rows(values_only=True)
+        header = list(next(existing, []))
+        if 'url' not in header:
+            print("Error: 'url' column not found in Excel file.")
+            return
+        url_col_idx = header.index('url')
+        refreshed = _refreshed_columns(header)
+        sheet = _StreamingSheet(tmp_file, header)
+        for values in existing:
+            row = updated_rows.get(values[url_col_idx]) if url_col_idx < len(values) else None
+            if row is not None:
+                updated += 1
+                values = list(values) + [None] * (len(header) - len(values))
+                for col_idx, column in refreshed:
+                    values[col_idx] = row.get(column)
+            sheet.write(values)
+        for row in new_rows:
+            sheet.write([row.get(column) for column in header])
+        sheet.close()
+    finally:
+        source.close()
+    os.replace(tmp_file, output_file)
 
-            for event in events:
-                url = event.get('url')
-                if url and url not in existing_urls:
-                    new_row = {
-                        'reviewed': "N",
-                        'title': event.get('title'),
-                        'deadline': event.get('deadline'),
-                        'topics': ', '.join(event.get('topics_EN', [])),
-                        'fees': event.get('fees'),
-                        'requirement': event.get('requirement'),
-                        'url': url,
-                        'location': event.get('location'),
-                        'organization': event.get('organization'),
-                        'source_file': filename,
-                        'added_on': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    }
-                    new_rows.append(new_row)
-                    existing_urls.add(url)
-
-    if new_rows:
-        df_new = pd.DataFrame(new_rows)
-        
-        # Ensure the columns are in the desired order
-        df_new = df_new[columns]
-        
-        # Convert deadline to date format
-        df_new['deadline'] = pd.to_datetime(df_new['deadline'], errors='coerce').dt.date
-
-        if not os.path.exists(output_file):
-            # File does not exist, create it
-            with pd.ExcelWriter(output_file, engine='xlsxwriter') as writer:
-                df_new.to_excel(writer, index=False, sheet_name='Sheet1')
-                workbook = writer.book
-                worksheet = writer.sheets['Sheet1']
-                
-                url_col_idx = df_new.columns.get_loc('url')
-                url_format = workbook.add_format({'color': 'blue', 'underline': 1})
-                
-                for row_num, url in enumerate(df_new['url']):
-                    if pd.notna(url):
-                        worksheet.write_url(row_num + 1, url_col_idx, url, url_format, string=url)
-            print(f"Created {output_file} and added {len(new_rows)} new events.")
-        else:
-            # File exists, append new data
-            workbook = load_workbook(output_file)
-            worksheet = workbook['Sheet1']
-            
-            # Get header and URL column index
-            header = [cell.value for cell in worksheet[1]]
-            try:
-                url_col_idx = header.index('url')
-            except ValueError:
-                print("Error: 'url' column not found in Excel file.")
-                return
-
-            for _, row in df_new.iterrows():
-                worksheet.append(row.tolist())
-                
-                # Apply hyperlink to URL
-                new_row_num = worksheet.max_row
-                url_cell = worksheet.cell(row=new_row_num, column=url_col_idx + 1)
-                if url_cell.value:
-                    url_cell.hyperlink = url_cell.value
-                    url_cell.font = Font(color="0000FF", underline='single')
-
-            workbook.save(output_file)
-            print(f"Added {len(new_rows)} new events to {output_file}")
-    else:
-        print("No new events to add.")
+    _record_append(store, output_file, new_rows, updated_rows)
+    print(f"Added {len(new_rows)} new events to {output_file} and updated {updated} changed ones "
+          f"({sheet.rows - 1} rows, streamed)")
 
 if __name__ == '__main__':
-    write_to_excel()
+    parser = argparse.ArgumentParser(description="Export processed events to an Excel workbook.")
+    parser.add_argument('--output', default='art_calls.xlsx', help="Workbook to write")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Rewrite the whole workbook (streaming), keeping the reviewed and added_on columns")
+    parser.add_argument('--keep-columns', nargs='*', default=list(REVIEWER_COLUMNS),
+                        help="Rebuild: reviewer-edited columns to carry over unless the listing was summarized again "
+                             "(pass none to regenerate them all)")
+    parser.add_argument('--include-archive', action='store_true',
+                        help="Also export archived events whose deadline has passed")
+    parser.add_argument('--stream-append', action='store_true',
+                        help="Append in constant memory by rewriting the sheet's values; drops formatting, "
+                             "column widths, filters and other sheets")
+    args = parser.parse_args()
+    write_to_excel(output_file=args.output, rebuild=args.rebuild, include_archive=args.include_archive,
+                   stream=args.stream_append, keep_columns=args.keep_columns)
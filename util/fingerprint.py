@@ -0,0 +1,45 @@
+"""Content fingerprints for change detection.
+
+Every raw record carries two hashes, added by the scrapers:
+
+- ``fingerprint`` covers what the summary is built from: the title, the
+  deadline and the description. The summarizer re-runs a listing whose
+  fingerprint differs from the one its processed event was summarized from.
+- ``listing_fingerprint`` covers the fields of the listing page (everything
+  but the URL). The scrapers compare it against the stored one to decide,
+  without fetching the detail page, whether a known listing changed.
+  Sources whose listing pages show only the title re-fetch known detail
+  pages instead and compare ``fingerprint`` (``recheck_details``).
+
+Text is normalized before hashing (case, whitespace and the scrapers' ``\\n``
+separators), so a re-rendered page with the same wording keeps its
+fingerprint.
+"""
+
+import hashlib
+import re
+
+CONTENT_FIELDS = ('title', 'deadline', 'description')
+
+_SEPARATOR_RE = re.compile(r'\\n|\s+')
+
+
+def normalize(value):
+    """Lower-cases ``value`` and collapses whitespace and ``\\n`` separators to single spaces."""
+    if value is None:
+        return ''
+    return _SEPARATOR_RE.sub(' ', str(value)).strip().lower()
+
+
+def _digest(values):
+    return hashlib.sha256('\x1f'.join(normalize(value) for value in values).encode('utf-8')).hexdigest()
+
+
+def content_fingerprint(record):
+    """Returns the hash of ``record``'s normalized title, deadline and description."""
+    return _digest(record.get(field) for field in CONTENT_FIELDS)
+
+
+def listing_fingerprint(listing):
+    """Returns the hash of a listing-page entry's fields other than its URL."""
+    return _digest(f'{key}={value}' for key, value in sorted(listing.items()) if key != 'url')
@@ -0,0 +1,143 @@
+"""Persistent on-disk HTTP response cache with conditional GET support.
+
+Each cached response is stored as two files keyed by the SHA-256 of its URL:
+``<key>.body`` holds the raw bytes and ``<key>.json`` holds the validators
+(``ETag`` / ``Last-Modified``) plus bookkeeping timestamps. ``util.http_client``
+uses the validators to send ``If-None-Match`` / ``If-Modified-Since`` and serves
+the stored body when the server answers ``304 Not Modified``.
+
+Entries not revalidated within ``ttl`` seconds are dropped, and the least
+recently used entries are evicted once the cache grows beyond ``max_bytes``.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / '.http_cache'
+DEFAULT_TTL = 30 * 24 * 60 * 60  # 30 days
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256 MB
+
+
+def _atomic_write(path, data):
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ResponseCache:
+    """Stores response bodies and validators on disk, keyed by URL."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self.evict()
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self.cache_dir / f'{key}.json', self.cache_dir / f'{key}.body'
+
+    def get(self, url):
+        """Returns the cached entry for ``url`` (metadata plus body) or None."""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            body = body_path.read_bytes()
+        except (OSError, json.JSONDecodeError):
+            return None
+        if time.time() - meta.get('validated_at', 0) > self.ttl:
+            return None
+        meta['body'] = body
+        return meta
+
+    def conditional_headers(self, entry):
+        """Builds the revalidation headers for a cached entry."""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url, response):
+        """Stores a 200 response if it carries a validator the server can check."""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        meta_path, body_path = self._paths(url)
+        now = time.time()
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'size': len(response.content),
+            'stored_at': now,
+            'validated_at': now,
+        }
+        with self._lock:
+            try:
+                replaced = body_path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            _atomic_write(body_path, response.content)
+            _atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+            self._total_bytes += meta['size'] - replaced
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def touch(self, url, entry):
+        """Marks an entry as freshly revalidated after a 304 response."""
+        meta_path, _ = self._paths(url)
+        meta = {k: v for k, v in entry.items() if k != 'body'}
+        meta['validated_at'] = time.time()
+        with self._lock:
+            _atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+
+    def evict(self):
+        """Drops expired entries, then least recently validated ones until under max_bytes."""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for meta_path in self.cache_dir.glob('*.json'):
+                body_path = meta_path.with_suffix('.body')
+                try:
+                    with open(meta_path, 'r', encoding='utf-8') as f:
+                        meta = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    meta = {}
+                if not meta or now - meta.get('validated_at', 0) > self.ttl or not body_path.exists():
+                    self._remove(meta_path, body_path)
+                    continue
+                entries.append((meta.get('validated_at', 0), meta.get('size', 0), meta_path, body_path))
+
+            total = sum(size for _, size, _, _ in entries)
+            entries.sort()
+            removed = 0
+            while entries and total > self.max_bytes:
+                _, size, meta_path, body_path = entries.pop(0)
+                self._remove(meta_path, body_path)
+                total -= size
+                removed += 1
+            if removed:
+                logging.info(f"Evicted {removed} HTTP cache entries to stay under {self.max_bytes} bytes")
+            self._total_bytes = total
+
+    @staticmethod
+    def _remove(meta_path, body_path):
+        for path in (meta_path, body_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,177 @@
+"""Shared HTTP fetch layer for the scrapers.
+
+All scraper traffic goes through one pooled ``requests.Session`` so pages on the
+same host reuse keep-alive connections. Detail pages can be fetched concurrently
+with ``fetch_all``, which returns results in input order, while a per-host
+limiter keeps the crawl polite (bounded parallelism plus a minimum gap between
+request starts).
+
+Responses are cached on disk by ``util.http_cache`` and revalidated with
+conditional GETs; call ``configure_cache`` to move or disable the cache.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from util.http_cache import DEFAULT_CACHE_DIR, ResponseCache
+from util.metrics import metrics
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+}
+DEFAULT_TIMEOUT = 30
+DEFAULT_MAX_WORKERS = 8
+PER_HOST_CONCURRENCY = 4
+PER_HOST_MIN_INTERVAL = 0.25  # seconds between request starts on one host
+
+_session = None
+_session_lock = threading.Lock()
+_host_limiters = {}
+_host_limiters_lock = threading.Lock()
+_cache = None
+_cache_enabled = True
+_cache_dir = DEFAULT_CACHE_DIR
+_cache_lock = threading.Lock()
+
+
+class HostLimiter:
+    """Caps in-flight requests and spaces out request starts for one host."""
+
+    def __init__(self, max_concurrency=PER_HOST_CONCURRENCY, min_interval=PER_HOST_MIN_INTERVAL):
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def __enter__(self):
+        self._semaphore.acquire()
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self._min_interval
+        if wait > 0:
+            time.sleep(wait)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+        return False
+
+
+def get_session():
+    """Returns the process-wide pooled session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            _session = session
+        return _session
+
+
+def configure_cache(cache_dir=None, enabled=True):
+    """Points the response cache at ``cache_dir`` or turns caching off."""
+    global _cache, _cache_enabled, _cache_dir
+    with _cache_lock:
+        _cache = None
+        _cache_enabled = enabled
+        _cache_dir = cache_dir or DEFAULT_CACHE_DIR
+
+
+def get_cache():
+    """Returns the active response cache, or None when caching is disabled."""
+    global _cache
+    with _cache_lock:
+        if _cache_enabled and _cache is None:
+            _cache = ResponseCache(_cache_dir)
+        return _cache
+
+
+def configure_host_limits(host, max_concurrency=PER_HOST_CONCURRENCY, min_interval=PER_HOST_MIN_INTERVAL):
+    """Overrides the politeness limits for one host (``netloc``, e.g. a local test server)."""
+    with _host_limiters_lock:
+        _host_limiters[host] = HostLimiter(max_concurrency, min_interval)
+
+
+def _limiter_for(url):
+    host = urlsplit(url).netloc
+    with _host_limiters_lock:
+        limiter = _host_limiters.get(host)
+        if limiter is None:
+            limiter = HostLimiter()
+            _host_limiters[host] = limiter
+        return limiter
+
+
+def fetch(url, headers=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Fetches a URL through the shared session and returns the body bytes.
+
+    Cached responses are revalidated with a conditional GET and served from disk
+    on ``304 Not Modified``. Raises requests.exceptions.RequestException on
+    network or HTTP errors, matching the behaviour of the previous bare
+    ``requests.get`` calls.
+    """
+    cache = get_cache()
+    entry = cache.get(url) if cache else None
+    request_headers = dict(headers or {})
+    if entry:
+        request_headers.update(cache.conditional_headers(entry))
+
+    with _limiter_for(url), metrics.timer('http.fetch'):
+        try:
+            response = get_session().get(url, headers=request_headers, timeout=timeout)
+        except requests.exceptions.RequestException:
+            metrics.incr('http.errors')
+            raise
+    metrics.incr('http.requests')
+
+    if entry and response.status_code == 304:
+        cache.touch(url, entry)
+        metrics.incr('http.not_modified')
+        logging.debug(f"Not modified, served {url} from cache")
+        return entry['body']
+
+    if not response.ok:
+        metrics.incr('http.errors')
+    response.raise_for_status()
+    if cache:
+        cache.put(url, response)
+    metrics.incr('http.bytes', len(response.content))
+    logging.debug(f"Fetched {url} ({len(response.content)} bytes)")
+    return response.content
+
+
+def fetch_iter(items, func, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Applies ``func`` to every item concurrently and yields results in input order.
+
+    Each result is yielded as soon as it and the ones before it are done, so a
+    consumer can start on the first detail page while the rest are in flight.
+    """
+    items = list(items)
+    if max_workers is None or max_workers <= 1 or len(items) <= 1:
+        for item in items:
+            yield func(item)
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        yield from executor.map(func, items)
+
+
+def fetch_all(items, func, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Applies ``func`` to every item concurrently and returns results in input order.
+
+    ``func`` is typically a scraper's ``get_details``; the order guarantee keeps
+    scraper output identical to a serial crawl.
+    """
+    return list(fetch_iter(items, func, max_workers))
@@ -0,0 +1,41 @@
+"""Crash-safe JSON writes and the legacy event journal reader.
+
+``atomic_write_json`` replaces a JSON file via a temporary file so readers
+never see a half-written file. JSON-era runs appended each finished event to a
+JSONL journal; the summarizer now commits events straight to
+``util.event_store``, and ``load_journal`` only reads journals those runs left
+behind, for ``EventStore.migrate_json``.
+"""
+
+import json
+import logging
+import os
+
+
+def atomic_write_json(data, file_path):
+    """Writes ``data`` to ``file_path`` atomically (temp file + rename)."""
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{file_path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+
+def load_journal(path):
+    """Returns the events in a JSONL journal, skipping a torn final line from a crash."""
+    if not os.path.exists(path):
+        return []
+    events = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                logging.warning(f"Ignoring unreadable line {line_number} in {path}")
+    return events
@@ -0,0 +1,161 @@
+"""Persistent, content-addressed cache for OpenAI responses.
+
+Responses are keyed on a SHA-256 of (model, system message, prompt); since every
+prompt is a template followed by the input text, identical descriptions or
+deadline strings reuse the stored answer instead of paying for another call.
+Entries live in a small SQLite file and the least recently used ones are
+evicted once the cache exceeds ``max_entries``.
+
+Concurrent requests for the same key are collapsed: the first caller computes
+the response while the others wait for it, so duplicates inside one thread
+pool never cost a second API call.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / '.llm_cache.sqlite3'
+DEFAULT_MAX_ENTRIES = 50000
+
+
+def make_key(model, system, prompt):
+    """Returns the content hash for one request."""
+    payload = json.dumps([model, system, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed response cache with LRU eviction and hit/miss statistics."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._async_in_flight = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self._conn.commit()
+
+    def _lookup(self, key):
+        row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row:
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+        return None
+
+    def _store(self, key, model, response):
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, model, response, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, model, response, now, now),
+        )
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            # Trim to 90% so eviction doesn't run on every subsequent insert.
+            excess = count - int(self.max_entries * 0.9)
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self.evictions += excess
+            logging.info(f"Evicted {excess} LLM cache entries")
+        self._conn.commit()
+
+    def get(self, model, system, prompt):
+        """Returns the cached response for the request, or None (counted as a miss)."""
+        with self._lock:
+            cached = self._lookup(make_key(model, system, prompt))
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return cached
+
+    def put(self, model, system, prompt, response):
+        """Stores a response computed outside ``get_or_compute`` (e.g. by a batch job)."""
+        with self._lock:
+            self._store(make_key(model, system, prompt), model, response)
+
+    def get_or_compute(self, model, system, prompt, compute):
+        """Returns the cached response for the request, calling ``compute()`` on a miss."""
+        key = make_key(model, system, prompt)
+        while True:
+            with self._lock:
+                cached = self._lookup(key)
+                if cached is not None:
+                    self.hits += 1
+                    return cached
+                waiter = self._in_flight.get(key)
+                if waiter is None:
+                    waiter = threading.Event()
+                    self._in_flight[key] = waiter
+                    self.misses += 1
+                    break
+            # Another thread is computing this key; wait and re-check the cache.
+            waiter.wait()
+
+        try:
+            response = compute()
+            with self._lock:
+                self._store(key, model, response)
+            return response
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            waiter.set()
+
+    async def aget_or_compute(self, model, system, prompt, compute):
+        """Async variant of ``get_or_compute``; ``compute`` is a coroutine function."""
+        key = make_key(model, system, prompt)
+        while True:
+            with self._lock:
+                cached = self._lookup(key)
+                if cached is not None:
+                    self.hits += 1
+                    return cached
+                waiter = self._async_in_flight.get(key)
+                if waiter is None:
+                    waiter = asyncio.get_running_loop().create_future()
+                    self._async_in_flight[key] = waiter
+                    self.misses += 1
+                    break
+            # Shield so a cancelled waiter doesn't cancel the shared future.
+            await asyncio.shield(waiter)
+
+        try:
+            response = await compute()
+            with self._lock:
+                self._store(key, model, response)
+            return response
+        finally:
+            with self._lock:
+                self._async_in_flight.pop(key, None)
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def stats(self):
+        """Returns hit/miss counters for this process."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,151 @@
+"""Counters, latency samples and spans for a pipeline run.
+
+Instrumented modules record into the shared ``metrics`` object::
+
+    metrics.incr('http.bytes', len(body))
+    with metrics.span('scrape', source='CA_arts_council'):
+        ...
+    with metrics.timer('parse.detail'):
+        ...
+
+``span`` is for stages and other coarse steps: it adds an event to the trace
+(open it in chrome://tracing or https://ui.perfetto.dev) and a latency sample
+under its name. ``timer`` only adds the sample, which suits per-request and
+per-page timings that would swamp the trace. ``write_report`` writes the
+counters, gauges and latency percentiles as JSON; ``write_trace`` writes the
+spans in the Chrome trace-event format.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+MAX_TRACE_EVENTS = 100_000
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class Metrics:
+    """Thread-safe counters, gauges, latency samples and trace events for one process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = datetime.now()
+            self._origin = time.perf_counter()
+            self.counters = defaultdict(float)
+            self.gauges = {}
+            self.samples = defaultdict(list)
+            self.trace_events = []
+            self.dropped_trace_events = 0
+            self._thread_names = {}
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self.samples[name].append(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        """Records how long the block took as a latency sample under ``name``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    @contextmanager
+    def span(self, name, **args):
+        """Like ``timer``, and also records the block as a trace event with ``args``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            ended = time.perf_counter()
+            thread = threading.current_thread()
+            event = {
+                'name': name,
+                'cat': name.split('.', 1)[0],
+                'ph': 'X',
+                'ts': round((started - self._origin) * 1e6),
+                'dur': round((ended - started) * 1e6),
+                'pid': os.getpid(),
+                'tid': thread.native_id,
+            }
+            if args:
+                event['args'] = args
+            with self._lock:
+                self.samples[name].append(ended - started)
+                self._thread_names.setdefault(thread.native_id, thread.name)
+                if len(self.trace_events) < MAX_TRACE_EVENTS:
+                    self.trace_events.append(event)
+                else:
+                    self.dropped_trace_events += 1
+
+    def timings(self):
+        """Returns count, total and percentile latencies (milliseconds) for every sample name."""
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self.samples.items()}
+        result = {}
+        for name, values in sorted(samples.items()):
+            total = sum(values)
+            summary = {'count': len(values), 'total_s': round(total, 3), 'mean_ms': round(total / len(values) * 1000, 2)}
+            for pct in PERCENTILES:
+                summary[f'p{pct}_ms'] = round(percentile(values, pct) * 1000, 2)
+            summary['max_ms'] = round(values[-1] * 1000, 2)
+            result[name] = summary
+        return result
+
+    def report(self):
+        """Returns the run report as a JSON-serializable dict."""
+        timings = self.timings()
+        with self._lock:
+            return {
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'wall_s': round(time.perf_counter() - self._origin, 3),
+                'counters': {name: int(value) if value == int(value) else value
+                             for name, value in sorted(self.counters.items())},
+                'gauges': dict(sorted(self.gauges.items())),
+                'timings': timings,
+                'trace_events': len(self.trace_events),
+                'dropped_trace_events': self.dropped_trace_events,
+            }
+
+    def write_report(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def write_trace(self, path):
+        """Writes the spans as a Chrome trace-event JSON file."""
+        with self._lock:
+            pid = os.getpid()
+            events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                      for tid, name in self._thread_names.items()]
+            events.extend(self.trace_events)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+metrics = Metrics()
@@ -0,0 +1,259 @@
+"""OpenAI Batch API support for bulk summarization.
+
+``run_batch`` writes chat-completion requests to a JSONL input file, submits it
+through a backend, polls until the batch finishes and returns the response
+content per ``custom_id``. ``OpenAIBatchBackend`` talks to the real Batch API;
+``LocalBatchBackend`` is an in-process stand-in that answers each request with
+a responder callable, for tests and offline runs.
+
+Batches submitted under a ``key`` are remembered in the event store's ``meta``
+table until the caller has merged their results (``forget_batch``). A run that
+died while polling, or one that did not wait (``wait=False``), leaves the id
+behind, and the next run collects that batch with ``resume_batch`` instead of
+paying for the same requests again.
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from util.event_store import get_store
+from util.openai_caller import MODEL, create_completion, get_client, usage_stats
+from util.retry import clean_json_response
+
+BATCH_DIR = Path(__file__).resolve().parent.parent / 'batch_jobs'
+COMPLETIONS_ENDPOINT = '/v1/chat/completions'
+TERMINAL_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+DEFAULT_TIMEOUT = 24 * 60 * 60
+BATCH_META_PREFIX = 'openai_batch:'
+
+
+class BatchPendingError(RuntimeError):
+    """The batch is still running and the caller asked not to wait for it."""
+
+
+class OpenAIBatchBackend:
+    """Submits batches to the OpenAI Batch API."""
+
+    #: Batch ids stay valid across processes, so a later run can collect them
+    resumable = True
+
+    def submit(self, input_path):
+        with open(input_path, 'rb') as f:
+            batch_file = get_client().files.create(file=f, purpose='batch')
+        batch = get_client().batches.create(
+            input_file_id=batch_file.id,
+            endpoint=COMPLETIONS_ENDPOINT,
+            completion_window='24h',
+        )
+        return batch.id
+
+    def status(self, batch_id):
+        batch = get_client().batches.retrieve(batch_id)
+        return batch.status, batch.output_file_id, batch.error_file_id
+
+    def download(self, file_id):
+        return get_client().files.content(file_id).text
+
+
+class LocalBatchBackend:
+    """
+    In-process stand-in for the Batch API.
+
+    ``responder(body)`` receives each request body and returns the assistant
+    message content (or raises to produce a per-request error line).
+    """
+
+    resumable = False
+
+    def __init__(self, responder):
+        self.responder = responder
+        self._batches = {}
+
+    def submit(self, input_path):
+        batch_id = f'local_batch_{len(self._batches) + 1}'
+        output_lines = []
+        with open(input_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                request = json.loads(line)
+                try:
+                    content = self.responder(request['body'])
+                    result = {
+                        'custom_id': request['custom_id'],
+                        'response': {
+                            'status_code': 200,
+                            'body': {'choices': [{'message': {'role': 'assistant', 'content': content}}]},
+                        },
+                        'error': None,
+                    }
+                except Exception as e:
+                    result = {'custom_id': request['custom_id'], 'response': None, 'error': {'message': str(e)}}
+                output_lines.append(json.dumps(result))
+        self._batches[batch_id] = '\n'.join(output_lines)
+        return batch_id
+
+    def status(self, batch_id):
+        return 'completed', batch_id, None
+
+    def download(self, file_id):
+        return self._batches[file_id]
+
+
+def interactive_responder(body):
+    """``LocalBatchBackend`` responder that answers through the interactive API."""
+    return create_completion(body['messages']).choices[0].message.content
+
+
+def write_batch_input(requests, input_path):
+    """Writes ``(custom_id, system, prompt)`` tuples as Batch API JSONL lines."""
+    os.makedirs(os.path.dirname(input_path), exist_ok=True)
+    with open(input_path, 'w', encoding='utf-8') as f:
+        for custom_id, system, prompt in requests:
+            f.write(json.dumps({
+                'custom_id': custom_id,
+                'method': 'POST',
+                'url': COMPLETIONS_ENDPOINT,
+                'body': {
+                    'model': MODEL,
+                    'messages': [
+                        {'role': 'system', 'content': system},
+                        {'role': 'user', 'content': prompt},
+                    ],
+                },
+            }, ensure_ascii=False) + '\n')
+
+
+def parse_batch_output(text):
+    """Maps custom_id to message content, or to an Exception for failed requests."""
+    results = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        response = item.get('response') or {}
+        if item.get('error') or response.get('status_code') != 200:
+            message = (item.get('error') or {}).get('message') or f"status {response.get('status_code')}"
+            results[item['custom_id']] = RuntimeError(f"Batch request failed: {message}")
+            continue
+        body = response['body']
+        usage = body.get('usage')
+        usage_stats.record(SimpleNamespace(**usage) if usage else None)
+        results[item['custom_id']] = body['choices'][0]['message']['content']
+    return results
+
+
+def validate_json_content(content):
+    """Cleans a JSON answer the way the interactive path does, raising on invalid JSON."""
+    cleaned = clean_json_response(content)
+    json.loads(cleaned)
+    return cleaned
+
+
+def submitted_batch(key):
+    """Returns ``(batch_id, input_path)`` of the batch submitted for ``key`` and not merged yet, or None."""
+    value = get_store().get_meta(f'{BATCH_META_PREFIX}{key}')
+    if not value:
+        return None
+    batch = json.loads(value)
+    return batch['batch_id'], Path(batch['input_path'])
+
+
+def forget_batch(key):
+    """Forgets the batch submitted for ``key`` once its results are merged."""
+    get_store().delete_meta(f'{BATCH_META_PREFIX}{key}')
+
+
+def wait_for_batch(backend, batch_id, poll_interval=30, timeout=DEFAULT_TIMEOUT, wait=True):
+    """
+    Polls until the batch finishes; returns ``(status, output_file_id, error_file_id)``.
+
+    With ``wait`` unset the status is checked once and BatchPendingError is
+    raised if the batch is still running.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        status, output_file_id, error_file_id = backend.status(batch_id)
+        if status in TERMINAL_STATUSES:
+            return status, output_file_id, error_file_id
+        if not wait:
+            raise BatchPendingError(f"Batch {batch_id} is {status}")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Batch {batch_id} still {status} after {timeout}s")
+        logging.info(f"Batch {batch_id} is {status}; checking again in {poll_interval}s")
+        time.sleep(poll_interval)
+
+
+def collect_batch(backend, batch_id, input_path, status, output_file_id, error_file_id):
+    """Downloads a finished batch; returns a dict of custom_id to response content (or Exception)."""
+    results = {}
+    if output_file_id:
+        output_text = backend.download(output_file_id)
+        Path(str(input_path).replace('_input.jsonl', '_output.jsonl')).write_text(output_text, encoding='utf-8')
+        results.update(parse_batch_output(output_text))
+    if error_file_id:
+        results.update(parse_batch_output(backend.download(error_file_id)))
+    if status != 'completed':
+        logging.warning(f"Batch {batch_id} ended with status {status}")
+    return results
+
+
+def run_batch(requests, name, backend=None, poll_interval=30, timeout=DEFAULT_TIMEOUT, key=None, wait=True):
+    """
+    Submits ``(custom_id, system, prompt)`` requests as one batch and waits for it.
+
+    Returns a dict of custom_id to response content (or Exception). Requests
+    missing from the output are reported as errors. With ``key`` set, a
+    resumable backend's batch id is remembered until ``forget_batch(key)``;
+    ``wait=False`` raises BatchPendingError instead of polling a running batch.
+    """
+    backend = backend or OpenAIBatchBackend()
+    input_path = BATCH_DIR / f'{name}_input.jsonl'
+    write_batch_input(requests, input_path)
+    batch_id = backend.submit(input_path)
+    logging.info(f"Submitted batch {batch_id} with {len(requests)} requests ({input_path})")
+    if key is not None and backend.resumable:
+        get_store().set_meta(f'{BATCH_META_PREFIX}{key}',
+                             json.dumps({'batch_id': batch_id, 'input_path': str(input_path)}))
+
+    results = collect_batch(backend, batch_id, input_path,
+                            *wait_for_batch(backend, batch_id, poll_interval, timeout, wait))
+    for custom_id, _, _ in requests:
+        results.setdefault(custom_id, RuntimeError(f"No result for {custom_id} in batch {batch_id}"))
+    return results
+
+
+def resume_batch(key, backend=None, poll_interval=30, timeout=DEFAULT_TIMEOUT, wait=True):
+    """
+    Collects the batch an earlier run submitted for ``key``, if there is one.
+
+    Returns ``{(system, prompt): content}`` for its successful requests (read
+    back from the saved input file), or an empty dict when nothing is
+    outstanding or the batch ended without usable answers. Raises
+    BatchPendingError if the batch is still running and ``wait`` is unset.
+    Otherwise the batch has finished, and the caller calls
+    ``forget_batch(key)`` once the answers are merged, including when there
+    are none.
+    """
+    submitted = submitted_batch(key)
+    if submitted is None:
+        return {}
+    backend = backend or OpenAIBatchBackend()
+    batch_id, input_path = submitted
+    logging.info(f"Resuming batch {batch_id} submitted by an earlier run ({input_path})")
+    results = collect_batch(backend, batch_id, input_path,
+                            *wait_for_batch(backend, batch_id, poll_interval, timeout, wait))
+    answers = {}
+    if not input_path.exists():
+        logging.warning(f"Input file {input_path} of batch {batch_id} is gone; its answers can't be matched")
+        return answers
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            request = json.loads(line)
+            result = results.get(request['custom_id'])
+            if result is not None and not isinstance(result, Exception):
+                system, prompt = (message['content'] for message in request['body']['messages'])
+                answers[system, prompt] = result
+    return answers
@@ -1,39 +1,300 @@
-from openai import OpenAI
 from dotenv import load_dotenv
+import asyncio
 import os
 import json
+import logging
+import threading
+import time
+from util.llm_cache import LLMCache
+from util.metrics import metrics
+from util.rate_limit import AdaptiveConcurrency, AsyncAdaptiveConcurrency, TokenBucket, backoff_delay
 from util.retry import retry_until_valid_json
 
+# The OpenAI SDK takes most of a second to import, so it is loaded (and the
+# client built) on the first request; .env is read now because the limits
+# below come from the environment.
 load_dotenv()
 
-api_key = os.getenv("OPENAI_API_KEY")
 MODEL="gpt-5-mini"
+TEXT_SYSTEM_PROMPT = "You are a helpful assistant."
+JSON_SYSTEM_PROMPT = "You are a helpful assistant that always responds with valid JSON."
 
-client = OpenAI(api_key=api_key)
+# Rate limits default to a conservative tier; raise them via the environment
+# to match the account's published limits.
+MAX_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_MAX_RPM", "500"))
+MAX_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_MAX_TPM", "200000"))
+MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "64"))
+MAX_ASYNC_CONCURRENCY = int(os.getenv("OPENAI_MAX_ASYNC_CONCURRENCY", "512"))
+MAX_ATTEMPTS = 6
+EXPECTED_COMPLETION_TOKENS = 300
 
-def get_openai_response(prompt: str) -> str:
-    """Gets a string response from OpenAI."""
-    response = client.chat.completions.create(
-        model=MODEL,
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ]
-    )
+request_bucket = TokenBucket(MAX_REQUESTS_PER_MINUTE)
+token_bucket = TokenBucket(MAX_TOKENS_PER_MINUTE)
+concurrency = AdaptiveConcurrency(maximum=MAX_CONCURRENCY)
+async_concurrency = AsyncAdaptiveConcurrency(maximum=MAX_ASYNC_CONCURRENCY)
+
+_client = None
+_client_lock = threading.Lock()
+_async_client = None
+_async_client_loop = None
+
+
+def get_client():
+    """Returns the shared OpenAI client, importing the SDK and creating the client on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            # Retries are handled below so throttling feeds the adaptive limiter.
+            _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        return _client
+
+
+def get_async_client():
+    """Returns an AsyncOpenAI client bound to the running event loop."""
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        from openai import AsyncOpenAI
+        _async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        _async_client_loop = loop
+    return _async_client
+
+
+def retryable_errors():
+    """The API errors worth retrying: throttling, timeouts, connection errors and 5xx responses."""
+    from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+    return (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+_cache = None
+_cache_enabled = True
+_cache_lock = threading.Lock()
+
+
+def configure_cache(path=None, enabled=True):
+    """Points the response cache at ``path`` or turns caching off."""
+    global _cache, _cache_enabled
+    with _cache_lock:
+        _cache_enabled = enabled
+        _cache = LLMCache(path) if enabled and path else None
+
+
+def get_cache():
+    """Returns the active response cache, or None when caching is disabled."""
+    global _cache
+    with _cache_lock:
+        if _cache_enabled and _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+
+def cache_stats():
+    """Returns hit/miss statistics for the response cache."""
+    cache = get_cache()
+    return cache.stats() if cache else {}
+
+
+def _cached(system, prompt, compute):
+    cache = get_cache()
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(MODEL, system, prompt, compute)
+
+
+async def _acached(system, prompt, compute):
+    cache = get_cache()
+    if cache is None:
+        return await compute()
+    return await cache.aget_or_compute(MODEL, system, prompt, compute)
+
+
+class UsageStats:
+    """Thread-safe totals of API requests and tokens billed in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.cached_prompt_tokens = 0
+            self.retries = 0
+            self.throttled = 0
+
+    def record(self, usage):
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        # Prompt-prefix tokens OpenAI served from its prompt cache (billed at a discount)
+        cached_tokens = getattr(getattr(usage, 'prompt_tokens_details', None), 'cached_tokens', 0) or 0
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cached_prompt_tokens += cached_tokens
+        metrics.incr('llm.requests')
+        metrics.incr('llm.prompt_tokens', prompt_tokens)
+        metrics.incr('llm.completion_tokens', completion_tokens)
+        metrics.incr('llm.cached_prompt_tokens', cached_tokens)
+
+    def record_retry(self, throttled):
+        with self._lock:
+            self.retries += 1
+            if throttled:
+                self.throttled += 1
+        metrics.incr('llm.retries')
+        if throttled:
+            metrics.incr('llm.throttled')
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'cached_prompt_tokens': self.cached_prompt_tokens,
+                'retries': self.retries,
+                'throttled': self.throttled,
+            }
+
+
+usage_stats = UsageStats()
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) for rate budgeting."""
+    return len(text) // 4 + 1
+
+
+def retry_after_seconds(error):
+    """Reads Retry-After (or retry-after-ms) from an API error response, if present."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        pass
+    return None
+
+
+def _is_throttle(error):
+    from openai import RateLimitError
+    return isinstance(error, RateLimitError) or getattr(error, 'status_code', None) == 503
+
+
+def create_completion(messages):
+    """
+    Sends a chat completion through the shared limiters.
+
+    Requests and tokens are paced by per-minute token buckets, in-flight calls
+    are capped by the AIMD controller, and throttling, timeouts, connection
+    errors and 5xx responses are retried with jittered exponential backoff that
+    honours Retry-After.
+    """
+    estimated_tokens = sum(estimate_tokens(m["content"]) for m in messages) + EXPECTED_COMPLETION_TOKENS
+    for attempt in range(MAX_ATTEMPTS):
+        request_bucket.acquire()
+        token_bucket.acquire(estimated_tokens)
+        concurrency.acquire()
+        try:
+            with metrics.timer('llm.request'):
+                response = get_client().chat.completions.create(model=MODEL, messages=messages)
+        except retryable_errors() as e:
+            throttled = _is_throttle(e)
+            concurrency.release(success=False, throttled=throttled)
+            if getattr(e, 'code', None) == 'insufficient_quota' or attempt == MAX_ATTEMPTS - 1:
+                raise
+            usage_stats.record_retry(throttled)
+            delay = backoff_delay(attempt, retry_after_seconds(e))
+            logging.warning(f"OpenAI request failed ({type(e).__name__}); retry {attempt + 1} of {MAX_ATTEMPTS - 1} in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        except Exception:
+            concurrency.release(success=False)
+            raise
+        concurrency.release()
+        usage_stats.record(getattr(response, 'usage', None))
+        return response
+
+
+async def acreate_completion(messages):
+    """Async counterpart of ``create_completion`` using the same buckets and retry policy."""
+    estimated_tokens = sum(estimate_tokens(m["content"]) for m in messages) + EXPECTED_COMPLETION_TOKENS
+    for attempt in range(MAX_ATTEMPTS):
+        await request_bucket.acquire_async()
+        await token_bucket.acquire_async(estimated_tokens)
+        await async_concurrency.acquire()
+        success = throttled = False
+        try:
+            with metrics.timer('llm.request'):
+                response = await get_async_client().chat.completions.create(model=MODEL, messages=messages)
+            success = True
+        except retryable_errors() as e:
+            throttled = _is_throttle(e)
+            if getattr(e, 'code', None) == 'insufficient_quota' or attempt == MAX_ATTEMPTS - 1:
+                raise
+            error = e
+        finally:
+            await async_concurrency.release(success=success, throttled=throttled)
+        if success:
+            usage_stats.record(getattr(response, 'usage', None))
+            return response
+        usage_stats.record_retry(throttled)
+        delay = backoff_delay(attempt, retry_after_seconds(error))
+        logging.warning(f"OpenAI request failed ({type(error).__name__}); retry {attempt + 1} of {MAX_ATTEMPTS - 1} in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+
+def _request(system, prompt):
+    response = create_completion([
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt}
+    ])
     return response.choices[0].message.content
 
+
 @retry_until_valid_json(max_retries=3)
-def get_openai_response_in_json(prompt: str) -> str:
-    """Gets a JSON response from OpenAI, with retries."""
-    response = client.chat.completions.create(
-        model=MODEL,
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant that always responds with valid JSON."},
-            {"role": "user", "content": prompt}
-        ]
-    )
+def _request_json(prompt):
+    return _request(JSON_SYSTEM_PROMPT, prompt)
+
+
+async def _arequest(system, prompt):
+    response = await acreate_completion([
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt}
+    ])
     return response.choices[0].message.content
 
+
+@retry_until_valid_json(max_retries=3)
+async def _arequest_json(prompt):
+    return await _arequest(JSON_SYSTEM_PROMPT, prompt)
+
+
+def get_openai_response(prompt: str) -> str:
+    """Gets a string response from OpenAI, served from the cache when possible."""
+    return _cached(TEXT_SYSTEM_PROMPT, prompt, lambda: _request(TEXT_SYSTEM_PROMPT, prompt))
+
+
+def get_openai_response_in_json(prompt: str) -> str:
+    """Gets a JSON response from OpenAI, with retries; only valid JSON is cached."""
+    return _cached(JSON_SYSTEM_PROMPT, prompt, lambda: _request_json(prompt))
+
+
+async def aget_openai_response(prompt: str) -> str:
+    """Async version of ``get_openai_response``."""
+    return await _acached(TEXT_SYSTEM_PROMPT, prompt, lambda: _arequest(TEXT_SYSTEM_PROMPT, prompt))
+
+
+async def aget_openai_response_in_json(prompt: str) -> str:
+    """Async version of ``get_openai_response_in_json``."""
+    return await _acached(JSON_SYSTEM_PROMPT, prompt, lambda: _arequest_json(prompt))
+
 if __name__ == "__main__":
     # Example for get_openai_response
     print("--- Testing get_openai_response (string output) ---")
@@ -0,0 +1,285 @@
+"""Shrinks scraped descriptions before they are sent to OpenAI.
+
+Scraped descriptions carry a lot that the summary doesn't need. The title is
+repeated, AZ pages add a "Posted" date, a "Tags" list and the "Submit an Arts
+Opportunity Listing" footer, and calls list their prizes one per line.
+``compact_description``:
+
+1. splits the text on the scrapers' ``\\n`` separators and drops empty and
+   repeated lines, the title, the "Posted" date, tag lists, prize lists and
+   site navigation. A prize list ends at the first line that is not a place
+   or money item, and lines about fees or eligibility are always kept;
+2. joins a dangling label (``Deadline:``) with its value and rejoins the
+   rest with real newlines, which cost one token instead of two or three;
+3. truncates what is left to ``max_tokens``, keeping the beginning (what the
+   call is) and the end (the details block with deadline, location and how to
+   apply) and dropping the middle.
+
+Tokens are counted with ``tiktoken`` when it is installed (and its vocabulary
+can be loaded on first use) and estimated at about four characters per token
+otherwise. ``compaction_stats`` accumulates the tokens before and after
+compaction for the run report.
+
+``python -m util.prompt_compaction`` reports the savings on the scraped
+``raw_data/`` files and checks that the lines in ``REGRESSION_SAMPLES``
+survive compaction.
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import sys
+import threading
+
+from util.metrics import metrics
+
+DEFAULT_MAX_TOKENS = 1000
+HEAD_SHARE = 0.75
+TRUNCATION_MARK = '[...]'
+ENCODING_MODEL = 'gpt-5-mini'
+FALLBACK_ENCODING = 'o200k_base'
+
+BOILERPLATE_LINES = {
+    'add a listing',
+    'apply',
+    'details',
+    'do you have an opportunity you would like listed? click the button below to fill out our form.',
+    'here',
+    'submit an arts opportunity listing',
+    'visit',
+    '.',
+}
+LABELS = ('deadline:', 'how to apply:', 'location:', 'organization/company:', 'website:')
+_SPLIT_RE = re.compile(r'\\n|\n')
+_PRIZE_HEADING_RE = re.compile(r'^(awards?|prizes?|the winners? (will )?receives?)\b[^.]*:?$', re.IGNORECASE)
+_PRIZE_ITEM_RE = re.compile(
+    r'^[$€£]?\d|^(1st|2nd|3rd|\d+th|first|second|third|best|honou?rable|grand|runners?[- ]up|top)\b'
+    r'|\b(prizes?|awards?|cash)\b',
+    re.IGNORECASE,
+)
+# Fees and eligibility feed the summary's ``fees`` and ``requirement`` fields
+_KEEP_RE = re.compile(r'fee|eligib|open to|\bentr(y|ies)\b|submission|[$€£]\d[\d,.]* (for|per)\b', re.IGNORECASE)
+_LIST_ITEM_MAX_CHARS = 60
+
+# (description, lines that must survive) pairs checked by ``python -m util.prompt_compaction``
+REGRESSION_SAMPLES = [
+    ("The annual juried show.\\nAwards:\\nBest in Show $500\\nSecond $250\\nEntry fee: $35 per piece\\n"
+     "Open to Arizona artists only\\nDeadline:\\n12/06/2025",
+     ['Entry fee: $35 per piece', 'Open to Arizona artists only', 'Deadline: 12/06/2025']),
+    ("AWARDS\\nBest of Show: $750\\nTwo Directors Choice awards: $250 each\\nENTRY FEE\\n$25 for first entry",
+     ['ENTRY FEE', '$25 for first entry']),
+    ("The Winner will receive:\\n$250 cash prize\\nOfficial certificate\\n$25 for 4 images/ $35 for 6 images",
+     ['$25 for 4 images/ $35 for 6 images']),
+]
+
+_encoding = None
+_encoding_lock = threading.Lock()
+_enabled = True
+_max_tokens = DEFAULT_MAX_TOKENS
+
+
+class CompactionStats:
+    """Thread-safe token counts before and after compaction."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.descriptions = 0
+            self.tokens_before = 0
+            self.tokens_after = 0
+            self.truncated = 0
+
+    def record(self, before, after, truncated):
+        with self._lock:
+            self.descriptions += 1
+            self.tokens_before += before
+            self.tokens_after += after
+            self.truncated += truncated
+        metrics.incr('prompt.tokens_before', before)
+        metrics.incr('prompt.tokens_after', after)
+        if truncated:
+            metrics.incr('prompt.truncated')
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_before - self.tokens_after
+
+    @property
+    def saved_rate(self):
+        return self.tokens_saved / self.tokens_before if self.tokens_before else 0.0
+
+
+compaction_stats = CompactionStats()
+
+
+def configure_compaction(enabled=True, max_tokens=DEFAULT_MAX_TOKENS):
+    """Turns compaction on or off and sets the per-description token budget (None for no limit)."""
+    global _enabled, _max_tokens
+    _enabled = enabled
+    _max_tokens = max_tokens
+
+
+def _get_encoding():
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+            except ImportError:
+                _encoding = False
+                return None
+            try:
+                try:
+                    _encoding = tiktoken.encoding_for_model(ENCODING_MODEL)
+                except KeyError:
+                    _encoding = tiktoken.get_encoding(FALLBACK_ENCODING)
+            except Exception as e:
+                # tiktoken downloads its vocabulary on first use, which fails offline
+                logging.warning(f"Could not load the tiktoken encoding ({e}); estimating tokens from length")
+                _encoding = False
+        return _encoding or None
+
+
+def count_tokens(text):
+    """Counts tokens with tiktoken, or estimates about four characters per token without it."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _cut(text, max_tokens, from_end=False):
+    """Returns the first (or last) ``max_tokens`` tokens of ``text``, cut at a line or word boundary."""
+    if max_tokens <= 0:
+        return ''
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        text = encoding.decode(tokens[-max_tokens:] if from_end else tokens[:max_tokens])
+    else:
+        text = text[-max_tokens * 4:] if from_end else text[:max_tokens * 4]
+    # Drop the partial line or word at the cut
+    if from_end:
+        boundary = min((i for i in (text.find('\n'), text.find(' ')) if i >= 0), default=-1)
+    else:
+        boundary = max(text.rfind('\n'), text.rfind(' '))
+    if boundary > 0:
+        text = text[boundary + 1:] if from_end else text[:boundary]
+    return text.strip()
+
+
+def truncate_to_budget(text, max_tokens):
+    """Keeps ``text`` within ``max_tokens``: its head and tail survive, the middle is replaced by a mark."""
+    if count_tokens(text) <= max_tokens:
+        return text, False
+    budget = max_tokens - count_tokens(TRUNCATION_MARK) - 2
+    head_tokens = int(budget * HEAD_SHARE)
+    head = _cut(text, head_tokens)
+    tail = _cut(text, budget - head_tokens, from_end=True)
+    return '\n'.join(part for part in (head, TRUNCATION_MARK, tail) if part), True
+
+
+def _is_label(line):
+    return line.endswith(':') and len(line) <= 40
+
+
+def _is_prize_item(line):
+    return (len(line) <= _LIST_ITEM_MAX_CHARS and not _is_label(line) and _PRIZE_ITEM_RE.search(line) is not None
+            and not _KEEP_RE.search(line))
+
+
+def compact_lines(description, title=None):
+    """Splits a scraped description into its meaningful lines (see the module docstring)."""
+    # CA titles carry a " - <type>, <category>" suffix the page heading doesn't
+    title_keys = {(title or '').strip().lower(), (title or '').rsplit(' - ', 1)[0].strip().lower()}
+    lines = []
+    seen = set()
+    skip_until_label = False
+    in_prize_list = False
+    previous = None
+    for raw in _SPLIT_RE.split(description):
+        line = ' '.join(raw.split())
+        key = line.lower()
+        after, previous = previous, key
+        if not line:
+            continue
+        if after == 'posted':
+            continue  # the date a listing was posted
+        if key in ('posted', 'tags:'):
+            skip_until_label = key == 'tags:'
+            continue
+        if skip_until_label:
+            if key not in LABELS:
+                continue
+            skip_until_label = False
+        if len(line) <= _LIST_ITEM_MAX_CHARS and _PRIZE_HEADING_RE.match(line) and not _KEEP_RE.search(line):
+            in_prize_list = True
+            continue
+        if in_prize_list:
+            if _is_prize_item(line):
+                continue
+            in_prize_list = False
+        if key in BOILERPLATE_LINES or key in title_keys or key in seen:
+            continue
+        seen.add(key)
+        if lines and _is_label(lines[-1]) and _is_label(line):
+            lines[-1] = line  # the previous label had no value
+        elif lines and (_is_label(lines[-1]) or line[0] in ':;,.)'):
+            # "Deadline:" + "12/06/2025", or "Eligibility" + ": Any artists ..."
+            separator = '' if line[0] in ':;,.)' else ' '
+            lines[-1] = f'{lines[-1]}{separator}{line}'
+        else:
+            lines.append(line)
+    return [line for line in lines if not _is_label(line)]
+
+
+def compact_description(description, title=None):
+    """
+    Returns ``description`` compacted and truncated to the configured budget.
+
+    Records the token counts in ``compaction_stats``. Returns the description
+    unchanged when compaction is turned off.
+    """
+    if not _enabled or not description:
+        return description
+    compacted = '\n'.join(compact_lines(description, title)) or description
+    truncated = False
+    if _max_tokens:
+        compacted, truncated = truncate_to_budget(compacted, _max_tokens)
+    compaction_stats.record(count_tokens(description), count_tokens(compacted), truncated)
+    return compacted
+
+
+def check_samples():
+    """Returns a message for every ``REGRESSION_SAMPLES`` line that compaction dropped."""
+    failures = []
+    for description, expected in REGRESSION_SAMPLES:
+        lines = compact_lines(description)
+        failures.extend(f"dropped {line!r} from {description[:40]!r}..." for line in expected if line not in lines)
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Report compaction savings on scraped descriptions.")
+    parser.add_argument('--raw-data', default='raw_data', help="Directory with <state>_raw_data.json files")
+    parser.add_argument('--max-tokens', type=int, default=DEFAULT_MAX_TOKENS, help="Token budget (0 = no limit)")
+    args = parser.parse_args()
+    configure_compaction(max_tokens=args.max_tokens or None)
+    for path in sorted(glob.glob(os.path.join(args.raw_data, '*_raw_data.json'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            for record in json.load(f):
+                compact_description(record.get('description'), record.get('title'))
+    print(f"{compaction_stats.descriptions} descriptions: {compaction_stats.tokens_before} tokens cut to "
+          f"{compaction_stats.tokens_after} ({compaction_stats.saved_rate:.0%} saved), {compaction_stats.truncated} truncated")
+    failures = check_samples()
+    for message in failures:
+        print(f"Regression: {message}")
+    if failures:
+        sys.exit(1)
+    print(f"All {len(REGRESSION_SAMPLES)} regression samples keep their fee and eligibility lines.")
@@ -0,0 +1,129 @@
+"""Rate limiting primitives for OpenAI calls.
+
+``TokenBucket`` paces requests and tokens per minute, ``AdaptiveConcurrency``
+grows the number of in-flight requests additively while calls succeed and
+halves it when the API throttles (AIMD; ``AsyncAdaptiveConcurrency`` is the
+asyncio flavour), and ``backoff_delay`` computes
+exponential backoff with full jitter that never undercuts ``Retry-After``.
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """Refills ``rate_per_minute`` units per minute up to ``capacity``."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount=1):
+        """Takes ``amount`` units and returns how long the caller must wait before using them."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, amount=1):
+        """Blocks until ``amount`` units are available."""
+        wait = self.reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, amount=1):
+        """Like ``acquire`` but yields to the event loop while waiting."""
+        wait = self.reserve(amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on in-flight requests.
+
+    Each success raises the limit by roughly one per window of ``limit``
+    requests; a throttled call multiplies it by ``decrease_factor`` (at most
+    once per ``cooldown`` seconds, so one burst of 429s counts once).
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=64, decrease_factor=0.5, cooldown=2.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, success=True, throttled=False):
+        """Frees a slot; successes grow the limit, throttled calls shrink it."""
+        with self._condition:
+            self.in_flight -= 1
+            self._adjust(success, throttled)
+            self._condition.notify_all()
+
+    def _adjust(self, success, throttled):
+        if throttled:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                self._last_decrease = now
+        elif success:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+
+class AsyncAdaptiveConcurrency(AdaptiveConcurrency):
+    """``AdaptiveConcurrency`` for coroutines sharing one event loop."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._async_condition = None
+        self._loop = None
+
+    def _get_condition(self):
+        # asyncio primitives are bound to a loop; rebuild when a new one runs.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._async_condition = asyncio.Condition()
+            self.in_flight = 0
+        return self._async_condition
+
+    async def acquire(self):
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, success=True, throttled=False):
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            self._adjust(success, throttled)
+            condition.notify_all()
+
+
+def backoff_delay(attempt, retry_after=None, base=1.0, cap=60.0):
+    """Exponential backoff with full jitter, never shorter than ``retry_after``."""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
@@ -1,40 +1,60 @@
+import asyncio
 import functools
+import inspect
 import json
 import time
 
+def clean_json_response(result):
+    """Strips Markdown code fences and whitespace around a model's JSON answer."""
+    cleaned_result = result.strip()
+    if cleaned_result.startswith("```json"):
+        cleaned_result = cleaned_result[7:]
+    elif cleaned_result.startswith("```"):
+        cleaned_result = cleaned_result[3:]
+
+    if cleaned_result.endswith("```"):
+        cleaned_result = cleaned_result[:-3]
+
+    return cleaned_result.strip()
+
+def _is_valid_json(result, attempt, max_retries, delay):
+    try:
+        json.loads(result)
+        return True
+    except json.JSONDecodeError:
+        print(result)
+        print(f"Attempt {attempt + 1} of {max_retries} failed: not a valid JSON. Retrying in {delay}s...")
+        if attempt == max_retries - 1:
+            raise ValueError(f"Failed to get valid JSON after {max_retries} attempts.")
+        return False
+
 def retry_until_valid_json(max_retries=3, delay=1):
     """
     A decorator to retry a function if its return value is not a valid JSON string.
 
+    Works with both regular functions and coroutine functions.
+
     :param max_retries: Maximum number of retries.
     :param delay: Delay between retries in seconds.
     :return: The decorator function.
     """
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                for attempt in range(max_retries):
+                    cleaned_result = clean_json_response(await func(*args, **kwargs))
+                    if _is_valid_json(cleaned_result, attempt, max_retries, delay):
+                        return cleaned_result  # It's valid JSON, return it
+                    await asyncio.sleep(delay)
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             for attempt in range(max_retries):
-                result = func(*args, **kwargs)
-                
-                cleaned_result = result.strip()
-                if cleaned_result.startswith("```json"):
-                    cleaned_result = cleaned_result[7:]
-                elif cleaned_result.startswith("```"):
-                    cleaned_result = cleaned_result[3:]
-
-                if cleaned_result.endswith("```"):
-                    cleaned_result = cleaned_result[:-3]
-                
-                cleaned_result = cleaned_result.strip()
-
-                try:
-                    json.loads(cleaned_result)
+                cleaned_result = clean_json_response(func(*args, **kwargs))
+                if _is_valid_json(cleaned_result, attempt, max_retries, delay):
                     return cleaned_result  # It's valid JSON, return it
-                except json.JSONDecodeError:
-                    print(result)
-                    print(f"Attempt {attempt + 1} of {max_retries} failed: not a valid JSON. Retrying in {delay}s...")
-                    if attempt == max_retries - 1:
-                        raise ValueError(f"Failed to get valid JSON after {max_retries} attempts.")
-                    time.sleep(delay)
+                time.sleep(delay)
         return wrapper
     return decorator
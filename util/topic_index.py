@@ -0,0 +1,194 @@
+"""Searchable index of processed events by topic, organization, location, fee and deadline.
+
+Topics, organizations and locations are split into normalized words (lowercase,
+simple plural stripping, stopwords dropped). Each ``(field, word)`` pair is stored
+in the event store's indexed ``event_terms`` table, and a fee class (``free`` or
+``paid``) is stored alongside. Deadlines use the store's own deadline index, so a
+query is a handful of indexed lookups instead of a scan of every event.
+
+The index is updated incrementally: new events and events whose data changed
+(a trigger in the store marks them) are re-indexed before each search and
+after each summarizer run::
+
+    python -m util.topic_index "Landscape calls closing in the next 30 days with $0 fees"
+    python -m util.topic_index portrait --location california --closing-within 14
+    python -m util.topic_index --suggest landsc
+"""
+
+import argparse
+import os
+import re
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from util.event_store import get_store
+
+TOPICS_FILE = 'topics.txt'
+DEFAULT_LIMIT = 50
+
+TOPIC = 'topic'
+ORGANIZATION = 'organization'
+LOCATION = 'location'
+FEE = 'fee'
+FEE_FREE = 'free'
+FEE_PAID = 'paid'
+
+STOPWORDS = {
+    'a', 'an', 'and', 'any', 'art', 'artist', 'artists', 'at', 'by', 'call', 'for', 'from', 'in', 'of',
+    'on', 'open', 'opportunity', 'or', 'the', 'to', 'with',
+}
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_AMOUNT_RE = re.compile(r'(?:[$€£]|\b(?:usd|eur|gbp)\b)\s*(\d[\d,]*(?:\.\d+)?)')
+_CLOSING_RE = re.compile(r'\b(?:closing|due|deadline|ending)\s+(?:with)?in\s+(?:the\s+)?(?:next\s+)?(\d+)\s+days?\b')
+_FREE_RE = re.compile(r'(?:\$0\b(?:\s*fees?)?|\bfree\b|\bno\s+(?:entry\s+)?fees?\b|\bwithout\s+(?:entry\s+)?fees?\b)')
+_FIELD_RE = re.compile(r'\b(org|organization|location|loc):("[^"]+"|\S+)')
+_INVARIANT_PLURALS = {'series', 'species'}
+_QUERY_FILLER = {'calls', 'fee', 'fees', 'next', 'days', 'closing', 'due', 'deadline'}
+
+
+def normalize_words(text):
+    """Lowercases, splits and singularizes ``text``; returns the non-stopword words in order."""
+    words = []
+    for word in _WORD_RE.findall(str(text or '').lower()):
+        if word in _INVARIANT_PLURALS:
+            pass
+        elif len(word) > 4 and word.endswith('ies'):
+            word = word[:-3] + 'y'
+        elif len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        if word not in STOPWORDS:
+            words.append(word)
+    return words
+
+
+def fee_class(fees):
+    """Classifies a ``fees`` answer as ``free``, ``paid`` or None when it can't tell."""
+    if not isinstance(fees, str) or not fees.strip():
+        return None
+    text = fees.lower()
+    amounts = [float(amount.replace(',', '')) for amount in _AMOUNT_RE.findall(text)]
+    if amounts:
+        return FEE_PAID if any(amount > 0 for amount in amounts) else FEE_FREE
+    if _FREE_RE.search(text) or text.strip() in ('0', 'none', 'n/a'):
+        return FEE_FREE
+    # Bare numbers ("34 for 1-3 works") or an unspecified fee still mean paying to apply
+    if re.search(r'[1-9]', text) or 'fee' in text:
+        return FEE_PAID
+    return None
+
+
+def event_terms(event):
+    """Returns the ``(field, term)`` pairs an event is indexed under."""
+    terms = set()
+    for topic in (event.get('topics_EN') or []) + (event.get('topics_canonical') or []):
+        terms.update((TOPIC, word) for word in normalize_words(topic))
+    terms.update((ORGANIZATION, word) for word in normalize_words(event.get('organization')))
+    terms.update((LOCATION, word) for word in normalize_words(event.get('location')))
+    fee = fee_class(event.get('fees'))
+    if fee:
+        terms.add((FEE, fee))
+    return terms
+
+
+def update_index(store=None):
+    """Indexes processed events that are new or changed; returns how many were indexed."""
+    store = store or get_store()
+    pending = store.unindexed_term_events()
+    if pending:
+        store.set_terms({url: event_terms(event) for url, event in pending})
+    return len(pending)
+
+
+def parse_query(text):
+    """
+    Turns a free-text query into ``search`` keyword arguments.
+
+    Understands "closing in the next N days", "$0 fees"/"free"/"no fee",
+    ``org:`` and ``location:`` prefixes; the remaining words are topics.
+    """
+    text = text.lower()
+    criteria = {'topics': [], 'organization': None, 'location': None, 'closing_within': None, 'free': None}
+    closing = _CLOSING_RE.search(text)
+    if closing:
+        criteria['closing_within'] = int(closing.group(1))
+        text = _CLOSING_RE.sub(' ', text)
+    if _FREE_RE.search(text):
+        criteria['free'] = True
+        text = _FREE_RE.sub(' ', text)
+    for prefix, value in _FIELD_RE.findall(text):
+        key = 'organization' if prefix.startswith('org') else 'location'
+        criteria[key] = value.strip('"')
+    text = _FIELD_RE.sub(' ', text)
+    criteria['topics'] = [word for word in normalize_words(text) if word not in _QUERY_FILLER]
+    return criteria
+
+
+def search(store=None, topics=(), organization=None, location=None, closing_within=None, free=None,
+           limit=DEFAULT_LIMIT, today=None):
+    """
+    Returns ``(state, event)`` pairs matching every given criterion, soonest deadline first.
+
+    ``topics``, ``organization`` and ``location`` match on normalized words.
+    ``closing_within`` keeps events whose deadline is between today and N days out.
+    ``free`` keeps free (True) or paid (False) calls.
+    """
+    store = store or get_store()
+    update_index(store)
+    terms = []
+    for topic in topics:
+        terms.extend((TOPIC, word) for word in normalize_words(topic))
+    terms.extend((ORGANIZATION, word) for word in normalize_words(organization))
+    terms.extend((LOCATION, word) for word in normalize_words(location))
+    if free is not None:
+        terms.append((FEE, FEE_FREE if free else FEE_PAID))
+
+    deadline_from = deadline_to = None
+    if closing_within is not None:
+        today = today or date.today()
+        deadline_from = today.isoformat()
+        deadline_to = (today + timedelta(days=closing_within)).isoformat()
+    return store.search_events(sorted(set(terms)), deadline_from, deadline_to, limit)
+
+
+def suggest_topics(prefix, store=None, topics_file=TOPICS_FILE, limit=20):
+    """Returns topic words starting with ``prefix`` from the index and ``topics.txt``, with event counts."""
+    store = store or get_store()
+    update_index(store)
+    counts = Counter(dict(store.term_counts(TOPIC)))
+    if os.path.exists(topics_file):
+        with open(topics_file, 'r', encoding='utf-8') as f:
+            for word in normalize_words(f.read()):
+                counts.setdefault(word, 0)
+    prefix = ' '.join(normalize_words(prefix)) or prefix.lower()
+    matches = [(word, count) for word, count in counts.items() if word.startswith(prefix)]
+    return sorted(matches, key=lambda item: (-item[1], item[0]))[:limit]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Search processed art calls by topic, organization, location, fee and deadline.")
+    parser.add_argument('query', nargs='*', help='Free-text query, e.g. "landscape calls closing in the next 30 days with $0 fees"')
+    parser.add_argument('--organization', help="Organization words to match")
+    parser.add_argument('--location', help="Location words to match")
+    parser.add_argument('--closing-within', type=int, help="Only calls whose deadline is within this many days")
+    parser.add_argument('--free', action='store_true', default=None, help="Only calls without an entry fee")
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help="Maximum number of results")
+    parser.add_argument('--suggest', metavar='PREFIX', help="List known topic words starting with PREFIX instead of searching")
+    args = parser.parse_args()
+
+    if args.suggest:
+        for word, count in suggest_topics(args.suggest):
+            print(f"{count:5d}  {word}")
+    else:
+        criteria = parse_query(' '.join(args.query))
+        for key in ('organization', 'location', 'closing_within', 'free'):
+            if getattr(args, key) is not None:
+                criteria[key] = getattr(args, key)
+        started = time.perf_counter()
+        results = search(limit=args.limit, **criteria)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for state, event in results:
+            print(f"{event.get('deadline') or '-':<10}  {event.get('fees') or '-':<12.12}  {event.get('title')}\n"
+                  f"            {event.get('url')}")
+        print(f"{len(results)} results in {elapsed_ms:.1f} ms ({criteria})")
@@ -0,0 +1,178 @@
+"""Collapses synonymous ``topics_EN`` labels onto a canonical vocabulary.
+
+The summarizer emits free-form topic labels, so one concept shows up under
+many spellings ("Landscape", "Landscapes", "Night skies / starry skies").
+This stage runs after summarization:
+
+1. Each label is reduced to a key (lowercase words, plurals and stopwords
+   dropped). Keys already in the stored mapping resolve with a dict lookup.
+2. Unseen keys are embedded as TF-IDF vectors over hashed character n-grams
+   (numpy only) and compared with every canonical label in one matrix-vector
+   product. A key joins the closest canonical label when the cosine similarity
+   reaches ``threshold``; otherwise it becomes a new canonical label. Frequent
+   and shorter labels are resolved first, so the common, general spelling
+   becomes canonical ("Symbolism" rather than "Color symbolism").
+3. The mapping is saved in the event store, and each event gets a
+   ``topics_canonical`` list used by the Excel export and the search index.
+
+::
+
+    python -m util.topic_normalizer            # normalize events that need it
+    python -m util.topic_normalizer --all      # re-apply the mapping to every event
+    python -m util.topic_normalizer --show     # print canonical labels and their variants
+"""
+
+import argparse
+import zlib
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from util.event_store import get_store
+from util.topic_index import normalize_words
+
+CANONICAL_FIELD = 'topics_canonical'
+DEFAULT_THRESHOLD = 0.85
+NGRAM_SIZES = (3, 4)
+HASH_DIM = 2048
+
+
+def label_key(label):
+    """Returns the lookup key of a topic label (normalized words joined by spaces)."""
+    return ' '.join(normalize_words(label))
+
+
+class CharNgramTfidf:
+    """TF-IDF over hashed character n-grams of each word, with L2-normalized rows."""
+
+    def __init__(self, ngram_sizes=NGRAM_SIZES, dim=HASH_DIM):
+        self.ngram_sizes = ngram_sizes
+        self.dim = dim
+        self.idf = np.ones(dim, dtype=np.float32)
+
+    def _features(self, text):
+        features = []
+        for word in text.split():
+            padded = f' {word} '
+            for size in self.ngram_sizes:
+                features.extend(zlib.crc32(padded[i:i + size].encode('utf-8')) % self.dim
+                                for i in range(max(1, len(padded) - size + 1)))
+        return features
+
+    def fit(self, texts):
+        document_frequency = np.zeros(self.dim, dtype=np.float32)
+        for text in texts:
+            document_frequency[list(set(self._features(text)))] += 1
+        self.idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+        return self
+
+    def transform(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            np.add.at(matrix[row], self._features(text), 1.0)
+        matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+def resolve_labels(labels, mapping, threshold=DEFAULT_THRESHOLD):
+    """
+    Maps every unseen label key onto a canonical label, updating ``mapping`` in place.
+
+    ``labels`` is a Counter of raw labels; ``mapping`` maps keys to
+    ``(canonical, similarity)``. Returns the ``(key, canonical, similarity)``
+    rows that were added.
+    """
+    display = {}
+    counts = Counter()
+    for label, count in labels.items():
+        key = label_key(label)
+        if key:
+            display.setdefault(key, label.strip())
+            counts[key] += count
+    unseen = sorted((key for key in counts if key not in mapping), key=lambda key: (-counts[key], len(key), key))
+    if not unseen:
+        return []
+
+    canonical_labels = sorted({canonical for canonical, _ in mapping.values()})
+    canonical_keys = [label_key(label) for label in canonical_labels]
+    vectorizer = CharNgramTfidf().fit(list(mapping) + unseen)
+
+    # Room for every unseen key becoming canonical; rows are filled as they appear
+    matrix = np.zeros((len(canonical_keys) + len(unseen), vectorizer.dim), dtype=np.float32)
+    size = len(canonical_keys)
+    if size:
+        matrix[:size] = vectorizer.transform(canonical_keys)
+
+    added = []
+    for key, vector in zip(unseen, vectorizer.transform(unseen)):
+        if size:
+            similarities = matrix[:size] @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= threshold:
+                mapping[key] = (canonical_labels[best], float(similarities[best]))
+                added.append((key, canonical_labels[best], float(similarities[best])))
+                continue
+        canonical_labels.append(display[key])
+        matrix[size] = vector
+        size += 1
+        mapping[key] = (display[key], 1.0)
+        added.append((key, display[key], 1.0))
+    return added
+
+
+def canonical_topics(topics, mapping):
+    """Returns the distinct canonical labels of ``topics``, in order."""
+    result = []
+    for topic in topics or []:
+        canonical = mapping.get(label_key(topic), (topic, 1.0))[0]
+        if canonical not in result:
+            result.append(canonical)
+    return result
+
+
+def normalize_topics(store=None, threshold=DEFAULT_THRESHOLD, refresh_all=False):
+    """
+    Resolves new labels and stores ``topics_canonical`` on events that lack it.
+
+    ``refresh_all`` re-applies the mapping to every event. Returns
+    ``(new_labels, events_updated)``.
+    """
+    store = store or get_store()
+    mapping = store.topic_mapping()
+    rows = store.event_rows() if refresh_all else store.events_without(CANONICAL_FIELD)
+
+    labels = Counter(topic for _, _, event in rows for topic in event.get('topics_EN') or [])
+    added = resolve_labels(labels, mapping, threshold)
+    if added:
+        store.add_topic_mappings(added)
+
+    updates = defaultdict(list)
+    for state, _, event in rows:
+        canonical = canonical_topics(event.get('topics_EN'), mapping)
+        if event.get(CANONICAL_FIELD) != canonical:
+            updates[state].append(dict(event, **{CANONICAL_FIELD: canonical}))
+    for state, events in updates.items():
+        # Not a new summary: the Excel export keeps reviewers' topics (see util.excel_writer)
+        store.put_events(state, events, touch=False)
+    return len(added), sum(len(events) for events in updates.values())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Map free-form topic labels onto a canonical vocabulary.")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Minimum cosine similarity for a label to join an existing canonical label")
+    parser.add_argument('--all', action='store_true', help="Re-apply the mapping to every event")
+    parser.add_argument('--show', action='store_true', help="Print canonical labels with their variants")
+    args = parser.parse_args()
+    store = get_store()
+    new_labels, updated = normalize_topics(store, args.threshold, refresh_all=args.all)
+    print(f"Resolved {new_labels} new topic labels; updated {updated} events")
+    if args.show:
+        variants = defaultdict(list)
+        for key, (canonical, similarity) in store.topic_mapping().items():
+            if key != label_key(canonical):
+                variants[canonical].append(f"{key} ({similarity:.2f})")
+        for canonical in sorted(variants):
+            print(f"{canonical}: {', '.join(sorted(variants[canonical]))}")